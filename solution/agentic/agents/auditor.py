@@ -1,19 +1,63 @@
 # agentic/auditor.py
 import json
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, Any, Iterable, List, Optional
 
+from ..audit_index import AuditIndex
+from ..audit_policy import AuditPolicy, event as make_event
+from ..audit_sink import AuditSink
+
 AUDIT_DIR = os.environ.get("AUDIT_DIR", "./data/core/audit")
 AUDIT_FILE = os.path.join(AUDIT_DIR, "audit.jsonl")
 
 def ensure_audit_dir():
     os.makedirs(AUDIT_DIR, exist_ok=True)
 
+class EventBuffer:
+    """
+    In-process audit events keyed by audit id.
+
+    Graph nodes append here instead of to workflow state, so events are not
+    re-serialized into every checkpoint. Bounded: the oldest audits are dropped
+    once `max_audits` are open (callers drain finished audits).
+    """
+
+    def __init__(self, max_audits: int = 1000):
+        self.max_audits = max_audits
+        self._events: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extend(self, audit_id: str, events: List[Dict[str, Any]]):
+        with self._lock:
+            self._events.setdefault(audit_id, []).extend(events)
+            while len(self._events) > self.max_audits:
+                self._events.popitem(last=False)
+
+    def peek(self, audit_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events.get(audit_id, []))
+
+    def drain(self, audit_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._events.pop(audit_id, [])
+
+
 class Auditor:
-    def __init__(self, audit_file: str = AUDIT_FILE):
+    def __init__(self, audit_file: str = AUDIT_FILE, sink: Optional[AuditSink] = None,
+                 policy: Optional[AuditPolicy] = None):
         ensure_audit_dir()
         self.audit_file = audit_file
+        self.buffer = EventBuffer()
+        # AUDIT_LEVEL / AUDIT_SAMPLE: how much of each event reaches disk
+        self.policy = policy or AuditPolicy()
+        # buffered, rotating segments next to the (legacy, still readable) audit file
+        self.sink = sink or AuditSink(os.path.dirname(os.path.abspath(audit_file)))
+        # SQLite sidecar (ticket/event type/FTS over payloads), updated on every flush
+        use_index = os.environ.get("AUDIT_INDEX", "1").lower() not in ("0", "false", "no")
+        self.index = AuditIndex(self.sink) if use_index else None
 
     def new_audit(self, ticket_id: str) -> Dict[str, Any]:
         return {
@@ -23,33 +67,33 @@ class Auditor:
             "events": []
         }
 
+    def event(self, event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # build an event without attaching it (graph nodes return events as state updates);
+        # stamped with time.monotonic(), formatted only if it is persisted
+        return make_event(event_type, payload)
+
     def add_event(self, audit: Dict[str, Any], event_type: str, payload: Dict[str, Any]):
-        evt = {
-            "ts": datetime.utcnow().isoformat(),
-            "type": event_type,
-            "payload": payload
-        }
         # ensure events list exists
-        audit.setdefault("events", []).append(evt)
+        audit.setdefault("events", []).append(self.event(event_type, payload))
 
     def persist(self, audit: Dict[str, Any]):
-        # write audit to JSONL
-        with open(self.audit_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(audit, default=str) + "\n")
+        # shaped by the audit level; buffered, reaches disk on size/interval flush or flush()/close()
+        self.sink.write(self.policy.apply(audit))
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
 
-    # Simple load all audits (generator)
+    # Simple load all audits (generator): legacy audit.jsonl, then segments oldest first
     def iter_audits(self) -> Iterable[Dict[str, Any]]:
-        if not os.path.exists(self.audit_file):
-            return []
-        with open(self.audit_file, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    yield json.loads(line)
-                except Exception:
-                    continue
+        return self.sink.iter_audits()
 
     # Search audits with simple filters (ticket_id, event_type, key/value in payload)
     def search_audits(self, ticket_id: Optional[str]=None, event_type: Optional[str]=None, contains: Optional[str]=None, limit: int = 100) -> List[Dict[str, Any]]:
+        if self.index is not None:
+            return self.index.search(ticket_id=ticket_id, event_type=event_type, contains=contains, limit=limit)
         results = []
         for audit in self.iter_audits():
             if ticket_id and audit.get("ticket_id") != ticket_id:
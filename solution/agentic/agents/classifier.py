@@ -29,6 +29,22 @@ class Classifier:
             intent = "cancel_order"
             recommended_tool = ["refund","account_lookup"]
             requires_knowledge = True
+        # help-center intents (answerable from cultpass_articles.jsonl, see agentic/templates.py)
+        elif "subscription" in text and ("cancel" in text or "pause" in text):
+            intent = "cancel_subscription"
+            requires_knowledge = True
+        elif "reserve" in text or "reservation" in text or "book a" in text or "booking" in text:
+            intent = "reservation_howto"
+            requires_knowledge = True
+        elif "login" in text or "log in" in text or "password" in text:
+            intent = "login_issue"
+            requires_knowledge = True
+        elif "payment" in text or "credit card" in text:
+            intent = "payment_update"
+            requires_knowledge = True
+        elif "subscription" in text or "included" in text:
+            intent = "subscription_info"
+            requires_knowledge = True
 
         confidence = 0.9 if intent != "unknown" else 0.25
         return {
@@ -2,6 +2,29 @@
 from typing import Dict, Any, List
 import sys
 
+from ..metrics import record_llm_usage
+from ..resilience import CircuitOpenError
+
+def format_customer_profile(profile: Dict[str, Any]) -> str:
+    """A few lines for the prompt from CustomerData.context()."""
+    lines = [f"Name: {profile.get('name')}" + (" (account blocked)" if profile.get("blocked") else "")]
+    sub = profile.get("subscription")
+    if sub:
+        line = f"Subscription: {sub.get('tier')} ({sub.get('status')}), {sub.get('monthly_quota')} experiences/month"
+        if profile.get("quota_remaining") is not None:
+            line += f"; {profile.get('booked_this_month', 0)} booked this month, {profile['quota_remaining']} left"
+        if sub.get("ended_at"):
+            line += f"; ended {sub['ended_at']}"
+        lines.append(line)
+    else:
+        lines.append("Subscription: none")
+    upcoming = profile.get("upcoming") or []
+    lines.append("Upcoming reservations: " + ("; ".join(f"{r.get('title')} on {r.get('when')}" for r in upcoming)
+                                              if upcoming else "none"))
+    lines.append(f"Balance: {profile.get('balance', 0.0)} {profile.get('currency', 'INR')}")
+    return "\n".join(lines)
+
+
 class Resolver:
     def __init__(self, llm):
         self.llm = llm
@@ -12,9 +35,12 @@ class Resolver:
                 allowed_tools: List[str] = None,
                 stm_context: List[Dict[str, Any]] = None,
                 ticket_messages: List[Dict[str, Any]] = None,
-                ltm_docs: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+                ltm_docs: List[Dict[str, Any]] = None,
+                customer_profile: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Generate a grounded response using all available context.
+        `customer_profile` (prefetched account summary) lets account questions
+        be answered without a lookup-tool round trip.
         Returns dict with 'response' and 'confidence'.
         """
         context_docs = context_docs or []
@@ -64,6 +90,9 @@ For pro-rated refunds on subscriptions, encourage them to proceed."""
             else:
                 full_context = "No specific context available. Use general customer service knowledge."
 
+        if customer_profile:
+            full_context = f"### Customer Account\n{format_customer_profile(customer_profile)}\n\n---\n\n{full_context}"
+
         prompt = f"""
 You are a helpful and accurate CultPass customer support agent.
 
@@ -85,9 +114,15 @@ Be friendly, concise, and clear.
 - Keep response under 200 words
 """
 
+        # per-call retry/hedge/breaker details when the LLM is wrapped in ResilientLLM
+        llm_info: Dict[str, Any] = {}
         try:
-            response = self.llm.invoke(prompt)
-            
+            if hasattr(self.llm, "invoke_with_info"):
+                response, _ = self.llm.invoke_with_info(prompt, info=llm_info)
+            else:
+                response = self.llm.invoke(prompt)
+            record_llm_usage(response)
+
             # Handle different response types from LLM (ChatOpenAI returns AIMessage)
             if hasattr(response, 'content'):
                 answer = response.content.strip()
@@ -102,7 +137,7 @@ Be friendly, concise, and clear.
 
             # Estimate confidence
             base_conf = 0.5
-            conf_bonus = 0.1 * len(context_docs) + 0.05 * len(ltm_docs)
+            conf_bonus = 0.1 * len(context_docs) + 0.05 * len(ltm_docs) + (0.05 if customer_profile else 0.0)
             confidence = min(0.95, base_conf + conf_bonus)
 
             # Suggest actions based on intent
@@ -114,12 +149,26 @@ Be friendly, concise, and clear.
                     "params": {"order_id": "to_be_provided"}
                 })
 
-            return {
+            out = {
                 "response": answer,
                 "confidence": confidence,
-                "sources_used": len(context_docs) + len(ltm_docs),
+                "sources_used": len(context_docs) + len(ltm_docs) + (1 if customer_profile else 0),
                 "actions": actions
             }
+            if llm_info:
+                out["resilience"] = llm_info
+            return out
+
+        except CircuitOpenError:
+            # fail fast: the breaker is open, don't log a traceback per ticket
+            return {
+                "response": "We're experiencing a high volume of requests right now. "
+                            "Your message has been logged and a support agent will follow up shortly.",
+                "confidence": 0.1,
+                "error": "llm_circuit_open",
+                "fallback": True,
+                "resilience": llm_info,
+            }
 
         except Exception as e:
             error_msg = str(e)
@@ -135,8 +184,11 @@ Be friendly, concise, and clear.
             else:
                 error_msg_user = "Error generating response. Please try again."
             
-            return {
+            out = {
                 "response": f"I'm having trouble generating a response right now. {error_msg_user}",
                 "confidence": 0.1,
                 "error": error_msg
-            }
\ No newline at end of file
+            }
+            if llm_info:
+                out["resilience"] = llm_info
+            return out
\ No newline at end of file
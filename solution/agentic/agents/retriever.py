@@ -4,27 +4,93 @@ Retriever agent - RAG retrieval handling.
 This module offers:
 - extraction of query (simple summarizer) -- placeholder for LLM-based query expansion
 - vector lookup using MemoryRepository (SQLAlchemy + PGVector when available)
+- TF-IDF search over the help-center articles (cultpass_articles.jsonl); hits carry
+  the article title and a cosine score, which the template fast path gates on
 - fallback naive keyword search over KB folder for small-scale testing
 """
 
-from typing import List, Dict, Any
-from ..memory.memory_repo import MemoryRepository
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
+from collections import Counter
 from pathlib import Path
+import json
+import math
 import os
+import re
+
+if TYPE_CHECKING:  # avoid importing sqlalchemy/numpy when the agents package is imported
+    from ..memory.memory_repo import MemoryRepository
 
 # FIXED: Reliable path to KB folder - use absolute path from solution directory
 _CURRENT_FILE = Path(__file__).resolve()
 _SOLUTION_DIR = _CURRENT_FILE.parent.parent.parent  # Navigate up from agentic/agents to solution
 KB_DIR = _SOLUTION_DIR / "data" / "external" / "kb"
+ARTICLES_FILE = _SOLUTION_DIR / "data" / "external" / "cultpass_articles.jsonl"
+
+_WORD_RE = re.compile(r"[a-z]+")
+_STOPWORDS = {
+    "the", "and", "for", "you", "your", "how", "can", "what", "why", "with", "this",
+    "that", "are", "was", "have", "has", "from", "please", "want", "need", "does",
+    "not", "but", "any", "there", "they", "when", "where", "will", "would", "could",
+}
+
+
+def _terms(text: str) -> List[str]:
+    # 5-char prefixes are a cheap stemmer: reserve/reservation, subscribe/subscription
+    return [w[:5] for w in _WORD_RE.findall((text or "").lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+
+class ArticleIndex:
+    """TF-IDF vectors of the help-center articles (title and tags weighted up); search scores are cosines."""
+
+    def __init__(self, path: Path = ARTICLES_FILE, title_weight: int = 3, tags_weight: int = 2):
+        self.articles: List[Dict[str, Any]] = []
+        if Path(path).exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.articles.append(json.loads(line))
+                    except ValueError:
+                        continue
+        counts = [Counter(_terms(a.get("title", "")) * title_weight + _terms(a.get("tags", "")) * tags_weight
+                          + _terms(a.get("content", ""))) for a in self.articles]
+        df = Counter(term for c in counts for term in c)
+        n = len(counts)
+        self.idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items()}
+        self.vectors = [self._normalise({t: tf * self.idf[t] for t, tf in c.items()}) for c in counts]
+
+    @staticmethod
+    def _normalise(vec: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        return {t: v / norm for t, v in vec.items()} if norm else {}
+
+    def search(self, text: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        query = self._normalise({t: tf * self.idf[t] for t, tf in Counter(_terms(text)).items() if t in self.idf})
+        if not query:
+            return []
+        scored = []
+        for article, vec in zip(self.articles, self.vectors):
+            score = sum(w * vec.get(t, 0.0) for t, w in query.items())
+            if score > 0:
+                scored.append((article, score))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:top_k]
+
+
+_article_index = None
+
+
+def get_article_index() -> ArticleIndex:
+    global _article_index
+    if _article_index is None:
+        _article_index = ArticleIndex()
+    return _article_index
 
-# Debug line — keep for now, remove later
-print(f"KB Directory: {KB_DIR}")
-print(f"KB Files: {list(KB_DIR.glob('**/*.txt')) if KB_DIR.exists() else 'KB directory does not exist'}")
 
 class Retriever:
-    def __init__(self, memory_repo: MemoryRepository = None, top_k: int = 5):
+    def __init__(self, memory_repo: "MemoryRepository" = None, top_k: int = 5, articles: ArticleIndex = None):
         self.memory_repo = memory_repo
         self.top_k = top_k
+        self._articles = articles
 
     def make_query(self, ticket_text: str) -> str:
         # placeholder: short extraction -- replace with LLM-based expansion
@@ -41,7 +107,14 @@ class Retriever:
                 results.append({"source": "memory", "id": row.id, "score": float(score), "text": row.text, "metadata": row.metadata_json})
             if results:
                 return results
-        # 2) naive KB search fallback
+        # 2) help-center articles
+        articles = self._articles if self._articles is not None else get_article_index()
+        for article, score in articles.search(ticket.get("text", ""), top_k=self.top_k):
+            title = article.get("title")
+            results.append({"source": "article", "id": f"article:{title}", "score": round(score, 4),
+                            "text": article.get("content", "")[:400],
+                            "metadata": {"title": title, "tags": article.get("tags")}})
+        # 3) naive KB search fallback
         for p in KB_DIR.glob("**/*.txt"):
             txt = p.read_text(encoding="utf8").lower()
             if any(tok in txt for tok in q.lower().split()[:6]):
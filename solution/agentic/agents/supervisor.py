@@ -1,5 +1,8 @@
 # agentic/agents/supervisor.py
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+# resolver actions that, with high urgency, a human must handle
+DESTRUCTIVE_TOOLS = ("refund", "account_lookup")
 
 class Supervisor:
     """
@@ -7,19 +10,21 @@ class Supervisor:
       - retrieve (bool)
       - auto_resolve (bool)
       - escalate (bool)
+    `plan` applies the parts of that policy that only need the classifier output,
+    so the workflow can skip retrieval (or the resolver) for tickets that don't need it.
     """
     def __init__(self, auto_threshold: float = 0.75, safe_threshold: float = 0.5):
         self.auto_threshold = auto_threshold
         self.safe_threshold = safe_threshold
 
-    def decide(self, classifier_out: Dict[str, Any], resolver_out: Dict[str, Any], ticket: Dict[str, Any]) -> Dict[str, Any]:
+    def decide(self, classifier_out: Dict[str, Any], resolver_out: Dict[str, Any], ticket: Dict[str, Any], **context) -> Dict[str, Any]:
         c = classifier_out.get("confidence", 0.0)
         r = resolver_out.get("confidence", 0.0)
         composite = 0.6 * c + 0.4 * r
         reason = f"composite={composite:.3f} (c={c}, r={r})"
         # urgency/safety overrides
         urgency = ticket.get("metadata", {}).get("urgency", "medium")
-        destructive_actions = any(a.get("tool") in ["refund", "account_lookup"] for a in resolver_out.get("actions", []))
+        destructive_actions = any(a.get("tool") in DESTRUCTIVE_TOOLS for a in resolver_out.get("actions", []))
         if urgency == "high" and destructive_actions:
             return {"retrieve": True, "auto_resolve": False, "escalate": True, "reason": "high urgency + destructive action"}
         if composite >= self.auto_threshold:
@@ -27,3 +32,36 @@ class Supervisor:
         if composite >= self.safe_threshold:
             return {"retrieve": classifier_out.get("requires_knowledge", False), "auto_resolve": False, "escalate": False, "reason": reason + " (safe resolution, QA required)"}
         return {"retrieve": True, "auto_resolve": False, "escalate": True, "reason": reason + " (low confidence)"}
+
+    def pre_decide(self, classifier_out: Dict[str, Any], ticket: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        A decision that no resolver output could change, or None. Only the case `decide` is certain
+        to escalate: high urgency and a refund the Resolver will propose (it adds a refund action
+        when refund is allowed and the ticket text mentions a refund).
+        """
+        urgency = ticket.get("metadata", {}).get("urgency", "medium")
+        refund_action = (classifier_out.get("intent") == "refund_request"
+                         and "refund" in (classifier_out.get("recommended_tool") or [])
+                         and "refund" in (ticket.get("text") or "").lower())
+        if urgency == "high" and refund_action:
+            return {"auto_resolve": False, "escalate": True, "pre_decided": True,
+                    "reason": "high urgency + destructive action (refund)"}
+        return None
+
+    def plan(self, classifier_out: Dict[str, Any], ticket: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stages to run after classification (LTM retrieval already ran alongside the classifier):
+          - pre-decided escalation -> escalation only (KB retrieval and resolver skipped)
+          - requires_knowledge     -> KB retrieval, then resolver
+          - otherwise              -> resolver directly
+        """
+        decision = self.pre_decide(classifier_out, ticket)
+        if decision is not None:
+            stages: List[str] = ["escalation"]
+            skipped = ["retriever", "resolver", "supervisor"]
+            reason = decision["reason"]
+        elif classifier_out.get("requires_knowledge", False):
+            stages, skipped, reason = ["retriever"], [], "requires_knowledge"
+        else:
+            stages, skipped, reason = ["resolver"], ["retriever"], "no knowledge required"
+        return {"stages": stages, "skipped": skipped, "reason": reason, "decision": decision}
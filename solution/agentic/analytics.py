@@ -0,0 +1,360 @@
+# agentic/analytics.py
+"""
+Audit analytics over a columnar store.
+
+`compact()` reads new audit segments once and appends them as NumPy column
+chunks (one .npy per column per run) with dictionary-encoded strings:
+
+    tickets      audit, ts, intent, outcome, reason, classifier_conf, resolver_conf, templated, error
+    node_times   audit, node, ms
+    tool_calls   audit, ts, tool, outcome
+
+Queries memory-map the columns and aggregate with bincount/percentile, so
+reports over millions of audits never touch JSON again.
+
+    cd solution
+    python -m agentic.analytics compact
+    python -m agentic.analytics report [--since 2026-01-01] [--window 3600] [--json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .audit_sink import list_segments, open_segment
+
+AUDIT_DIR = os.environ.get("AUDIT_DIR", "./data/core/audit")
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", os.path.join(AUDIT_DIR, "analytics"))
+
+OUTCOMES = ("auto_resolved", "escalated", "qa_review", "unknown")
+
+TABLES = {
+    "tickets": {"audit": np.int64, "ts": np.float64, "intent": np.int32, "outcome": np.int8, "reason": np.int32,
+                "classifier_conf": np.float32, "resolver_conf": np.float32, "templated": np.bool_,
+                "error": np.bool_},
+    "node_times": {"audit": np.int64, "node": np.int32, "ms": np.float32},
+    "tool_calls": {"audit": np.int64, "ts": np.float64, "tool": np.int32, "outcome": np.int32},
+}
+# dictionary-encoded columns -> vocabulary name
+VOCAB_COLUMNS = {("tickets", "intent"): "intent", ("tickets", "reason"): "reason",
+                 ("node_times", "node"): "node", ("tool_calls", "tool"): "tool",
+                 ("tool_calls", "outcome"): "tool_outcome"}
+
+_COMPOSITE_RE = re.compile(r"^composite=[\d.]+ \(c=[^)]*\)\s*")
+
+
+def _epoch(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def reason_category(reason: Optional[str]) -> str:
+    """Drop per-ticket numbers and tool lists from a supervisor reason.
+
+    'composite=0.412 (c=0.5, r=0.3) (low confidence)' -> 'low confidence'
+    'high urgency + destructive tool (refund)'       -> 'high urgency + destructive tool'
+    """
+    if not reason:
+        return "none"
+    rest = _COMPOSITE_RE.sub("", reason).strip()
+    if not rest:
+        return "composite above threshold"
+    if rest.startswith("(") and rest.endswith(")"):
+        return rest[1:-1]
+    return rest.split(" (")[0]
+
+
+def tool_outcome(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        if result.get("status"):
+            return str(result["status"])
+        return "error" if result.get("error") else "ok"
+    return "unknown"
+
+
+class ColumnStore:
+    def __init__(self, root: str = ANALYTICS_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = {"segments": {}, "vocab": {}, "chunks": 0, "audits": 0}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._lookup: Dict[str, Dict[str, int]] = {}
+
+    # -----------------------------------------------------------------
+    # vocabularies
+    # -----------------------------------------------------------------
+    def vocab(self, name: str) -> List[str]:
+        return self.manifest["vocab"].setdefault(name, [])
+
+    def code(self, name: str, value: Optional[str]) -> int:
+        vocab = self.vocab(name)
+        value = "none" if value is None else str(value)
+        index = self._lookup.setdefault(name, {v: i for i, v in enumerate(vocab)})
+        if value not in index:
+            index[value] = len(vocab)
+            vocab.append(value)
+        return index[value]
+
+    # -----------------------------------------------------------------
+    # compaction
+    # -----------------------------------------------------------------
+    def compact(self, audit_dir: str = AUDIT_DIR) -> int:
+        """Append audits not yet compacted; returns how many were added."""
+        rows = {table: {col: [] for col in cols} for table, cols in TABLES.items()}
+        done = self.manifest["segments"]  # segment -> bytes compacted, or -1 once gzipped (immutable)
+        audit_no = start = self.manifest["audits"]
+        for path in list_segments(audit_dir):
+            name = os.path.basename(path)
+            gz = name.endswith(".gz")
+            name = name[:-3] if gz else name  # keeps its entry when gzipped on rotation
+            read = done.get(name, 0)
+            if read == -1 or (not gz and os.path.getsize(path) <= read):
+                continue
+            with open_segment(path) as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written line: pick it up next time
+                    offset += len(line)
+                    if offset <= read:
+                        continue
+                    try:
+                        audit = json.loads(line)
+                    except Exception:
+                        continue
+                    self._extract(audit, audit_no, rows)
+                    audit_no += 1
+            done[name] = -1 if gz else offset
+        if audit_no > start:
+            self._write_chunk(rows)
+        self.manifest["audits"] = audit_no
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        return audit_no - start
+
+    def _extract(self, audit: Dict[str, Any], audit_no: int, rows: Dict[str, Dict[str, list]]):
+        ts = _epoch(audit.get("created_at"))
+        intent, c_conf, r_conf, templated, error = None, np.nan, np.nan, False, False
+        decision, reason, escalated = None, None, False
+        for e in audit.get("events", []) or []:
+            etype, payload = e.get("type"), e.get("payload") or {}
+            if not isinstance(payload, dict):
+                payload = {}
+            if etype == "classifier":
+                intent, c_conf = payload.get("intent"), payload.get("confidence", np.nan)
+            elif etype == "resolver":
+                r_conf, templated = payload.get("confidence", np.nan), bool(payload.get("templated"))
+            elif etype == "supervisor":
+                decision, reason = payload, payload.get("reason")
+            elif etype == "escalation":
+                escalated = True
+            elif etype == "node_error":
+                error = True
+                reason = reason or "node_error"
+            elif etype == "timings":
+                for node, ms in (payload.get("nodes_ms") or {}).items():
+                    rows["node_times"]["audit"].append(audit_no)
+                    rows["node_times"]["node"].append(self.code("node", node))
+                    rows["node_times"]["ms"].append(ms)
+            elif etype == "tool_call":
+                rows["tool_calls"]["audit"].append(audit_no)
+                rows["tool_calls"]["ts"].append(_epoch(e.get("ts")) if e.get("ts") else ts)
+                rows["tool_calls"]["tool"].append(self.code("tool", payload.get("tool")))
+                rows["tool_calls"]["outcome"].append(self.code("tool_outcome", tool_outcome(payload.get("result"))))
+
+        if decision is not None and decision.get("auto_resolve"):
+            outcome = "auto_resolved"
+        elif escalated or (decision or {}).get("escalate"):
+            outcome = "escalated"
+        elif decision is not None:
+            outcome = "qa_review"
+        else:
+            outcome = "unknown"
+        t = rows["tickets"]
+        t["audit"].append(audit_no)
+        t["ts"].append(ts)
+        t["intent"].append(self.code("intent", intent))
+        t["outcome"].append(OUTCOMES.index(outcome))
+        t["reason"].append(self.code("reason", reason_category(reason)))
+        t["classifier_conf"].append(c_conf if c_conf is not None else np.nan)
+        t["resolver_conf"].append(r_conf if r_conf is not None else np.nan)
+        t["templated"].append(templated)
+        t["error"].append(error)
+
+    def _write_chunk(self, rows: Dict[str, Dict[str, list]]):
+        chunk = self.manifest["chunks"]
+        for table, cols in rows.items():
+            if not next(iter(cols.values())):
+                continue
+            directory = os.path.join(self.root, table)
+            os.makedirs(directory, exist_ok=True)
+            for col, values in cols.items():
+                np.save(os.path.join(directory, f"{col}.{chunk:06d}.npy"),
+                        np.asarray(values, dtype=TABLES[table][col]))
+        self.manifest["chunks"] = chunk + 1
+
+    # -----------------------------------------------------------------
+    # reading
+    # -----------------------------------------------------------------
+    def load(self, table: str) -> Dict[str, np.ndarray]:
+        out = {}
+        for col, dtype in TABLES[table].items():
+            parts = [np.load(p, mmap_mode="r") for p in sorted(glob.glob(os.path.join(self.root, table, f"{col}.*.npy")))]
+            out[col] = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        return out
+
+
+# ---------------------------------------------------------------------
+# vectorized aggregates
+# ---------------------------------------------------------------------
+def _window(ts: np.ndarray, since: Optional[float], until: Optional[float]) -> np.ndarray:
+    mask = np.ones(len(ts), dtype=bool)
+    if since is not None:
+        mask &= ts >= since
+    if until is not None:
+        mask &= ts < until
+    return mask
+
+
+def resolution_by_intent(store: ColumnStore, since: float = None, until: float = None) -> Dict[str, Any]:
+    t = store.load("tickets")
+    mask = _window(t["ts"], since, until)
+    intents, outcomes = t["intent"][mask], t["outcome"][mask]
+    vocab = store.vocab("intent")
+    n = len(vocab)
+    total = np.bincount(intents, minlength=n)
+    by_outcome = {name: np.bincount(intents[outcomes == i], minlength=n) for i, name in enumerate(OUTCOMES)}
+    report = {
+        "tickets": int(mask.sum()),
+        "resolution_rate": float((outcomes == OUTCOMES.index("auto_resolved")).mean()) if len(outcomes) else None,
+        "escalation_rate": float((outcomes == OUTCOMES.index("escalated")).mean()) if len(outcomes) else None,
+        "template_rate": float(t["templated"][mask].mean()) if mask.any() else None,
+        "by_intent": {},
+    }
+    for code in np.nonzero(total)[0]:
+        report["by_intent"][vocab[code]] = {
+            "tickets": int(total[code]),
+            **{f"{name}_rate": round(float(by_outcome[name][code] / total[code]), 4) for name in OUTCOMES},
+        }
+    return report
+
+
+def escalation_reasons(store: ColumnStore, since: float = None, until: float = None) -> Dict[str, int]:
+    t = store.load("tickets")
+    mask = _window(t["ts"], since, until) & (t["outcome"] == OUTCOMES.index("escalated"))
+    counts = np.bincount(t["reason"][mask], minlength=len(store.vocab("reason")))
+    vocab = store.vocab("reason")
+    order = np.argsort(-counts)
+    return {vocab[i]: int(counts[i]) for i in order if counts[i]}
+
+
+def node_latency(store: ColumnStore, percentiles=(50, 90, 99), since: float = None,
+                 until: float = None) -> Dict[str, Dict[str, float]]:
+    nt = store.load("node_times")
+    if since is not None or until is not None:
+        t = store.load("tickets")
+        keep = t["audit"][_window(t["ts"], since, until)]
+        mask = np.isin(nt["audit"], keep)
+        nodes, ms = nt["node"][mask], nt["ms"][mask]
+    else:
+        nodes, ms = nt["node"], nt["ms"]
+    vocab = store.vocab("node")
+    out = {}
+    if not len(nodes):
+        return out
+    # sort once by node, then percentiles per contiguous run
+    order = np.argsort(nodes, kind="stable")
+    nodes, ms = nodes[order], ms[order]
+    bounds = np.flatnonzero(np.diff(nodes)) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(nodes)]):
+        values = ms[start:end]
+        pcts = np.percentile(values, percentiles)
+        out[vocab[nodes[start]]] = {"count": int(end - start), "mean": round(float(values.mean()), 3),
+                                    **{f"p{p}": round(float(v), 3) for p, v in zip(percentiles, pcts)}}
+    return out
+
+
+def tool_outcomes(store: ColumnStore, window_seconds: float = 3600, since: float = None,
+                  until: float = None) -> List[Dict[str, Any]]:
+    tc = store.load("tool_calls")
+    mask = _window(tc["ts"], since, until) & ~np.isnan(tc["ts"])
+    if not mask.any():
+        return []
+    buckets = (tc["ts"][mask] // window_seconds).astype(np.int64)
+    keys = np.stack([buckets, tc["tool"][mask].astype(np.int64), tc["outcome"][mask].astype(np.int64)], axis=1)
+    uniq, counts = np.unique(keys, axis=0, return_counts=True)
+    tools, outcomes = store.vocab("tool"), store.vocab("tool_outcome")
+    return [{"window_start": datetime.fromtimestamp(b * window_seconds).isoformat(),
+             "tool": tools[t], "outcome": outcomes[o], "count": int(c)}
+            for (b, t, o), c in zip(uniq, counts)]
+
+
+def report(store: ColumnStore, since: float = None, until: float = None, window_seconds: float = 3600) -> Dict[str, Any]:
+    return {
+        "resolution": resolution_by_intent(store, since, until),
+        "escalation_reasons": escalation_reasons(store, since, until),
+        "node_latency_ms": node_latency(store, since=since, until=until),
+        "tool_outcomes": tool_outcomes(store, window_seconds, since, until),
+    }
+
+
+def _print_report(rep: Dict[str, Any]):
+    res = rep["resolution"]
+    pct = lambda v: "n/a" if v is None else f"{v * 100:.1f}%"
+    print(f"Tickets: {res['tickets']}  resolved: {pct(res['resolution_rate'])}  "
+          f"escalated: {pct(res['escalation_rate'])}  templated: {pct(res['template_rate'])}")
+    print("\nBy intent:")
+    for intent, row in sorted(res["by_intent"].items(), key=lambda kv: -kv[1]["tickets"]):
+        print(f"  {intent:<22} {row['tickets']:>8}  resolved {pct(row['auto_resolved_rate']):>7}  "
+              f"escalated {pct(row['escalated_rate']):>7}")
+    print("\nEscalation reasons:")
+    for reason, count in rep["escalation_reasons"].items():
+        print(f"  {count:>8}  {reason}")
+    print("\nNode latency (ms):")
+    for node, row in sorted(rep["node_latency_ms"].items(), key=lambda kv: -kv[1]["p50"]):
+        print(f"  {node:<14} n={row['count']:<8} p50={row['p50']:<10} p90={row['p90']:<10} p99={row['p99']}")
+    print("\nTool outcomes:")
+    for row in rep["tool_outcomes"]:
+        print(f"  {row['window_start']}  {row['tool']:<16} {row['outcome']:<22} {row['count']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit analytics (columnar NumPy store)")
+    parser.add_argument("command", choices=["compact", "report"])
+    parser.add_argument("--audit-dir", default=AUDIT_DIR)
+    parser.add_argument("--store", default=ANALYTICS_DIR)
+    parser.add_argument("--since", help="ISO date/time (inclusive)")
+    parser.add_argument("--until", help="ISO date/time (exclusive)")
+    parser.add_argument("--window", type=float, default=3600, help="tool outcome bucket size in seconds")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    store = ColumnStore(args.store)
+    added = store.compact(args.audit_dir)
+    if args.command == "compact":
+        print(f"compacted {added} new audits ({store.manifest['audits']} total) into {args.store}")
+        return
+    rep = report(store, since=_epoch(args.since) if args.since else None,
+                 until=_epoch(args.until) if args.until else None, window_seconds=args.window)
+    if args.json:
+        print(json.dumps(rep, indent=2))
+    else:
+        _print_report(rep)
+
+
+if __name__ == "__main__":
+    main()
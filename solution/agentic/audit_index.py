@@ -0,0 +1,224 @@
+# agentic/audit_index.py
+"""
+SQLite sidecar index over the audit segments.
+
+For every persisted audit the index stores (ticket_id, created_at, segment,
+byte offset, length); for every event its type and timestamp, plus the
+payload JSON in an FTS5 trigram table, so `contains` is a substring match
+served from the index. Searches resolve to (segment, offset) pairs and read
+only the matching lines.
+
+The AuditSink flush listener keeps the index current as audits are written;
+`catch_up()` indexes anything written without it (the legacy audit.jsonl,
+segments from before the index existed).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .audit_sink import LEGACY_FILE, AuditSink, iter_segment, list_segments, open_segment
+
+INDEX_FILE = "audit_index.sqlite"
+_MIN_FTS_CHARS = 3  # trigram tokenizer can't match shorter substrings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS audits (
+    id INTEGER PRIMARY KEY,
+    audit_id TEXT,
+    ticket_id TEXT,
+    created_at TEXT,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    UNIQUE (segment, offset)
+);
+CREATE INDEX IF NOT EXISTS audits_ticket ON audits (ticket_id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    audit_rowid INTEGER NOT NULL,
+    type TEXT,
+    ts TEXT
+);
+CREATE INDEX IF NOT EXISTS events_type ON events (type, audit_rowid);
+CREATE INDEX IF NOT EXISTS events_audit ON events (audit_rowid);
+"""
+
+
+def _segment_name(path: str) -> str:
+    # a segment keeps its index entries when it is gzipped on rotation
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith(".gz") else name
+
+
+def payload_text(payload: Any) -> str:
+    try:
+        return json.dumps(payload if payload is not None else {})
+    except Exception:
+        return str(payload)
+
+
+class AuditIndex:
+    def __init__(self, sink: AuditSink, path: Optional[str] = None):
+        self.sink = sink
+        self.path = path or os.path.join(sink.directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS event_text "
+                              "USING fts5(payload, content='', tokenize='trigram case_sensitive 1')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite without FTS5/trigram: `contains` falls back to reading candidate audits
+            self.fts = False
+        self._caught_up = False
+        sink.add_listener(self.on_flush)
+
+    # -----------------------------------------------------------------
+    # maintenance
+    # -----------------------------------------------------------------
+    def on_flush(self, segment_path: str, entries: List[Tuple[int, int, Dict[str, Any]]]):
+        self._index(_segment_name(segment_path), entries)
+
+    def _index(self, segment: str, entries: List[Tuple[int, int, Dict[str, Any]]], complete: bool = False):
+        if not entries and not complete:
+            return
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                end = 0
+                for offset, length, audit in entries:
+                    end = max(end, offset + length)
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO audits (audit_id, ticket_id, created_at, segment, offset, length) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (audit.get("id"), audit.get("ticket_id"), audit.get("created_at"), segment, offset, length))
+                    if not cur.rowcount:
+                        continue  # already indexed (e.g. by another process's catch_up)
+                    audit_rowid = cur.lastrowid
+                    for e in audit.get("events", []) or []:
+                        ev = conn.execute("INSERT INTO events (audit_rowid, type, ts) VALUES (?, ?, ?)",
+                                          (audit_rowid, e.get("type"), e.get("ts")))
+                        if self.fts:
+                            conn.execute("INSERT INTO event_text (rowid, payload) VALUES (?, ?)",
+                                         (ev.lastrowid, payload_text(e.get("payload"))))
+                conn.execute(
+                    "INSERT INTO segments (name, indexed_bytes, complete) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET indexed_bytes = MAX(indexed_bytes, excluded.indexed_bytes), "
+                    "complete = MAX(complete, excluded.complete)",
+                    (segment, end, int(complete)))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def catch_up(self) -> int:
+        """Index segment bytes not yet covered; returns the number of audits read."""
+        done = {name: (indexed, complete) for name, indexed, complete in
+                self.conn.execute("SELECT name, indexed_bytes, complete FROM segments")}
+        read = 0
+        for path in list_segments(self.sink.directory):
+            name = _segment_name(path)
+            indexed, complete = done.get(name, (0, 0))
+            if complete:
+                continue
+            gz = path.endswith(".gz")
+            if not gz and os.path.getsize(path) <= indexed:
+                continue
+            entries = []
+            if gz:
+                for offset, audit in iter_segment(path):
+                    entries.append((offset, 0, audit))
+            else:
+                with open_segment(path) as f:
+                    f.seek(indexed)
+                    offset = indexed
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # partially written line: pick it up next time
+                        try:
+                            entries.append((offset, len(line), json.loads(line)))
+                        except Exception:
+                            pass
+                        offset += len(line)
+            read += len(entries)
+            # gz segments are immutable; lengths are recovered with readline on lookup
+            self._index(name, entries, complete=gz)
+        self._caught_up = True
+        return read
+
+    # -----------------------------------------------------------------
+    # queries
+    # -----------------------------------------------------------------
+    def search(self,
+               ticket_id: Optional[str] = None,
+               event_type: Optional[str] = None,
+               contains: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """Same filters as Auditor.search_audits: an audit matches if one event matches type and contains."""
+        self.sink.flush()
+        if not self._caught_up:
+            self.catch_up()
+
+        use_fts = bool(contains) and self.fts and len(contains) >= _MIN_FTS_CHARS
+        sql = ["SELECT DISTINCT a.id, a.segment, a.offset, a.length, "
+               "CASE WHEN a.segment = ? THEN 0 ELSE 1 END AS legacy_first FROM audits a"]
+        where, params = [], [LEGACY_FILE]
+        if event_type or use_fts:
+            sql.append("JOIN events e ON e.audit_rowid = a.id")
+        if ticket_id:
+            where.append("a.ticket_id = ?")
+            params.append(ticket_id)
+        if event_type:
+            where.append("e.type = ?")
+            params.append(event_type)
+        if use_fts:
+            where.append("e.id IN (SELECT rowid FROM event_text WHERE event_text MATCH ?)")
+            params.append('"' + contains.replace('"', '""') + '"')
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        # file order, like a scan: legacy audit.jsonl, then segments by name
+        sql.append("ORDER BY legacy_first, a.segment, a.offset")
+        verify = bool(contains) and not use_fts
+        if not verify:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(" ".join(sql), params).fetchall()
+
+        results = []
+        for _, segment, offset, length, _ in rows:
+            audit = self.sink.read_at(os.path.join(self.sink.directory, segment), offset, length or None)
+            if audit is None:
+                continue
+            if verify and not any(
+                    (not event_type or e.get("type") == event_type) and contains in payload_text(e.get("payload"))
+                    for e in audit.get("events", [])):
+                continue
+            results.append(audit)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            audits, = self.conn.execute("SELECT COUNT(*) FROM audits").fetchone()
+            events, = self.conn.execute("SELECT COUNT(*) FROM events").fetchone()
+            segments, = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()
+        return {"path": self.path, "audits": audits, "events": events, "segments": segments, "fts": self.fts,
+                "disk_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,143 @@
+# agentic/audit_policy.py
+"""
+What an audit record keeps, decided once per ticket when it is persisted.
+
+Events are created cheaply (`event()` stamps time.monotonic(), no datetime
+formatting) and buffered in full; `AuditPolicy.apply` then shapes the audit:
+
+    AUDIT_LEVEL=summary   payloads reduced to ids, numbers, flags, short strings;
+                          long text/lists become {"len"/"count", "sha256"}
+    AUDIT_LEVEL=standard  long strings truncated to AUDIT_MAX_STR chars,
+                          lists to AUDIT_MAX_ITEMS items (default)
+    AUDIT_LEVEL=full      payloads as produced
+
+    AUDIT_SAMPLE="tool_call=0.1,retriever=0"   keep-rate per event type (default 1)
+
+Tickets that errored or escalated are always written in full and unsampled,
+so incident records are complete whatever the level.
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .metrics import metrics
+
+LEVELS = ("summary", "standard", "full")
+# event types that mark a ticket for full capture
+FULL_CAPTURE_TYPES = ("node_error", "escalation")
+
+AUDIT_EVENTS = metrics.counter("audit_events_total", "Audit events by type and result (kept/sampled_out)")
+
+_REANCHOR_SECONDS = 60.0
+_anchor = (time.time(), time.monotonic())
+
+
+def event(event_type: str, payload: Any) -> Dict[str, Any]:
+    """An audit event; 'mono' becomes an ISO 'ts' when the audit is persisted."""
+    return {"mono": time.monotonic(), "type": event_type, "payload": payload}
+
+
+def iso_ts(mono: float) -> str:
+    global _anchor
+    wall, base = _anchor
+    if mono - base > _REANCHOR_SECONDS:
+        _anchor = wall, base = time.time(), time.monotonic()
+    return datetime.utcfromtimestamp(wall + (mono - base)).isoformat()
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, rate = part.split("=", 1)
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()[:16]
+
+
+class AuditPolicy:
+    def __init__(self, level: str = None, sample: Dict[str, float] = None, max_str: int = None,
+                 max_items: int = None, summary_str: int = 120):
+        env = os.environ
+        self.level = (level or env.get("AUDIT_LEVEL", "standard")).lower()
+        if self.level not in LEVELS:
+            raise ValueError(f"AUDIT_LEVEL must be one of {LEVELS}, got {self.level!r}")
+        self.sample = sample if sample is not None else parse_sample_rates(env.get("AUDIT_SAMPLE", ""))
+        self.max_str = max_str if max_str is not None else int(env.get("AUDIT_MAX_STR", 1000))
+        self.max_items = max_items if max_items is not None else int(env.get("AUDIT_MAX_ITEMS", 20))
+        self.summary_str = summary_str
+
+    # -----------------------------------------------------------------
+    # per audit
+    # -----------------------------------------------------------------
+    def needs_full_capture(self, events: List[Dict[str, Any]]) -> bool:
+        for e in events:
+            etype = e.get("type") or ""
+            if etype in FULL_CAPTURE_TYPES or etype.endswith("_error"):
+                return True
+            if etype == "supervisor" and isinstance(e.get("payload"), dict) and e["payload"].get("escalate"):
+                return True
+        return False
+
+    def apply(self, audit: Dict[str, Any]) -> Dict[str, Any]:
+        events = audit.get("events") or []
+        full = self.level == "full" or self.needs_full_capture(events)
+        kept = []
+        for e in events:
+            etype = e.get("type")
+            rate = self.sample.get(etype, self.sample.get("*", 1.0))
+            if not full and rate < 1.0 and random.random() >= rate:
+                AUDIT_EVENTS.inc(type=etype, result="sampled_out")
+                continue
+            AUDIT_EVENTS.inc(type=etype, result="kept")
+            out = {"ts": e["ts"] if "ts" in e else iso_ts(e.get("mono", time.monotonic())), "type": etype,
+                   "payload": e.get("payload") if full else self.reduce(e.get("payload"))}
+            kept.append(out)
+        shaped = {**audit, "events": kept}
+        if not full:
+            shaped["level"] = self.level
+            if len(kept) < len(events):
+                shaped["sampled_out"] = len(events) - len(kept)
+        return shaped
+
+    # -----------------------------------------------------------------
+    # payloads
+    # -----------------------------------------------------------------
+    def reduce(self, value: Any, depth: int = 0) -> Any:
+        if self.level == "summary":
+            return self._summary(value, depth)
+        return self._standard(value, depth)
+
+    def _standard(self, value: Any, depth: int) -> Any:
+        if isinstance(value, str):
+            return value if len(value) <= self.max_str else value[:self.max_str] + f"...[+{len(value) - self.max_str}]"
+        if isinstance(value, dict):
+            return {k: self._standard(v, depth + 1) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            items = [self._standard(v, depth + 1) for v in value[:self.max_items]]
+            if len(value) > self.max_items:
+                items.append(f"...[+{len(value) - self.max_items} items]")
+            return items
+        return value
+
+    def _summary(self, value: Any, depth: int) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, str):
+            return value if len(value) <= self.summary_str else {"len": len(value), "sha256": _digest(value)}
+        if isinstance(value, dict) and depth < 2:
+            return {k: self._summary(v, depth + 1) for k, v in value.items()}
+        if isinstance(value, (list, tuple)) and len(value) <= self.max_items and all(
+                v is None or isinstance(v, (bool, int, float)) or (isinstance(v, str) and len(v) <= 64) for v in value):
+            return list(value)  # flags, scores, ids
+        text = json.dumps(value, default=str, sort_keys=True)
+        size = {"count": len(value)} if isinstance(value, (list, tuple, dict)) else {"len": len(text)}
+        return {**size, "sha256": _digest(text)}
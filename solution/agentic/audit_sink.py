@@ -0,0 +1,232 @@
+# agentic/audit_sink.py
+"""
+Buffered, rotating audit log writer.
+
+Audits are encoded into an in-memory buffer and appended to the current
+segment file (kept open) when the buffer reaches AUDIT_FLUSH_BYTES or is older
+than AUDIT_FLUSH_INTERVAL seconds, and on shutdown (atexit / close()).
+
+Each process writes its own numbered segments,
+    audit-<start time>-<pid>-<seq>.jsonl[.gz]
+so concurrent writers never interleave lines and need no locking. A segment is
+rotated at AUDIT_SEGMENT_BYTES or AUDIT_SEGMENT_SECONDS and optionally gzipped
+(AUDIT_GZIP=1). The legacy single audit.jsonl is still read as the oldest segment.
+
+Flush listeners (`add_listener`) receive (segment_path, [(offset, length, audit), ...])
+for every flushed batch; the audit index uses this to stay current.
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import multiprocessing.util
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metrics import metrics
+
+SEGMENT_PREFIX = "audit-"
+LEGACY_FILE = "audit.jsonl"
+
+AUDIT_FLUSHES = metrics.counter("audit_flushes_total", "Audit buffer flushes, by trigger (size/interval/close)")
+AUDIT_BYTES = metrics.counter("audit_bytes_written_total", "Audit bytes appended to segments")
+
+FlushListener = Callable[[str, List[Tuple[int, int, Dict[str, Any]]]], None]
+
+
+def list_segments(directory: str) -> List[str]:
+    """All readable segments, oldest first (legacy audit.jsonl first)."""
+    paths = []
+    legacy = os.path.join(directory, LEGACY_FILE)
+    if os.path.exists(legacy):
+        paths.append(legacy)
+    segments = glob.glob(os.path.join(directory, SEGMENT_PREFIX + "*.jsonl")) + \
+        glob.glob(os.path.join(directory, SEGMENT_PREFIX + "*.jsonl.gz"))
+    # "<start>-<pid>-<seq>" sorts chronologically; a .gz and its source never coexist
+    paths.extend(sorted(segments, key=lambda p: os.path.basename(p).replace(".gz", "")))
+    return paths
+
+
+def open_segment(path: str, mode: str = "rb"):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def iter_segment(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(offset, audit) for each parseable line; offsets are into the uncompressed stream."""
+    with open_segment(path) as f:
+        offset = 0
+        for line in f:
+            try:
+                yield offset, json.loads(line)
+            except Exception:
+                pass
+            offset += len(line)
+
+
+class AuditSink:
+    def __init__(self,
+                 directory: str,
+                 flush_bytes: int = None,
+                 flush_interval: float = None,
+                 segment_bytes: int = None,
+                 segment_seconds: float = None,
+                 compress: bool = None):
+        env = os.environ
+        self.directory = directory
+        self.flush_bytes = flush_bytes if flush_bytes is not None else int(env.get("AUDIT_FLUSH_BYTES", 65536))
+        self.flush_interval = flush_interval if flush_interval is not None \
+            else float(env.get("AUDIT_FLUSH_INTERVAL", 1.0))
+        self.segment_bytes = segment_bytes if segment_bytes is not None \
+            else int(env.get("AUDIT_SEGMENT_BYTES", 16 * 1024 * 1024))
+        self.segment_seconds = segment_seconds if segment_seconds is not None \
+            else float(env.get("AUDIT_SEGMENT_SECONDS", 3600))
+        self.compress = compress if compress is not None else env.get("AUDIT_GZIP", "0").lower() in ("1", "true", "yes")
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._listeners: List[FlushListener] = []
+        self._closed = False
+        self._start_process()
+        atexit.register(self.close)
+
+    def _start_process(self):
+        # (re)initialise per-process state; also runs in a forked child on first write
+        self._pid = os.getpid()
+        self._stamp = time.strftime("%Y%m%d%H%M%S")
+        self._seq = 0
+        self._buffer: List[Tuple[bytes, Dict[str, Any]]] = []
+        self._buffered_bytes = 0
+        self._buffer_since: Optional[float] = None
+        self._file = None
+        self._path: Optional[str] = None
+        self._segment_opened = 0.0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="audit-flush", daemon=True)
+        self._flusher.start()
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            self._lock = threading.RLock()
+            self._closed = False
+            self._start_process()
+            # multiprocessing workers leave via os._exit (no atexit), but do run these
+            multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def add_listener(self, listener: FlushListener):
+        self._listeners.append(listener)
+
+    @property
+    def current_segment(self) -> Optional[str]:
+        return self._path
+
+    # -----------------------------------------------------------------
+    # writing
+    # -----------------------------------------------------------------
+    def write(self, audit: Dict[str, Any]):
+        line = (json.dumps(audit, default=str) + "\n").encode("utf-8")
+        self._check_fork()
+        with self._lock:
+            self._buffer.append((line, audit))
+            self._buffered_bytes += len(line)
+            if self._buffer_since is None:
+                self._buffer_since = time.monotonic()
+            if self._buffered_bytes >= self.flush_bytes:
+                self._flush_locked("size")
+            elif self._closed:
+                # written after shutdown: no flusher thread any more
+                self._flush_locked("close")
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked("explicit")
+
+    def _flush_loop(self):
+        tick = max(0.05, min(self.flush_interval, 1.0))
+        while not self._stop.wait(tick):
+            with self._lock:
+                if self._buffer_since is not None and time.monotonic() - self._buffer_since >= self.flush_interval:
+                    self._flush_locked("interval")
+                elif self._file is not None and not self._buffer and self._segment_expired():
+                    self._rotate_locked()
+
+    def _segment_expired(self) -> bool:
+        return bool(self.segment_seconds) and time.time() - self._segment_opened >= self.segment_seconds
+
+    def _open_segment_locked(self):
+        self._seq += 1
+        name = f"{SEGMENT_PREFIX}{self._stamp}-{self._pid}-{self._seq:06d}.jsonl"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, "ab")
+        self._segment_opened = time.time()
+
+    def _rotate_locked(self):
+        if self._file is None:
+            return
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        if self.compress:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+
+    def _flush_locked(self, trigger: str):
+        if not self._buffer:
+            return
+        if self._file is not None and (self._file.tell() >= self.segment_bytes or self._segment_expired()):
+            self._rotate_locked()
+        if self._file is None:
+            self._open_segment_locked()
+        offset = self._file.tell()
+        entries = []
+        for line, audit in self._buffer:
+            entries.append((offset, len(line), audit))
+            offset += len(line)
+        self._file.write(b"".join(line for line, _ in self._buffer))
+        self._file.flush()
+        AUDIT_FLUSHES.inc(trigger=trigger)
+        AUDIT_BYTES.inc(self._buffered_bytes)
+        self._buffer, self._buffered_bytes, self._buffer_since = [], 0, None
+        path = self._path
+        for listener in self._listeners:
+            try:
+                listener(path, entries)
+            except Exception:
+                pass
+
+    def close(self):
+        """Flush and close the current segment (registered with atexit)."""
+        if self._closed or os.getpid() != self._pid:
+            return
+        self._stop.set()
+        with self._lock:
+            self._flush_locked("close")
+            self._rotate_locked()
+            self._closed = True
+
+    # -----------------------------------------------------------------
+    # reading
+    # -----------------------------------------------------------------
+    def segments(self) -> List[str]:
+        return list_segments(self.directory)
+
+    def iter_audits(self) -> Iterable[Dict[str, Any]]:
+        self.flush()
+        for path in self.segments():
+            for _, audit in iter_segment(path):
+                yield audit
+
+    def read_at(self, path: str, offset: int, length: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Read the audit stored at `offset` in a segment (follows a segment to its .gz)."""
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            path = path + ".gz"
+        with open_segment(path) as f:
+            f.seek(offset)
+            line = f.read(length) if length else f.readline()
+        try:
+            return json.loads(line)
+        except Exception:
+            return None
@@ -0,0 +1,243 @@
+# agentic/db.py
+"""
+Process-wide SQLAlchemy engines, keyed by database URL.
+
+Every component that talks to the same database (MemoryRepository, the tools'
+CustomerData, utils.get_session) shares one pooled engine and one
+sessionmaker, and `ensure_schema` issues the CREATE TABLE checks once per
+database rather than once per repository. Read-only queries can be routed to
+replicas; writes and read-your-writes queries stay on the primary.
+
+    DB_POOL_SIZE=5
+    DB_MAX_OVERFLOW=10
+    DB_POOL_TIMEOUT=30           seconds to wait for a free connection
+    DB_POOL_RECYCLE=1800         server databases only (SQLite files never go stale)
+    DB_REPLICAS={"sqlite:///./data/core/memory.sqlite": ["sqlite:///./data/replica/memory.sqlite"]}
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import instrument_engine, metrics
+
+SCHEMA_ATTEMPTS = 5
+
+
+def url_key(url: str) -> str:
+    """Normalise a URL so './data/x.db' and 'data/x.db' share an engine."""
+    from sqlalchemy.engine import make_url
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database and parsed.database != ":memory:" \
+            and not parsed.database.startswith("file:"):
+        parsed = parsed.set(database=os.path.abspath(parsed.database))
+    return parsed.render_as_string(hide_password=False)
+
+
+def add_missing_columns(engine, tables: List[Any]) -> List[str]:
+    """
+    ALTER TABLE ... ADD COLUMN for nullable model columns an existing table lacks, then create their
+    indexes; returns "table.column" for each column added. Anything else needs a real migration.
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateColumn
+
+    added = []
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            missing = [c for c in table.columns if c.name not in existing]
+            for column in missing:
+                if not column.nullable or column.primary_key or column.server_default is not None:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+            if missing:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+    return added
+
+
+class EngineRegistry:
+    def __init__(self, pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30.0,
+                 pool_recycle: int = 1800, replicas: Dict[str, List[str]] = None):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.replicas = {url_key(url): list(urls) for url, urls in (replicas or {}).items()}
+        self._engines: Dict[str, Any] = {}
+        self._readers: Dict[str, Tuple[List[Any], Any]] = {}  # key -> (replica engines, round-robin cycle)
+        self._schemas = set()
+        self._sessionmakers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> "EngineRegistry":
+        return cls(
+            pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+            replicas=json.loads(os.environ.get("DB_REPLICAS") or "{}"),
+        )
+
+    def _create(self, url: str, **overrides):
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import make_url
+        from sqlalchemy.pool import StaticPool
+
+        kwargs: Dict[str, Any] = {"future": True}
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite":
+            if parsed.database in (None, "", ":memory:"):
+                # one shared connection, or every checkout would see a different empty database
+                kwargs.update(poolclass=StaticPool, connect_args={"check_same_thread": False})
+            else:
+                kwargs.update(pool_size=self.pool_size, max_overflow=self.max_overflow,
+                              pool_timeout=self.pool_timeout, connect_args={"timeout": 30})
+        else:
+            kwargs.update(pool_size=self.pool_size, max_overflow=self.max_overflow, pool_timeout=self.pool_timeout,
+                          pool_recycle=self.pool_recycle, pool_pre_ping=True)
+        kwargs.update(overrides)
+        return instrument_engine(create_engine(url, **kwargs))
+
+    def engine(self, url: str, **overrides):
+        """The shared primary engine for `url`; `overrides` (create_engine kwargs) only apply on first use."""
+        key = url_key(url)
+        engine = self._engines.get(key)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(key)
+                if engine is None:
+                    engine = self._engines[key] = self._create(url, **overrides)
+        return engine
+
+    def reader(self, url: str):
+        """An engine for read-only queries: the next replica of `url`, or the primary if it has none."""
+        key = url_key(url)
+        if key not in self.replicas:
+            return self.engine(url)
+        entry = self._readers.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._readers.get(key)
+                if entry is None:
+                    engines = [self.engine(replica) for replica in self.replicas[key]]
+                    entry = self._readers[key] = (engines, itertools.cycle(engines))
+        with self._lock:
+            return next(entry[1])
+
+    def ensure_schema(self, url: str, metadata, tables: List[Any] = None):
+        """
+        create_all(checkfirst) once per (database, metadata, tables) for the life of the process,
+        plus additive upgrades of existing tables (see add_missing_columns).
+        """
+        key = (url_key(url), id(metadata), tuple(t.name for t in tables) if tables else None)
+        if key in self._schemas:
+            return
+        with self._lock:
+            if key not in self._schemas:
+                from sqlalchemy.exc import OperationalError, ProgrammingError
+
+                engine = self.engine(url)
+                for attempt in range(SCHEMA_ATTEMPTS):
+                    try:
+                        metadata.create_all(engine, tables=tables, checkfirst=True)
+                        add_missing_columns(engine, tables or metadata.sorted_tables)
+                        break
+                    except (OperationalError, ProgrammingError):
+                        # another process created a table/column between our check and our DDL
+                        # (workers starting on a fresh database); the next pass sees it
+                        if attempt == SCHEMA_ATTEMPTS - 1:
+                            raise
+                        time.sleep(0.05 * (attempt + 1))
+                self._schemas.add(key)
+
+    def sessionmaker(self, bind):
+        """Cached sessionmaker for an engine (or a URL, which resolves to its primary engine)."""
+        from sqlalchemy.orm import sessionmaker
+
+        engine = self.engine(bind) if isinstance(bind, str) else bind
+        factory = self._sessionmakers.get(engine)
+        if factory is None:
+            with self._lock:
+                factory = self._sessionmakers.get(engine)
+                if factory is None:
+                    factory = self._sessionmakers[engine] = sessionmaker(bind=engine, expire_on_commit=False)
+        return factory
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for key, engine in list(self._engines.items()):
+            pool = engine.pool
+            entry: Dict[str, Any] = {"pool": type(pool).__name__, "replicas": len(self.replicas.get(key, []))}
+            if hasattr(pool, "checkedout"):
+                entry.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(),
+                             overflow=max(0, pool.overflow()))
+            out[engine.url.render_as_string(hide_password=True)] = entry
+        return out
+
+    def totals(self) -> Dict[str, float]:
+        """Pool counters summed over all engines (exported as db_pool_* gauges)."""
+        totals = {"engines": 0, "checked_out": 0, "checked_in": 0, "overflow": 0}
+        for entry in self.stats().values():
+            totals["engines"] += 1
+            for name in ("checked_out", "checked_in", "overflow"):
+                totals[name] += entry.get(name, 0)
+        return totals
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._readers.clear()
+            self._schemas.clear()
+
+
+_shared: Optional[EngineRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def get_engines() -> EngineRegistry:
+    """Process-wide registry (built from the DB_* environment on first use)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = EngineRegistry.from_env()
+                metrics.register_collector("db_pool", _shared.totals)
+    return _shared
+
+
+def get_engine(url: str, **overrides):
+    return get_engines().engine(url, **overrides)
+
+
+def get_read_engine(url: str):
+    return get_engines().reader(url)
+
+
+def ensure_schema(url: str, metadata, tables: List[Any] = None):
+    get_engines().ensure_schema(url, metadata, tables)
+
+
+def session_factory(bind):
+    return get_engines().sessionmaker(bind)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return get_engines().stats() if _shared is not None else {}
+
+
+def dispose_engines():
+    if _shared is not None:
+        _shared.dispose()
@@ -0,0 +1,207 @@
+# agentic/idempotency.py
+"""
+Idempotent ticket processing.
+
+A submission is identified by its ticket_id plus a hash of its content (text,
+user, session, attachments, ...) and of its per-submission `message_id` /
+`created_at`, so a client retry of the same submission does not re-run the graph (and re-append STM/message/LTM/audit rows). A repeat gets
+the stored orchestrator result; a repeat that arrives while the first run is
+still in flight waits for it (request coalescing) instead of running twice.
+
+Entries expire after IDEMPOTENCY_TTL_SECONDS (0 disables the layer). A repeat
+waits at most IDEMPOTENCY_WAIT_SECONDS for the in-flight run, then fails with
+IdempotencyWaitTimeout rather than running the ticket a second time. Coalescing
+is per process; set IDEMPOTENCY_DB to also replay finished results across
+processes (e.g. several service workers) from a small SQLite table.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .metrics import metrics, record_cache
+
+class IdempotencyWaitTimeout(TimeoutError):
+    """Raised when a repeated submission gives up waiting for the in-flight run."""
+
+
+DEDUP = metrics.counter("idempotency_requests_total", "Ticket submissions by idempotency outcome (miss/hit/coalesced)")
+
+# ticket fields that make two submissions "the same request"; clients that reuse one ticket_id
+# for a whole conversation (chat) send a fresh message_id or created_at per turn, so a repeated
+# "yes" is a new turn while a retry of the same turn still collapses
+_HASHED_FIELDS = ("text", "user_id", "platform", "attachments", "created_at", "message_id")
+
+
+def content_hash(ticket: Dict[str, Any], session_id: Optional[str] = None) -> str:
+    metadata = ticket.get("metadata") or {}
+    body = {k: ticket.get(k) for k in _HASHED_FIELDS}
+    body["thread_id"] = session_id or metadata.get("thread_id")
+    raw = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class _Entry:
+    __slots__ = ("done", "result", "error", "expires_at")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.expires_at = float("inf")
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 10000, db_path: Optional[str] = None,
+                 wait_timeout: float = 120.0):
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        return cls(
+            ttl_seconds=float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 300)),
+            max_entries=int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000)),
+            db_path=os.environ.get("IDEMPOTENCY_DB") or None,
+            wait_timeout=float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 120)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def key(self, ticket: Dict[str, Any], session_id: Optional[str] = None) -> Optional[str]:
+        ticket_id = ticket.get("ticket_id")
+        if not ticket_id:
+            return None
+        return f"{ticket_id}:{content_hash(ticket, session_id)}"
+
+    # -----------------------------------------------------------------
+    # persistent replay (optional)
+    # -----------------------------------------------------------------
+    def _db_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._conn is None:
+            return None
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT result FROM idempotency WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _db_put(self, key: str, result: Dict[str, Any]):
+        if self._conn is None:
+            return
+        with self._db_lock:
+            self._conn.execute("INSERT OR REPLACE INTO idempotency (key, result, expires_at) VALUES (?, ?, ?)",
+                               (key, json.dumps(result, default=str), time.time() + self.ttl_seconds))
+
+    def prune_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e.done.is_set() and e.expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+        return len(expired)
+
+    # -----------------------------------------------------------------
+    # main entry point
+    # -----------------------------------------------------------------
+    def run(self, ticket: Dict[str, Any], session_id: Optional[str],
+            fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Return (result, info). `fn` is only called when no live entry exists for
+        the ticket; info["status"] is "miss", "hit" (stored result) or
+        "coalesced" (waited on an in-flight run). Failed runs are not stored.
+        A coalesced wait longer than `wait_timeout` raises IdempotencyWaitTimeout.
+        """
+        key = self.key(ticket, session_id) if self.enabled else None
+        if key is None:
+            return fn(), {"status": "disabled", "key": None}
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.done.is_set() and entry.expires_at <= time.time():
+                del self._entries[key]
+                entry = None
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+                self._evict()
+            else:
+                self._entries.move_to_end(key)
+
+        if not owner:
+            status = "hit" if entry.done.is_set() else "coalesced"
+            if not entry.done.wait(self.wait_timeout):
+                DEDUP.inc(status="wait_timeout")
+                raise IdempotencyWaitTimeout(f"ticket {key} still in flight after {self.wait_timeout:g}s")
+            if entry.error is not None:
+                raise entry.error
+            return self._replay(entry.result, key, status)
+
+        stored = self._db_get(key)
+        if stored is not None:
+            self._finish(key, entry, result=stored)
+            return self._replay(stored, key, "hit")
+
+        DEDUP.inc(status="miss")
+        record_cache("idempotency", False)
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._finish(key, entry, error=exc)
+            raise
+        # callers may mutate their result; waiters and later hits replay an untouched copy
+        self._finish(key, entry, result=copy.deepcopy(result))
+        self._db_put(key, result)
+        return result, {"status": "miss", "key": key}
+
+    def _evict(self):
+        """Drop the least recently used finished entries over max_entries (caller holds _lock)."""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        # in-flight entries stay: evicting one would let its duplicates run the graph again
+        for k in [k for k, e in self._entries.items() if e.done.is_set()][:excess]:
+            del self._entries[k]
+
+    def _finish(self, key: str, entry: _Entry, result: Dict[str, Any] = None, error: BaseException = None):
+        entry.result, entry.error = result, error
+        entry.expires_at = time.time() + self.ttl_seconds
+        if error is not None:
+            # don't cache failures: waiters see the error, the next retry runs again
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+        entry.done.set()
+
+    def _replay(self, result: Dict[str, Any], key: str, status: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        DEDUP.inc(status=status)
+        record_cache("idempotency", True)
+        return copy.deepcopy(result), {"status": status, "key": key}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,216 @@
+# agentic/llm.py
+"""
+LLM factory plus a deterministic offline stand-in for benchmarking.
+
+`get_llm()` returns a ChatOpenAI client by default. Setting LLM_MODEL to
+"fake" (or "fake:<latency spec>") returns a FakeChatModel instead, so the
+whole graph can be exercised and load-tested without network access.
+
+Latency spec examples (also read from FAKE_LLM_LATENCY):
+    fixed:seconds=0.2
+    lognormal:median=0.8,sigma=0.4
+    lognormal:median=0.8,sigma=0.4,spike_prob=0.02,spike_factor=10,per_token=0.005
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+@dataclass
+class LatencyProfile:
+    """Simulated response latency: time-to-first-token plus per-token delay."""
+    kind: str = "fixed"          # fixed | lognormal
+    seconds: float = 0.0         # fixed latency, or the median for lognormal
+    sigma: float = 0.5           # lognormal shape
+    spike_prob: float = 0.0      # probability of a tail spike per call
+    spike_factor: float = 10.0   # latency multiplier applied on a spike
+    per_token: float = 0.0       # inter-token delay while streaming
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> "LatencyProfile":
+        if not spec:
+            return cls()
+        kind, _, args = spec.partition(":")
+        kind = kind.strip() or "fixed"
+        if kind not in ("fixed", "lognormal"):
+            raise ValueError(f"Unknown latency profile '{kind}'")
+        profile = cls(kind=kind)
+        for part in filter(None, (p.strip() for p in args.split(","))):
+            key, _, value = part.partition("=")
+            key = "seconds" if key.strip() == "median" else key.strip()
+            if key not in ("seconds", "sigma", "spike_prob", "spike_factor", "per_token"):
+                raise ValueError(f"Unknown latency parameter '{key}'")
+            setattr(profile, key, float(value))
+        return profile
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "lognormal" and self.seconds > 0:
+            delay = rng.lognormvariate(0.0, self.sigma) * self.seconds
+        else:
+            delay = self.seconds
+        if self.spike_prob and rng.random() < self.spike_prob:
+            delay *= self.spike_factor
+        return delay
+
+
+def _estimate_tokens(text: str) -> int:
+    # rough whitespace tokenization is enough for relative prompt-size tracking
+    return len(text.split())
+
+
+class FakeChatModel:
+    """
+    Drop-in replacement for ChatOpenAI's invoke/stream surface.
+    Answers are templated from the prompt so identical prompts always
+    produce identical responses; latency comes from a LatencyProfile.
+    """
+
+    model_name = "fake"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, seed: int = 0, history_size: int = 1000):
+        self.profile = profile or LatencyProfile()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._history_size = history_size
+        self.reset_stats()
+
+    # -----------------------------------------------------------------
+    # stats
+    # -----------------------------------------------------------------
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.stream_calls = 0
+            self.prompt_chars = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.simulated_latency = 0.0
+            self.prompt_sizes: List[int] = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = sorted(self.prompt_sizes)
+            return {
+                "calls": self.calls,
+                "stream_calls": self.stream_calls,
+                "prompt_chars": self.prompt_chars,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "simulated_latency_s": round(self.simulated_latency, 6),
+                "avg_prompt_chars": (self.prompt_chars / self.calls) if self.calls else 0,
+                "max_prompt_chars": sizes[-1] if sizes else 0,
+                "profile": asdict(self.profile),
+            }
+
+    def _record(self, prompt: str, answer: str, delay: float, streamed: bool):
+        with self._lock:
+            self.calls += 1
+            self.stream_calls += int(streamed)
+            self.prompt_chars += len(prompt)
+            self.prompt_tokens += _estimate_tokens(prompt)
+            self.completion_tokens += _estimate_tokens(answer)
+            self.simulated_latency += delay
+            self.prompt_sizes.append(len(prompt))
+            if len(self.prompt_sizes) > self._history_size:
+                del self.prompt_sizes[: len(self.prompt_sizes) - self._history_size]
+
+    def _sample_delay(self) -> float:
+        with self._lock:
+            return self.profile.sample(self._rng)
+
+    # -----------------------------------------------------------------
+    # answer generation
+    # -----------------------------------------------------------------
+    @staticmethod
+    def _prompt_text(prompt: Any) -> str:
+        if isinstance(prompt, str):
+            return prompt
+        if isinstance(prompt, (list, tuple)):
+            return "\n".join(FakeChatModel._prompt_text(m) for m in prompt)
+        return str(getattr(prompt, "content", prompt))
+
+    @staticmethod
+    def render_answer(prompt: str) -> str:
+        match = re.search(r"### Customer's Latest Message\s*\n(.*?)(?:\n###|\Z)", prompt, re.S)
+        message = (match.group(1) if match else prompt).strip()
+        lowered = message.lower()
+        has_context = "### Knowledge Base Articles" in prompt or "### Similar Past Resolved Cases" in prompt
+        if "refund" in lowered:
+            answer = ("Thanks for reaching out about your refund. "
+                      "I can help process that refund for you. Would you like me to proceed?")
+        elif "reserv" in lowered or "book" in lowered:
+            answer = ("You can reserve an experience by opening the CultPass app, selecting your "
+                      "desired event, and tapping 'Reserve'.")
+        elif "login" in lowered or "password" in lowered:
+            answer = "Please try resetting your password from the login screen; if that fails we will escalate to our team."
+        else:
+            answer = "Thank you for contacting CultPass support. Here is what I found about your request."
+        if has_context:
+            answer += " (based on our help articles)"
+        return answer
+
+    def _message(self, content: str, prompt: str, chunk: bool = False):
+        from langchain_core.messages import AIMessage, AIMessageChunk
+
+        cls = AIMessageChunk if chunk else AIMessage
+        usage = None
+        if not chunk:
+            p_tok, c_tok = _estimate_tokens(prompt), _estimate_tokens(content)
+            usage = {"input_tokens": p_tok, "output_tokens": c_tok, "total_tokens": p_tok + c_tok}
+        return cls(content=content, usage_metadata=usage, response_metadata={"model_name": self.model_name})
+
+    # -----------------------------------------------------------------
+    # chat model surface
+    # -----------------------------------------------------------------
+    def invoke(self, prompt: Any, config: Optional[Dict[str, Any]] = None, **kwargs):
+        text = self._prompt_text(prompt)
+        answer = self.render_answer(text)
+        delay = self._sample_delay()
+        tokens = answer.split(" ")
+        delay += self.profile.per_token * len(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        self._record(text, answer, delay, streamed=False)
+        return self._message(answer, text)
+
+    def stream(self, prompt: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[Any]:
+        text = self._prompt_text(prompt)
+        answer = self.render_answer(text)
+        first = self._sample_delay()
+        if first > 0:
+            time.sleep(first)
+        tokens = answer.split(" ")
+        for i, tok in enumerate(tokens):
+            if i and self.profile.per_token > 0:
+                time.sleep(self.profile.per_token)
+            yield self._message(tok if i == 0 else " " + tok, text, chunk=True)
+        self._record(text, answer, first + self.profile.per_token * max(len(tokens) - 1, 0), streamed=True)
+
+    def batch(self, prompts: List[Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        return [self.invoke(p, config=config, **kwargs) for p in prompts]
+
+
+def get_llm(model: Optional[str] = None, temperature: Optional[float] = None):
+    """
+    Build the chat model selected by LLM_MODEL.
+    "fake" / "fake:<latency spec>" returns a FakeChatModel; anything else is
+    passed to ChatOpenAI as the model name.
+    """
+    model = model or os.environ.get("LLM_MODEL", DEFAULT_MODEL)
+    if model == "fake" or model.startswith("fake:"):
+        spec = model.partition(":")[2] or os.environ.get("FAKE_LLM_LATENCY", "")
+        seed = int(os.environ.get("FAKE_LLM_SEED", 0))
+        return FakeChatModel(profile=LatencyProfile.parse(spec), seed=seed)
+
+    from langchain_openai import ChatOpenAI
+
+    if temperature is None:
+        temperature = float(os.environ.get("LLM_TEMP", 0))
+    return ChatOpenAI(model_name=model, temperature=temperature)
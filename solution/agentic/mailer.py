@@ -0,0 +1,465 @@
+# agentic/mailer.py
+"""
+Outbound mail: durable SQLite outbox + background SMTP dispatcher.
+
+`send_email` (tools/send_email.py) only inserts into the outbox and returns
+the message id; nothing on the ticket path talks to SMTP. The Dispatcher
+thread claims queued messages in batches, sends them over a small pool of
+kept-alive SMTP connections (re-connecting when the server drops one),
+throttles with a token bucket, and retries transient failures with
+exponential backoff. 5xx rejections fail the message immediately.
+
+Every process may run a dispatcher against the same outbox: a claimed message
+holds a lease (`claimed_at`) and is only taken back by another dispatcher once
+the lease has expired, i.e. its claimer died mid-batch.
+
+    MAIL_OUTBOX_DB=./data/core/outbox.sqlite
+    SMTP_HOST=localhost  SMTP_PORT=1025  SMTP_USER=  SMTP_PASSWORD=  SMTP_STARTTLS=0
+    SMTP_FROM=support@cultpass.example
+    SMTP_POOL_SIZE=2  MAIL_BATCH_SIZE=50  MAIL_RATE_PER_SECOND=10  MAIL_MAX_ATTEMPTS=5
+    MAIL_LEASE_SECONDS=300       longer than a batch can take to send
+
+A stand-in SMTP server that keeps messages in memory (for local runs):
+
+    cd solution
+    python -m agentic.mailer sink --port 1025
+    python -m agentic.mailer stats
+"""
+
+import argparse
+import os
+import queue
+import smtplib
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+from .metrics import metrics
+
+MAIL_SENT = metrics.counter("mail_messages_total", "Outbox messages by result (sent/retry/failed)")
+MAIL_BATCH = metrics.histogram("mail_batch_seconds", "Time to send one claimed outbox batch")
+MAIL_CONNECTS = metrics.counter("mail_smtp_connects_total", "SMTP connections opened by the pool")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    to_addr TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class Outbox:
+    def __init__(self, path: str, lease: float = 300.0):
+        self.path = path
+        self.lease = lease
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        if "claimed_at" not in columns:  # outbox created before leases
+            try:
+                self.conn.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+
+    def enqueue(self, to: str, subject: str, body: str) -> str:
+        message_id = f"msg-{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO outbox (id, to_addr, subject, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (message_id, to, subject, body, now, now))
+        return message_id
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` due messages (oldest first) and return them; messages whose lease
+        expired while 'sending' (their dispatcher died) are due again.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, claimed_at = ? WHERE id IN ("
+                " SELECT id FROM outbox WHERE (status = 'queued' AND next_attempt_at <= ?)"
+                " OR (status = 'sending' AND claimed_at < ?)"
+                " ORDER BY next_attempt_at LIMIT ?) "
+                "RETURNING id, to_addr, subject, body, attempts",
+                (now, now, now - self.lease, limit)).fetchall()
+        return [dict(zip(("id", "to", "subject", "body", "attempts"), r)) for r in rows]
+
+    def mark_sent(self, message_id: str):
+        with self._lock:
+            self.conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                              (time.time(), message_id))
+
+    def mark_retry(self, message_id: str, error: str, delay: float):
+        with self._lock:
+            self.conn.execute("UPDATE outbox SET status = 'queued', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                              (time.time() + delay, error, message_id))
+
+    def mark_failed(self, message_id: str, error: str):
+        with self._lock:
+            self.conn.execute("UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, message_id))
+
+    def recover(self) -> int:
+        """
+        Requeue messages left 'sending' by a dispatcher that died mid-batch: only expired leases,
+        since other live dispatchers may be sending the rest right now.
+        """
+        with self._lock:
+            return self.conn.execute(
+                "UPDATE outbox SET status = 'queued' WHERE status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)",
+                (time.time() - self.lease,)).rowcount
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT id, to_addr, status, attempts, last_error, sent_at FROM outbox WHERE id = ?",
+                                    (message_id,)).fetchone()
+        return dict(zip(("id", "to", "status", "attempts", "last_error", "sent_at"), row)) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class RateLimiter:
+    """Token bucket: `rate` tokens per second, at most `burst` banked."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPPool:
+    """Kept-alive SMTP connections; a connection idle longer than `idle_check` is NOOP-probed before reuse."""
+
+    def __init__(self, host: str, port: int, size: int = 2, username: str = None, password: str = None,
+                 starttls: bool = False, timeout: float = 30.0, idle_check: float = 30.0):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls, self.timeout, self.idle_check = starttls, timeout, idle_check
+        self.size = size
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put((None, 0.0))
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        MAIL_CONNECTS.inc()
+        return conn
+
+    def send(self, message: EmailMessage):
+        conn, last_used = self._idle.get()
+        try:
+            if conn is not None and time.monotonic() - last_used > self.idle_check:
+                try:
+                    conn.noop()
+                except smtplib.SMTPException:
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+            try:
+                conn.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # server closed an idle connection: one fresh attempt
+                conn = self._connect()
+                conn.send_message(message)
+        except Exception:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            self._idle.put((conn, time.monotonic()))
+
+    @staticmethod
+    def _discard(conn: Optional[smtplib.SMTP]):
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self):
+        for _ in range(self.size):
+            conn, _ = self._idle.get()
+            if conn is not None:
+                try:
+                    conn.quit()
+                except Exception:
+                    self._discard(conn)
+            self._idle.put((None, 0.0))
+
+
+def _permanent(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(exc, "smtp_code", None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+class Dispatcher:
+    def __init__(self, outbox: Outbox, pool: SMTPPool, sender: str, batch_size: int = 50, rate: float = 10.0,
+                 max_attempts: int = 5, poll_interval: float = 0.5, backoff: float = 2.0):
+        self.outbox = outbox
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._senders = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="smtp")
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Dispatcher":
+        self.outbox.recover()
+        self._thread = threading.Thread(target=self._loop, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def notify(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            sent = self.dispatch_once()
+            if sent < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def dispatch_once(self) -> int:
+        batch = self.outbox.claim(self.batch_size)
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        list(self._senders.map(self._send_one, batch))
+        MAIL_BATCH.observe(time.perf_counter() - started)
+        return len(batch)
+
+    def _send_one(self, item: Dict[str, Any]):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = item["to"]
+        message["Subject"] = item["subject"]
+        message["Message-ID"] = f"<{item['id']}@{self.sender.split('@')[-1]}>"
+        message.set_content(item["body"])
+        self.limiter.acquire()
+        try:
+            self.pool.send(message)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if _permanent(exc) or item["attempts"] >= self.max_attempts:
+                self.outbox.mark_failed(item["id"], error)
+                MAIL_SENT.inc(result="failed")
+            else:
+                self.outbox.mark_retry(item["id"], error, self.backoff ** item["attempts"])
+                MAIL_SENT.inc(result="retry")
+            return
+        self.outbox.mark_sent(item["id"])
+        MAIL_SENT.inc(result="sent")
+
+    def stop(self, drain: bool = True, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if drain:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline and self.dispatch_once():
+                pass
+        self._senders.shutdown(wait=True)
+        self.pool.close()
+
+
+class Mailer:
+    """Outbox plus (optionally) the dispatcher running in this process."""
+
+    def __init__(self, outbox: Outbox, dispatcher: Optional[Dispatcher] = None):
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+
+    @classmethod
+    def from_env(cls, start_dispatcher: bool = None) -> "Mailer":
+        env = os.environ
+        outbox = Outbox(env.get("MAIL_OUTBOX_DB", "./data/core/outbox.sqlite"),
+                        lease=float(env.get("MAIL_LEASE_SECONDS", 300)))
+        if start_dispatcher is None:
+            start_dispatcher = env.get("MAIL_DISPATCHER", "1").lower() in ("1", "true", "yes")
+        dispatcher = None
+        if start_dispatcher:
+            pool = SMTPPool(env.get("SMTP_HOST", "localhost"), int(env.get("SMTP_PORT", 1025)),
+                            size=int(env.get("SMTP_POOL_SIZE", 2)),
+                            username=env.get("SMTP_USER") or None, password=env.get("SMTP_PASSWORD") or None,
+                            starttls=env.get("SMTP_STARTTLS", "0").lower() in ("1", "true", "yes"))
+            dispatcher = Dispatcher(outbox, pool, env.get("SMTP_FROM", "support@cultpass.example"),
+                                    batch_size=int(env.get("MAIL_BATCH_SIZE", 50)),
+                                    rate=float(env.get("MAIL_RATE_PER_SECOND", 10)),
+                                    max_attempts=int(env.get("MAIL_MAX_ATTEMPTS", 5))).start()
+        return cls(outbox, dispatcher)
+
+    def enqueue(self, to: str, subject: str, body: str) -> str:
+        message_id = self.outbox.enqueue(to, subject, body)
+        if self.dispatcher is not None:
+            self.dispatcher.notify()
+        return message_id
+
+    def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        self.outbox.close()
+
+
+_mailer: Optional[Mailer] = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer() -> Mailer:
+    global _mailer
+    if _mailer is None:
+        with _mailer_lock:
+            if _mailer is None:
+                _mailer = Mailer.from_env()
+    return _mailer
+
+
+def close_mailer():
+    """Stop the dispatcher (draining due messages) if this process started one."""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is not None:
+            _mailer.close()
+            _mailer = None
+
+
+# ---------------------------------------------------------------------
+# local stand-in SMTP server
+# ---------------------------------------------------------------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        server: "LocalSMTPServer" = self.server
+        self._reply("220 localhost stand-in SMTP")
+        mail_from, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("utf-8", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                mail_from, rcpts = cmd[10:].strip(), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                rcpt = cmd[8:].strip().strip("<>")
+                if rcpt in server.reject:
+                    self._reply("550 mailbox unavailable")
+                else:
+                    rcpts.append(rcpt)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                with server.lock:
+                    server.messages.append({"from": mail_from, "to": rcpts, "data": b"".join(data)})
+                self._reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Minimal SMTP sink that keeps received messages in `messages` (for local runs and benchmarks)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, reject=()):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages: List[Dict[str, Any]] = []
+        self.reject = set(reject)
+        self.lock = threading.Lock()
+
+    def start(self) -> "LocalSMTPServer":
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Outbound mail outbox")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sink = sub.add_parser("sink", help="run the stand-in SMTP server")
+    sink.add_argument("--host", default="127.0.0.1")
+    sink.add_argument("--port", type=int, default=1025)
+    sub.add_parser("stats", help="outbox message counts by status")
+    args = parser.parse_args(argv)
+
+    if args.command == "sink":
+        server = LocalSMTPServer(args.host, args.port)
+        print(f"SMTP sink listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"received {len(server.messages)} messages")
+    else:
+        print(Mailer.from_env(start_dispatcher=False).outbox.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# agentic/memory/checkpointer.py
+"""
+Bounded, persistent LangGraph checkpointer.
+
+SQLiteCheckpointer stores each checkpoint (full channel values, serialized with
+LangGraph's serde and zlib-compressed above a size threshold) in a local SQLite
+file, keeps only the last N checkpoints per thread, and prunes checkpoints older
+than a TTL. `make_checkpointer()` picks the backend from CHECKPOINT_BACKEND
+("sqlite" by default, or "memory" for the old unbounded MemorySaver).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from ..metrics import CHECKPOINT_BYTES
+
+DEFAULT_CHECKPOINT_DB = "./data/core/checkpoints.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    raw_size INTEGER NOT NULL DEFAULT 0,
+    stored_size INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS ix_checkpoints_created ON checkpoints (created_at);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# payloads at or above this size are zlib-compressed (type gets a "+z" suffix)
+COMPRESS_MIN_BYTES = 512
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    def __init__(self,
+                 path: str = None,
+                 keep_last: int = None,
+                 ttl_seconds: float = None,
+                 prune_every: int = 100,
+                 serde=None):
+        super().__init__(serde=serde)
+        self.path = path or os.environ.get("CHECKPOINT_DB") or DEFAULT_CHECKPOINT_DB
+        self.keep_last = keep_last if keep_last is not None else int(os.environ.get("CHECKPOINT_KEEP_LAST", 5))
+        ttl = ttl_seconds if ttl_seconds is not None else os.environ.get("CHECKPOINT_TTL_SECONDS")
+        self.ttl_seconds = float(ttl) if ttl else None
+        self.prune_every = prune_every
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._puts = 0
+
+    @contextmanager
+    def _tx(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    # -----------------------------------------------------------------
+    # compact serialization
+    # -----------------------------------------------------------------
+    def _dump(self, obj: Any) -> Tuple[str, bytes, int]:
+        type_, data = self.serde.dumps_typed(obj)
+        raw = len(data)
+        if raw >= COMPRESS_MIN_BYTES:
+            packed = zlib.compress(data, 6)
+            if len(packed) < raw:
+                return type_ + "+z", packed, raw
+        return type_, data, raw
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith("+z"):
+            type_, data = type_[:-2], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # -----------------------------------------------------------------
+    # BaseCheckpointSaver API
+    # -----------------------------------------------------------------
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, blob, m_type, m_blob = row
+        with self._lock:
+            writes = self.conn.execute(
+                "SELECT task_id, channel, type, value, task_path, idx FROM writes "
+                "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[4], w[0], w[5]))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=self._load(type_, blob),
+            metadata=self._load(m_type, m_blob),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(w[0], w[1], self._load(w[2], w[3])) for w in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        cols = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {cols} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {cols} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+        return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self,
+             config: Optional[RunnableConfig],
+             *,
+             filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns=?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id<?")
+            params.append(before_id)
+        sql = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+               "metadata_type, metadata FROM checkpoints")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            tup = self._tuple(row[0], row[1], row[2:])
+            if filter and not all(tup.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield tup
+
+    def put(self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, blob, raw = self._dump(checkpoint)
+        CHECKPOINT_BYTES.observe(raw)
+        m_type, m_blob, m_raw = self._dump(get_checkpoint_metadata(config, metadata))
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata, raw_size, stored_size, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, blob, m_type, m_blob, raw + m_raw, len(blob) + len(m_blob), time.time()),
+            )
+            self._enforce_retention(conn, thread_id, checkpoint_ns)
+        self._puts += 1
+        if self.ttl_seconds and self.prune_every and self._puts % self.prune_every == 0:
+            self.prune_expired()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self,
+                   config: RunnableConfig,
+                   writes: Sequence[Tuple[str, Any]],
+                   task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # special writes (errors, interrupts; negative idx) overwrite, regular ones are write-once
+        rows = {"INSERT OR REPLACE": [], "INSERT OR IGNORE": []}
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob, _ = self._dump(value)
+            w_idx = WRITES_IDX_MAP.get(channel, idx)
+            rows["INSERT OR REPLACE" if w_idx < 0 else "INSERT OR IGNORE"].append(
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, w_idx, channel, type_, blob, task_path))
+        with self._tx() as conn:
+            for verb, batch in rows.items():
+                if batch:
+                    conn.executemany(
+                        f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                        "type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        batch,
+                    )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE thread_id=?", (thread_id,))
+            conn.execute("DELETE FROM writes WHERE thread_id=?", (thread_id,))
+
+    # async variants delegate to the sync implementation (SQLite calls are short)
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for tup in self.list(config, filter=filter, before=before, limit=limit):
+            yield tup
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    # -----------------------------------------------------------------
+    # retention / pruning
+    # -----------------------------------------------------------------
+    def _enforce_retention(self, conn, thread_id: str, checkpoint_ns: str):
+        if not self.keep_last or self.keep_last <= 0:
+            return
+        stale = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last),
+        ).fetchall()
+        if stale:
+            self._delete_checkpoints(conn, thread_id, checkpoint_ns, [r[0] for r in stale])
+
+    @staticmethod
+    def _delete_checkpoints(conn, thread_id: str, checkpoint_ns: str, ids):
+        params = [(thread_id, checkpoint_ns, cid) for cid in ids]
+        conn.executemany("DELETE FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?", params)
+        conn.executemany("DELETE FROM writes WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?", params)
+
+    def prune_expired(self, ttl_seconds: float = None) -> int:
+        """Delete checkpoints (and their writes) older than the TTL. Returns rows removed."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        if not ttl:
+            return 0
+        cutoff = time.time() - ttl
+        with self._tx() as conn:
+            expired = conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints WHERE created_at < ?", (cutoff,)
+            ).fetchall()
+            conn.executemany("DELETE FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?", expired)
+            conn.executemany("DELETE FROM writes WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?", expired)
+        return len(expired)
+
+    def vacuum(self):
+        with self._lock:
+            self.conn.execute("VACUUM")
+
+    # -----------------------------------------------------------------
+    # stats
+    # -----------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads, checkpoints, raw, stored = self.conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*), COALESCE(SUM(raw_size), 0), "
+                "COALESCE(SUM(stored_size), 0) FROM checkpoints"
+            ).fetchone()
+            writes, write_bytes = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+            ).fetchone()
+            page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+            cache_size = self.conn.execute("PRAGMA cache_size").fetchone()[0]
+        disk = 0
+        if self.path != ":memory:":
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    disk += os.path.getsize(self.path + suffix)
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "writes": writes,
+            "raw_bytes": raw,
+            "stored_bytes": stored + write_bytes,
+            "compression_ratio": round(raw / stored, 3) if stored else None,
+            "disk_bytes": disk,
+            # negative cache_size is a limit in KiB, positive a page count
+            "cache_bytes_max": -cache_size * 1024 if cache_size < 0 else cache_size * page_size,
+            "keep_last": self.keep_last,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _memory_stats(saver) -> Dict[str, Any]:
+    storage = getattr(saver, "storage", {})
+    checkpoints = sum(len(ns) for thread in storage.values() for ns in thread.values())
+    blob_bytes = sum(len(v[1]) for v in getattr(saver, "blobs", {}).values())
+    return {"backend": "memory", "threads": len(storage), "checkpoints": checkpoints, "memory_bytes": blob_bytes}
+
+
+def _memory_backend():
+    from langgraph.checkpoint.memory import MemorySaver
+
+    saver = MemorySaver()
+    saver.stats = lambda: _memory_stats(saver)
+    return saver
+
+
+# backend name -> factory; register alternatives (e.g. Postgres) here
+CHECKPOINT_BACKENDS: Dict[str, Callable[[], BaseCheckpointSaver]] = {
+    "sqlite": SQLiteCheckpointer,
+    "memory": _memory_backend,
+}
+
+
+def make_checkpointer(backend: str = None) -> BaseCheckpointSaver:
+    backend = backend or os.environ.get("CHECKPOINT_BACKEND", "sqlite")
+    if backend not in CHECKPOINT_BACKENDS:
+        raise ValueError(f"Unknown checkpoint backend '{backend}'")
+    return CHECKPOINT_BACKENDS[backend]()
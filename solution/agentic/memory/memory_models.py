@@ -14,6 +14,7 @@ class ShortTermMemory(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String(128), index=True, nullable=False)
     ticket_id = Column(String(128), index=True, nullable=True)
+    account_id = Column(String(128), index=True, nullable=True)  # tenant; routes the row to its shard
     payload_json = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -22,6 +23,7 @@ class LongTermMemory(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(128), index=True, nullable=False)
     ticket_id = Column(String(128), index=True, nullable=True)
+    account_id = Column(String(128), index=True, nullable=True)  # tenant; routes the row to its shard
     text = Column(Text, nullable=False)
     embedding = Column(JSON, nullable=True)  # prefer PGVector when available
     metadata_json = Column(JSON, nullable=True)
@@ -1,54 +1,79 @@
 # agentic/memory/memory_repo.py
-from sqlalchemy import create_engine, select, func, text
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, text, or_
 import os
 import numpy as np
 from .memory_models import ShortTermMemory, LongTermMemory, Base
 from typing import List, Tuple
 from utils import now_iso, new_id
+from ..db import ensure_schema, get_engine, get_read_engine, session_factory
 
 
 
 DEFAULT_SQLITE = "sqlite:///./data/core/memory.sqlite"
 
+
+def _tenant_filter(column, account_id: str):
+    # rows written before account tagging have NULL account_id and stay visible to their session/user
+    return or_(column.is_(None), column == account_id)
+
 class MemoryRepository:
     def __init__(self, db_url: str = None, echo: bool = False):
         self.db_url = db_url or os.environ.get("MEMORY_DB_URL") or DEFAULT_SQLITE
-        self.engine = create_engine(self.db_url, echo=echo, future=True)
-        Base.metadata.create_all(self.engine)
+        # shared per URL (agentic/db.py): repeated repositories reuse the pool and skip the DDL check
+        self.engine = get_engine(self.db_url, echo=echo)
+        ensure_schema(self.db_url, Base.metadata)
+        self._session = session_factory(self.engine)
+
+    def _read_session(self):
+        # long-term memory is append-only and lag-tolerant, so its searches may go to a replica
+        # (round-robin per query); short-term/ticket reads stay on the primary to see the turn just written
+        return session_factory(get_read_engine(self.db_url))()
+
+    # `account_id` tags rows with their tenant (ShardedMemoryRepository routes on it); when it is
+    # given, reads return that tenant's rows plus untagged (pre-tenant) ones.
 
     # Short-term memory
-    def put_short(self, session_id: str, ticket_id: str, payload: dict):
-        with Session(self.engine) as s:
-            row = ShortTermMemory(session_id=session_id, ticket_id=ticket_id, payload_json=payload)
+    def put_short(self, session_id: str, ticket_id: str, payload: dict, account_id: str = None):
+        with self._session() as s:
+            row = ShortTermMemory(session_id=session_id, ticket_id=ticket_id, account_id=account_id,
+                                  payload_json=payload)
             s.add(row)
             s.commit()
             return row
 
-    def get_short(self, session_id: str):
-        with Session(self.engine) as s:
+    def get_short(self, session_id: str, limit: int = None, account_id: str = None):
+        with self._session() as s:
             stmt = select(ShortTermMemory).where(ShortTermMemory.session_id == session_id).order_by(ShortTermMemory.created_at.desc())
+            if account_id:
+                stmt = stmt.where(_tenant_filter(ShortTermMemory.account_id, account_id))
+            if limit:
+                stmt = stmt.limit(limit)
             return [r[0] for r in s.execute(stmt).all()]
 
     # Long-term memory: store text + embedding
-    def put_long(self, user_id: str, ticket_id: str, text: str, embedding: List[float], metadata: dict = None):
-        with Session(self.engine) as s:
-            row = LongTermMemory(user_id=user_id, ticket_id=ticket_id, text=text, embedding=embedding, metadata_json=metadata)
+    def put_long(self, user_id: str, ticket_id: str, text: str, embedding: List[float], metadata: dict = None,
+                 account_id: str = None):
+        with self._session() as s:
+            row = LongTermMemory(user_id=user_id, ticket_id=ticket_id, account_id=account_id, text=text,
+                                 embedding=embedding, metadata_json=metadata)
             s.add(row)
             s.commit()
             return row
 
-    def semantic_search(self, query_text: str, top_k: int = 5):
+    def semantic_search(self, query_text: str, top_k: int = 5, account_id: str = None):
         """
         Simple python fallback: compute embeddings (via embedding_fn) then cosine against stored JSON embeddings.
         If using Postgres+PGVector, replace this with SQL vector operator for efficient search.
+        With `account_id`, only that tenant's (and untagged) rows are scored.
         Returns list of tuples (row, score)
         """
         from ..embeddings import embedding_fn
         q_emb = embedding_fn(query_text)
         hits = []
-        with Session(self.engine) as s:
+        with self._read_session() as s:
             stmt = select(LongTermMemory).where(LongTermMemory.deleted_at.is_(None))
+            if account_id:
+                stmt = stmt.where(_tenant_filter(LongTermMemory.account_id, account_id))
             rows = [r[0] for r in s.execute(stmt).all()]
             for r in rows:
                 if not r.embedding:
@@ -63,32 +88,40 @@ class MemoryRepository:
         return hits[:top_k]
 
     # Ticket messages (store conversational messages associated with a session/ticket)
-    def put_ticket_message(self, session_id: str = None, ticket_id: str = None, from_role: str = "user", text: str = "", metadata: dict = None):
-        with Session(self.engine) as s:
+    def put_ticket_message(self, session_id: str = None, ticket_id: str = None, from_role: str = "user", text: str = "", metadata: dict = None,
+                           account_id: str = None):
+        with self._session() as s:
             payload = {"role": from_role, "text": text, "metadata": metadata or {}, "ticket_id": ticket_id, "created_at": now_iso()}
-            row = ShortTermMemory(session_id=session_id or "", ticket_id=ticket_id, payload_json=payload)
+            row = ShortTermMemory(session_id=session_id or "", ticket_id=ticket_id, account_id=account_id,
+                                  payload_json=payload)
             s.add(row)
             s.commit()
             return row
 
-    def get_ticket_messages(self, session_id: str = None, user_id: str = None, ticket_id: str = None, limit: int = 50):
+    def get_ticket_messages(self, session_id: str = None, user_id: str = None, ticket_id: str = None, limit: int = 50,
+                            account_id: str = None):
         results = []
-        with Session(self.engine) as s:
+        with self._session() as s:
             stmt = select(ShortTermMemory)
             if session_id:
                 stmt = stmt.where(ShortTermMemory.session_id == session_id)
             elif ticket_id:
                 stmt = stmt.where(ShortTermMemory.ticket_id == ticket_id)
-            # order oldest first
-            stmt = stmt.order_by(ShortTermMemory.created_at.asc()).limit(limit)
-            rows = [r[0] for r in s.execute(stmt).all()]
+            if account_id:
+                stmt = stmt.where(_tenant_filter(ShortTermMemory.account_id, account_id))
+            # latest `limit` rows, returned oldest first
+            stmt = stmt.order_by(ShortTermMemory.created_at.desc()).limit(limit)
+            rows = [r[0] for r in s.execute(stmt).all()][::-1]
             for r in rows:
                 results.append(r.payload_json if hasattr(r, "payload_json") else {})
 
         # If no session/ticket messages and user_id provided, try returning LTM entries as historical messages
         if not results and user_id:
-            with Session(self.engine) as s:
-                stmt2 = select(LongTermMemory).where(LongTermMemory.user_id == user_id).order_by(LongTermMemory.created_at.desc()).limit(limit)
+            with self._read_session() as s:
+                stmt2 = select(LongTermMemory).where(LongTermMemory.user_id == user_id)
+                if account_id:
+                    stmt2 = stmt2.where(_tenant_filter(LongTermMemory.account_id, account_id))
+                stmt2 = stmt2.order_by(LongTermMemory.created_at.desc()).limit(limit)
                 rows2 = [r[0] for r in s.execute(stmt2).all()]
                 for r in rows2:
                     results.append({"role": "ltm", "text": getattr(r, "text", ""), "metadata": getattr(r, "metadata_json", {})})
@@ -0,0 +1,317 @@
+# agentic/memory/sharding.py
+"""
+Tenant-sharded memory storage.
+
+Every short-term memory row, ticket message and long-term memory row is routed
+to one shard database by its key: the ticket's account (tenant) when it has
+one, otherwise its session (STM / messages) or user (LTM). Each shard is a
+plain MemoryRepository on its own URL, so each SQLite file has its own writer
+lock, and a tenant's semantic search only scores that tenant's rows. Reads
+without a key (global LTM search, admin queries) fan out to all shards.
+
+    MEMORY_SHARDS=8        8 hash buckets (crc32 of the key); unset = one MEMORY_DB_URL
+    MEMORY_SHARD_URL=sqlite:///./data/core/memory_shards/memory_{shard}.sqlite
+    MEMORY_SHARD_MAP=      instead of MEMORY_SHARDS: a JSON shard map file or "package.module:factory"
+
+A JSON map can give big tenants a database of their own:
+
+    {"buckets": 8, "url": "sqlite:///./data/core/memory_shards/memory_{shard}.sqlite",
+     "dedicated": {"acme": "postgresql://db.internal/acme_memory"}}
+
+Rebalancing moves rows whose shard changes under a new map (stop writers first):
+
+    python -m agentic.memory.sharding stats
+    python -m agentic.memory.sharding rebalance --from sqlite:///./data/core/memory.sqlite --to 8
+    python -m agentic.memory.sharding rebalance --to shards.json --dry-run
+"""
+
+import argparse
+import heapq
+import importlib
+import json
+import os
+import threading
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from ..db import url_key
+from .memory_models import LongTermMemory, ShortTermMemory
+from .memory_repo import DEFAULT_SQLITE, MemoryRepository
+
+DEFAULT_URL_TEMPLATE = "sqlite:///./data/core/memory_shards/memory_{shard}.sqlite"
+DEDICATED = "acct:"
+
+# (model, column used as the routing key when a row has no account)
+ROUTED_TABLES = ((ShortTermMemory, "session_id"), (LongTermMemory, "user_id"))
+
+
+# ---------------------------------------------------------------------
+# shard maps: key -> shard name -> database URL
+# ---------------------------------------------------------------------
+class ShardMap:
+    """Placement policy; subclass it (or point MEMORY_SHARD_MAP at a factory) for custom routing."""
+
+    def shards(self) -> List[str]:
+        raise NotImplementedError
+
+    def shard_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    def url(self, shard: str) -> str:
+        raise NotImplementedError
+
+
+class SingleShardMap(ShardMap):
+    """Everything in one database: the unsharded layout, e.g. as a rebalance source."""
+
+    def __init__(self, url: str = DEFAULT_SQLITE):
+        self._url = url
+
+    def shards(self) -> List[str]:
+        return ["main"]
+
+    def shard_for(self, key: str) -> str:
+        return "main"
+
+    def url(self, shard: str) -> str:
+        return self._url
+
+
+class HashShardMap(ShardMap):
+    """`buckets` databases chosen by crc32(key); keys in `dedicated` get a database of their own."""
+
+    def __init__(self, buckets: int, url_template: str = DEFAULT_URL_TEMPLATE, dedicated: Dict[str, str] = None):
+        if buckets < 1:
+            raise ValueError("buckets must be >= 1")
+        self.buckets = buckets
+        self.url_template = url_template
+        self.dedicated = dict(dedicated or {})
+
+    def shards(self) -> List[str]:
+        return [f"{i:02d}" for i in range(self.buckets)] + [DEDICATED + key for key in self.dedicated]
+
+    def shard_for(self, key: str) -> str:
+        if key in self.dedicated:
+            return DEDICATED + key
+        # crc32 is stable across processes and Python versions (unlike hash())
+        return f"{zlib.crc32((key or '').encode('utf-8')) % self.buckets:02d}"
+
+    def url(self, shard: str) -> str:
+        if shard.startswith(DEDICATED):
+            return self.dedicated[shard[len(DEDICATED):]]
+        return self.url_template.format(shard=shard)
+
+
+def load_shard_map(spec: str, url_template: str = None) -> Optional[ShardMap]:
+    """
+    "8" -> 8 hash buckets; "shards.json" -> JSON map; "pkg.module:factory" -> factory();
+    a database URL -> that single database; "" -> None (unsharded).
+    """
+    spec = (spec or "").strip()
+    url_template = url_template or DEFAULT_URL_TEMPLATE
+    if not spec:
+        return None
+    if spec.isdigit():
+        return HashShardMap(int(spec), url_template)
+    if "://" in spec:
+        return SingleShardMap(spec)
+    if spec.endswith(".json"):
+        with open(spec, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return HashShardMap(int(config.get("buckets", 1)), config.get("url", url_template), config.get("dedicated"))
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    shard_map = factory()
+    if not isinstance(shard_map, ShardMap):
+        raise TypeError(f"{spec} returned {type(shard_map).__name__}, expected a ShardMap")
+    return shard_map
+
+
+def shard_map_from_env() -> Optional[ShardMap]:
+    return load_shard_map(os.environ.get("MEMORY_SHARD_MAP") or os.environ.get("MEMORY_SHARDS", ""),
+                          os.environ.get("MEMORY_SHARD_URL"))
+
+
+def _ensure_sqlite_dir(url: str):
+    from sqlalchemy.engine import make_url
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database and parsed.database != ":memory:" \
+            and not parsed.database.startswith("file:"):
+        directory = os.path.dirname(os.path.abspath(parsed.database))
+        os.makedirs(directory, exist_ok=True)
+
+
+# ---------------------------------------------------------------------
+# repository
+# ---------------------------------------------------------------------
+class ShardedMemoryRepository:
+    """MemoryRepository's interface, routed per row; pass `account_id` wherever the tenant is known."""
+
+    def __init__(self, shard_map: ShardMap, max_workers: int = 8):
+        self.shard_map = shard_map
+        self._repos: Dict[str, MemoryRepository] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-shard")
+
+    @classmethod
+    def from_env(cls) -> Optional["ShardedMemoryRepository"]:
+        shard_map = shard_map_from_env()
+        return cls(shard_map) if shard_map is not None else None
+
+    def repo(self, shard: str) -> MemoryRepository:
+        repo = self._repos.get(shard)
+        if repo is None:
+            with self._lock:
+                repo = self._repos.get(shard)
+                if repo is None:
+                    url = self.shard_map.url(shard)
+                    _ensure_sqlite_dir(url)
+                    # engines are shared per URL (agentic/db.py), so this is cheap after the first time
+                    repo = self._repos[shard] = MemoryRepository(url)
+        return repo
+
+    def repo_for(self, key: str) -> MemoryRepository:
+        return self.repo(self.shard_map.shard_for(key or ""))
+
+    def query(self, fn: Callable[[MemoryRepository], Any]) -> Dict[str, Any]:
+        """Cross-shard query: fn(repo) on every shard concurrently -> {shard: result}."""
+        shards = self.shard_map.shards()
+        futures = {shard: self._pool.submit(fn, self.repo(shard)) for shard in shards}
+        return {shard: future.result() for shard, future in futures.items()}
+
+    # Short-term memory
+    def put_short(self, session_id: str, ticket_id: str, payload: dict, account_id: str = None):
+        return self.repo_for(account_id or session_id).put_short(session_id, ticket_id, payload, account_id=account_id)
+
+    def get_short(self, session_id: str, limit: int = None, account_id: str = None):
+        return self.repo_for(account_id or session_id).get_short(session_id, limit=limit, account_id=account_id)
+
+    # Long-term memory
+    def put_long(self, user_id: str, ticket_id: str, text: str, embedding: List[float], metadata: dict = None,
+                 account_id: str = None):
+        return self.repo_for(account_id or user_id).put_long(user_id, ticket_id, text, embedding, metadata,
+                                                             account_id=account_id)
+
+    def semantic_search(self, query_text: str, top_k: int = 5, account_id: str = None):
+        if account_id:
+            return self.repo_for(account_id).semantic_search(query_text, top_k=top_k, account_id=account_id)
+        hits = self.query(lambda repo: repo.semantic_search(query_text, top_k=top_k))
+        return heapq.nlargest(top_k, (hit for shard_hits in hits.values() for hit in shard_hits), key=lambda h: h[1])
+
+    # Ticket messages
+    def put_ticket_message(self, session_id: str = None, ticket_id: str = None, from_role: str = "user",
+                           text: str = "", metadata: dict = None, account_id: str = None):
+        return self.repo_for(account_id or session_id).put_ticket_message(
+            session_id=session_id, ticket_id=ticket_id, from_role=from_role, text=text, metadata=metadata,
+            account_id=account_id)
+
+    def get_ticket_messages(self, session_id: str = None, user_id: str = None, ticket_id: str = None,
+                            limit: int = 50, account_id: str = None):
+        if account_id:
+            return self.repo_for(account_id).get_ticket_messages(session_id, user_id, ticket_id, limit,
+                                                                 account_id=account_id)
+        if session_id:
+            messages = self.repo_for(session_id).get_ticket_messages(session_id=session_id, limit=limit)
+            # a user's LTM lives in the user's shard, not the session's
+            if messages or not user_id:
+                return messages
+            return self.repo_for(user_id).get_ticket_messages(user_id=user_id, limit=limit)
+        if ticket_id:
+            per_shard = self.query(lambda repo: repo.get_ticket_messages(ticket_id=ticket_id, limit=limit))
+            messages = sorted((m for ms in per_shard.values() for m in ms), key=lambda m: m.get("created_at") or "")
+            return messages[-limit:]
+        return self.repo_for(user_id).get_ticket_messages(user_id=user_id, limit=limit)
+
+    # -----------------------------------------------------------------
+    # admin
+    # -----------------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        def count(repo: MemoryRepository) -> Dict[str, Any]:
+            with repo._session() as s:
+                return {
+                    "url": repo.engine.url.render_as_string(hide_password=True),
+                    "short_term": s.scalar(select(func.count()).select_from(ShortTermMemory)),
+                    "long_term": s.scalar(select(func.count()).select_from(LongTermMemory)),
+                    "accounts": s.scalar(select(func.count(func.distinct(ShortTermMemory.account_id)))),
+                }
+        return self.query(count)
+
+    def rebalance(self, target: ShardMap, batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Move every row whose shard under `target` differs from where it is now. Writers should be
+        stopped (or still on the old map) until this returns and the new map is deployed. Rows are
+        copied, then deleted from the source, one batch at a time: an interrupted run can leave one
+        batch in both places.
+        """
+        destination = ShardedMemoryRepository(target)
+        scanned, moved = 0, Counter()
+        for shard in self.shard_map.shards():
+            source = self.repo(shard)
+            source_url = url_key(self.shard_map.url(shard))
+            for model, fallback in ROUTED_TABLES:
+                table = model.__table__
+                copy_columns = [c.name for c in table.columns if c.name != "id"]
+                last_id = 0
+                while True:
+                    with source._session() as s:
+                        rows = s.scalars(select(model).where(model.id > last_id).order_by(model.id)
+                                         .limit(batch_size)).all()
+                    if not rows:
+                        break
+                    last_id = rows[-1].id
+                    scanned += len(rows)
+                    by_dest = defaultdict(list)
+                    for row in rows:
+                        dest = target.shard_for(row.account_id or getattr(row, fallback) or "")
+                        if url_key(target.url(dest)) != source_url:
+                            by_dest[dest].append(row)
+                    for dest, items in by_dest.items():
+                        moved[f"{shard}->{dest}"] += len(items)
+                        if dry_run:
+                            continue
+                        with destination.repo(dest).engine.begin() as conn:
+                            conn.execute(insert(table), [{c: getattr(r, c) for c in copy_columns} for r in items])
+                        with source.engine.begin() as conn:
+                            conn.execute(delete(table).where(model.id.in_([r.id for r in items])))
+        destination.close()
+        return {"scanned": scanned, "moved": sum(moved.values()), "routes": dict(moved), "dry_run": dry_run}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+def _source_map(spec: str) -> ShardMap:
+    return (load_shard_map(spec) if spec else shard_map_from_env()) \
+        or SingleShardMap(os.environ.get("MEMORY_DB_URL") or DEFAULT_SQLITE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="rows per shard")
+    stats.add_argument("--map", default="", help="shard map (default: MEMORY_SHARD_MAP / MEMORY_SHARDS)")
+    move = sub.add_parser("rebalance", help="move rows to the shards of a new map")
+    move.add_argument("--from", dest="source", default="", help="current map (default: from the environment)")
+    move.add_argument("--to", required=True, help="new map: bucket count, JSON file, factory or database URL")
+    move.add_argument("--url", help="URL template for --to bucket counts (default: MEMORY_SHARD_URL)")
+    move.add_argument("--batch-size", type=int, default=500)
+    move.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        repo = ShardedMemoryRepository(_source_map(args.map))
+        print(json.dumps(repo.stats(), indent=2))
+    else:
+        repo = ShardedMemoryRepository(_source_map(args.source))
+        target = load_shard_map(args.to, args.url or os.environ.get("MEMORY_SHARD_URL"))
+        print(json.dumps(repo.rebalance(target, batch_size=args.batch_size, dry_run=args.dry_run), indent=2))
+    repo.close()
+
+
+if __name__ == "__main__":
+    main()
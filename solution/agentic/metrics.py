@@ -0,0 +1,340 @@
+# agentic/metrics.py
+"""
+In-process metrics: counters, gauges and fixed-bucket histograms.
+
+`metrics` is the process-wide registry. safe_node records per-node latency,
+MemoryRepository engines count DB queries (attributed to the running node),
+the Resolver records LLM tokens and the fast paths record cache hits.
+Export with `metrics.render_prometheus()` (text exposition format) or
+`metrics.snapshot()` (JSON, with p50/p90/p99 estimated from the buckets);
+`SnapshotWriter` dumps the JSON snapshot to a file periodically. It starts on
+import when METRICS_SNAPSHOT_PATH is set (agentic.workflow checks again after
+loading .env).
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# seconds; wide enough for sub-ms classifier calls and multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# bytes; for serialized state / checkpoint sizes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PREFIX = "uda_"
+
+# name of the graph node currently executing in this thread/context (set by safe_node)
+current_node: contextvars.ContextVar[str] = contextvars.ContextVar("current_node", default="none")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name, self.help = name, help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelKey, list] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        idx = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                idx = i
+                break
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[idx] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        return self._quantile(self._counts.get(_key(labels)), q)
+
+    def _quantile(self, counts, q: float) -> Optional[float]:
+        # linear interpolation inside the bucket holding the q-th observation
+        if not counts:
+            return None
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            return {k: (list(v), self._sums[k]) for k, v in self._counts.items()}
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self.prefix + name, help, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def register_collector(self, name: str, fn: Callable[[], Dict[str, float]]):
+        """fn() is called at export time; numeric values become gauges named <name>_<key>."""
+        self._collectors[name] = fn
+
+    def _collect(self):
+        for name, fn in list(self._collectors.items()):
+            try:
+                values = fn() or {}
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.gauge(f"{name}_{key}").set(value)
+
+    def reset(self):
+        """Drop every recorded value; the metric objects stay registered, so module-level handles keep working."""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.clear()
+
+    # -----------------------------------------------------------------
+    # exporters
+    # -----------------------------------------------------------------
+    def render_prometheus(self) -> str:
+        self._collect()
+        lines = []
+        for metric in list(self._metrics.values()):
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "histogram":
+                for key, (counts, total) in sorted(metric.samples().items()):
+                    cumulative = 0
+                    for bound, c in zip(list(metric.buckets) + ["+Inf"], counts):
+                        cumulative += c
+                        lines.append(f"{metric.name}_bucket{_fmt_labels(key, [('le', str(bound))])} {cumulative}")
+                    lines.append(f"{metric.name}_sum{_fmt_labels(key)} {total}")
+                    lines.append(f"{metric.name}_count{_fmt_labels(key)} {cumulative}")
+            else:
+                for key, value in sorted(metric.samples().items()):
+                    lines.append(f"{metric.name}{_fmt_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._collect()
+        out: Dict[str, Any] = {"ts": time.time()}
+        for metric in list(self._metrics.values()):
+            entries = []
+            if metric.kind == "histogram":
+                for key, (counts, total) in metric.samples().items():
+                    n = sum(counts)
+                    entries.append({
+                        "labels": dict(key),
+                        "count": n,
+                        "sum": total,
+                        "mean": total / n if n else None,
+                        "p50": metric._quantile(counts, 0.50),
+                        "p90": metric._quantile(counts, 0.90),
+                        "p99": metric._quantile(counts, 0.99),
+                    })
+            else:
+                entries = [{"labels": dict(k), "value": v} for k, v in metric.samples().items()]
+            out[metric.name] = {"type": metric.kind, "samples": entries}
+        return out
+
+
+metrics = MetricsRegistry()
+
+# standard metrics
+NODE_DURATION = metrics.histogram("node_duration_seconds", "Wall time per graph node")
+TICKET_DURATION = metrics.histogram("ticket_duration_seconds", "End-to-end orchestrator latency")
+NODE_ERRORS = metrics.counter("node_errors_total", "Exceptions caught by safe_node")
+DB_QUERIES = metrics.counter("db_queries_total", "SQL statements executed, by graph node")
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM tokens, by kind (prompt/completion)")
+LLM_CALLS = metrics.counter("llm_calls_total", "LLM invocations")
+STAGES_SKIPPED = metrics.counter("stages_skipped_total", "Graph stages skipped by the route plan")
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups, by cache and result (hit/miss)")
+STATE_UPDATE_BYTES = metrics.histogram("state_update_bytes", "Serialized size of each node's state update",
+                                       buckets=SIZE_BUCKETS)
+STATE_BYTES = metrics.histogram("state_bytes", "Serialized size of the full workflow state at finalize",
+                                buckets=SIZE_BUCKETS)
+CHECKPOINT_BYTES = metrics.histogram("checkpoint_bytes", "Checkpoint size before compression",
+                                     buckets=SIZE_BUCKETS)
+
+
+def approx_size(obj: Any) -> int:
+    """JSON length of obj: a cheap, serializer-independent size estimate."""
+    try:
+        return len(json.dumps(obj, default=str))
+    except Exception:
+        return 0
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm_usage(response: Any):
+    """Count tokens from a LangChain AIMessage (usage_metadata or OpenAI token_usage)."""
+    LLM_CALLS.inc()
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {"input_tokens": token_usage.get("prompt_tokens", 0),
+                 "output_tokens": token_usage.get("completion_tokens", 0)}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.inc(usage["input_tokens"], kind="prompt")
+    if usage.get("output_tokens"):
+        LLM_TOKENS.inc(usage["output_tokens"], kind="completion")
+
+
+def instrument_engine(engine):
+    """Count every statement executed on a SQLAlchemy engine, labelled with the current node."""
+    from sqlalchemy import event
+
+    if getattr(engine, "_uda_instrumented", False):
+        return engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERIES.inc(node=current_node.get(), db=engine.url.database or "")
+
+    engine._uda_instrumented = True
+    return engine
+
+
+class SnapshotWriter:
+    """Background thread writing metrics.snapshot() as JSON every `interval` seconds."""
+
+    def __init__(self, path: str, interval: float = 60.0, registry: MetricsRegistry = metrics):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+
+    def start(self) -> "SnapshotWriter":
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f, default=str)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception:
+                pass
+
+    def stop(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            try:
+                self.write()
+            except Exception:
+                pass
+
+
+_writer: Optional[SnapshotWriter] = None
+_writer_lock = threading.Lock()
+
+
+def start_snapshot_writer(path: str = None, interval: float = None) -> Optional[SnapshotWriter]:
+    """
+    Start the periodic JSON dump if METRICS_SNAPSHOT_PATH (or `path`) is set. One writer per process:
+    later calls return the running writer.
+    """
+    global _writer
+    path = path or os.environ.get("METRICS_SNAPSHOT_PATH")
+    if not path:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            interval = interval or float(os.environ.get("METRICS_SNAPSHOT_INTERVAL", 60))
+            _writer = SnapshotWriter(path, interval).start()
+        return _writer
+
+
+start_snapshot_writer()
@@ -1,33 +1,66 @@
 # agentic/node_utils.py
+import os
+import time
 import traceback
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, List, Optional
 from functools import wraps
 
-def safe_node(node_fn: Callable):
+from .audit_policy import event
+from .metrics import NODE_DURATION, NODE_ERRORS, STATE_UPDATE_BYTES, approx_size, current_node
+
+# innermost frames kept in node_error tracebacks
+TRACEBACK_FRAMES = int(os.environ.get("AUDIT_TRACEBACK_FRAMES", 5))
+
+EventSink = Callable[[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]], None]
+
+def safe_node(node_fn: Callable, name: Optional[str] = None, sink: Optional[EventSink] = None):
     """
     Wrap a LangGraph node function so:
      - Exceptions are caught
-     - An audit event is added to state['audit']
+     - A node_error audit event is returned in the 'audit_events' update
+       (traceback limited to the innermost AUDIT_TRACEBACK_FRAMES frames)
      - state['error'] is set and supervisor decision is set to escalation
-     - Node returns state so graph continues to finalization (graceful handling)
+     - Node still returns a (partial) update so graph continues to finalization (graceful handling)
+     - The node's wall time is reported under 'timings' (keyed by node name)
+       and observed in the node_duration_seconds histogram (agentic.metrics);
+       DB queries issued while the node runs are attributed to it
+
+    Node functions return partial state updates; list/dict keys written by
+    parallel branches are merged by the reducers declared on WorkflowState.
+    With a `sink`, 'audit_events' are handed to sink(state, update, events) and
+    removed from the update, so they never enter (checkpointed) state.
+    The serialized size of each update is observed in state_update_bytes.
     """
+    node_name = name or node_fn.__name__.replace("node_", "", 1)
+
     @wraps(node_fn)
     def wrapper(state: Dict[str, Any]):
+        started = time.perf_counter()
+        token = current_node.set(node_name)
         try:
-            return node_fn(state)
+            update = node_fn(state) or {}
         except Exception as exc:
+            NODE_ERRORS.inc(node=node_name)
             # record the error in audit
-            audit = state.setdefault("audit", {"id": f"error_{state.get('ticket',{}).get('ticket_id','unknown')}", "events": []})
             err_payload = {
+                "node": node_name,
                 "error": str(exc),
-                "traceback": traceback.format_exc()
+                "traceback": traceback.format_exc(limit=-TRACEBACK_FRAMES) if TRACEBACK_FRAMES else None,
+            }
+            update = {
+                "audit_events": [event("node_error", err_payload)],
+                # place error marker in state
+                "error": {"node": node_name, "error": str(exc)},
+                # mark supervisor decision as escalate (so later router picks escalation path)
+                "supervisor_decision": {"escalate": True, "reason": "node_error", "node": node_name},
             }
-            # append event
-            audit.setdefault("events", []).append({"ts": __import__("datetime").datetime.utcnow().isoformat(), "type": "node_error", "payload": err_payload})
-            # place error marker in state
-            state["error"] = {"node": node_fn.__name__, "error": str(exc)}
-            # mark supervisor decision as escalate (so later router picks escalation path)
-            state["supervisor_decision"] = {"escalate": True, "reason": "node_error", "node": node_fn.__name__}
-            # return state to allow graph to proceed to finalize (or escalation)
-            return state
+        finally:
+            current_node.reset(token)
+        if sink is not None and "audit_events" in update:
+            sink(state, update, update.pop("audit_events") or [])
+        elapsed = time.perf_counter() - started
+        NODE_DURATION.observe(elapsed, node=node_name)
+        update["timings"] = {**(update.get("timings") or {}), node_name: elapsed}
+        STATE_UPDATE_BYTES.observe(approx_size(update), node=node_name)
+        return update
     return wrapper
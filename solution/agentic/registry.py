@@ -0,0 +1,77 @@
+# agentic/registry.py
+"""
+Lazy component registry.
+
+Heavy components (LLM client, DB engines, compiled graph) are registered as
+factories and only built on first use, so importing the agentic package stays
+cheap. Servers call `warmup()` once at startup to pay the cost up front.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class Registry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.init_times: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], replace: bool = False):
+        with self._lock:
+            if name in self._factories and not replace:
+                raise KeyError(f"Component '{name}' is already registered")
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            # re-check: another thread may have built it while we waited
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown component '{name}'")
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.init_times[name] = time.perf_counter() - started
+            return self._instances[name]
+
+    # attribute access: components.memory_repo
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError as exc:
+            raise AttributeError(name) from exc
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def override(self, name: str, instance: Any):
+        """Install a pre-built instance (tests, benchmarks, shared resources)."""
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, name: Optional[str] = None):
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self.init_times.clear()
+            else:
+                self._instances.pop(name, None)
+                self.init_times.pop(name, None)
+
+    def names(self) -> Iterable[str]:
+        return list(self._factories)
+
+    def warmup(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build the given (default: all) components; returns per-component init seconds."""
+        for name in names or self.names():
+            self.get(name)
+        return dict(self.init_times)
@@ -0,0 +1,300 @@
+# agentic/resilience.py
+"""
+Resilience layer for LLM calls.
+
+ResilientLLM wraps any object with an `invoke(prompt)` method and adds:
+  - a per-call deadline (the worker stops waiting; the stray call is abandoned,
+    and new calls fail fast while too many abandoned calls are still running)
+  - jittered exponential-backoff retries of transient errors (timeouts,
+    connection errors, 429 and 5xx); anything else is raised straight away
+  - optional hedged requests: a second identical call is fired once the first
+    has been outstanding longer than the observed p95 (or a fixed delay)
+  - a circuit breaker that fails fast once the recent error rate crosses a threshold
+
+Counters are kept on the wrapper (`stats()`); per-call details are returned by
+`invoke_with_info` so callers can put them in the audit.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the LLM while the circuit breaker is open."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not finish within its deadline."""
+
+
+class LLMOverloadError(RuntimeError):
+    """Raised without calling the LLM while too many abandoned calls are still running."""
+
+
+# exception classes (anywhere in the MRO) that mean "try again": openai / httpx transport failures
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException"}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx; bad requests, auth errors and bugs are not."""
+    if isinstance(exc, (TimeoutError, ConnectionError, LLMOverloadError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    return any(cls.__name__ in _TRANSIENT_NAMES for cls in type(exc).__mro__)
+
+
+@dataclass
+class ResilienceConfig:
+    timeout: float = 30.0              # per-attempt deadline in seconds
+    max_retries: int = 2               # extra attempts after the first
+    backoff_base: float = 0.5          # first retry waits ~backoff_base seconds
+    backoff_max: float = 8.0
+    hedge: bool = False
+    hedge_delay: Optional[float] = None  # None -> observed p95 latency
+    hedge_min_samples: int = 20        # latencies needed before p95 hedging kicks in
+    breaker_threshold: float = 0.5     # failure rate that opens the breaker
+    breaker_window: int = 20           # outcomes considered
+    breaker_min_calls: int = 10        # don't trip on fewer outcomes than this
+    breaker_cooldown: float = 30.0     # seconds before a half-open probe
+    max_abandoned: int = 8             # abandoned calls still running before new calls fail fast
+
+    @classmethod
+    def from_env(cls) -> "ResilienceConfig":
+        env = os.environ
+        hedge_delay = env.get("LLM_HEDGE_DELAY")
+        return cls(
+            timeout=float(env.get("LLM_TIMEOUT", cls.timeout)),
+            max_retries=int(env.get("LLM_MAX_RETRIES", cls.max_retries)),
+            backoff_base=float(env.get("LLM_BACKOFF_BASE", cls.backoff_base)),
+            hedge=env.get("LLM_HEDGE", "0").lower() in ("1", "true", "yes"),
+            hedge_delay=float(hedge_delay) if hedge_delay else None,
+            breaker_threshold=float(env.get("LLM_BREAKER_THRESHOLD", cls.breaker_threshold)),
+            breaker_cooldown=float(env.get("LLM_BREAKER_COOLDOWN", cls.breaker_cooldown)),
+            max_abandoned=int(env.get("LLM_MAX_ABANDONED", cls.max_abandoned)),
+        )
+
+
+class CircuitBreaker:
+    """Rolling-window breaker: closed -> open on high error rate -> half_open probe -> closed."""
+
+    def __init__(self, threshold: float = 0.5, window: int = 20, min_calls: int = 10, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            if self.state == "closed" and len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.threshold:
+                    self._open()
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self.trips += 1
+
+
+class ResilientLLM:
+    def __init__(self, llm, config: Optional[ResilienceConfig] = None, max_workers: int = 16):
+        self.llm = llm
+        self.config = config or ResilienceConfig.from_env()
+        self.breaker = CircuitBreaker(
+            threshold=self.config.breaker_threshold,
+            window=self.config.breaker_window,
+            min_calls=self.config.breaker_min_calls,
+            cooldown=self.config.breaker_cooldown,
+        )
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._latencies = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._abandoned = 0  # calls we stopped waiting for that still hold a pool worker
+        self._counters = {k: 0 for k in (
+            "calls", "successes", "failures", "attempts", "timeouts",
+            "retries", "hedges", "hedge_wins", "short_circuits", "overloads", "permanent_errors",
+        )}
+
+    # expose the wrapped model's attributes (model_name, stats, ...)
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._counters[key] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._counters)
+            out["abandoned_in_flight"] = self._abandoned
+        out["breaker_state"] = self.breaker.state
+        out["breaker_trips"] = self.breaker.trips
+        out["p95_latency_s"] = self.p95_latency()
+        return out
+
+    def p95_latency(self) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.config.hedge:
+            return None
+        if self.config.hedge_delay is not None:
+            return self.config.hedge_delay
+        with self._lock:
+            enough = len(self._latencies) >= self.config.hedge_min_samples
+        return self.p95_latency() if enough else None
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt)))
+
+    def _saturated(self) -> bool:
+        with self._lock:
+            return self._abandoned >= self.config.max_abandoned
+
+    def _abandon(self, futures):
+        """Stop waiting for `futures`; the ones already running count until they finish."""
+        for fut in futures:
+            if fut.cancel():
+                continue
+            with self._lock:
+                self._abandoned += 1
+            fut.add_done_callback(self._release)
+
+    def _release(self, _fut):
+        with self._lock:
+            self._abandoned -= 1
+
+    def _attempt(self, prompt: Any, kwargs: Dict[str, Any], info: Dict[str, Any]) -> Any:
+        if self._saturated():
+            self._count("overloads")
+            raise LLMOverloadError(f"{self.config.max_abandoned} abandoned LLM calls still running")
+        deadline = time.monotonic() + self.config.timeout
+        started = time.monotonic()
+        futures = [self._pool.submit(self.llm.invoke, prompt, **kwargs)]
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None and hedge_delay < self.config.timeout and not self._saturated():
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                futures.append(self._pool.submit(self.llm.invoke, prompt, **kwargs))
+                info["hedged"] += 1
+                self._count("hedges")
+
+        last_exc = None
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if len(futures) > 1 and fut is futures[1]:
+                        info["hedge_wins"] += 1
+                        self._count("hedge_wins")
+                    with self._lock:
+                        self._latencies.append(time.monotonic() - started)
+                    self._abandon(pending)
+                    return fut.result()
+                last_exc = fut.exception()
+                if not is_transient(last_exc):
+                    # the hedge would fail the same way
+                    self._abandon(pending)
+                    raise last_exc
+        if last_exc is not None and not pending:
+            raise last_exc
+        self._abandon(pending)
+        info["timeouts"] += 1
+        self._count("timeouts")
+        raise LLMTimeoutError(f"LLM call exceeded {self.config.timeout}s deadline")
+
+    def invoke_with_info(self, prompt: Any, info: Optional[Dict[str, Any]] = None, **kwargs) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Call the wrapped LLM with deadline/retry/hedge/breaker handling. Only transient errors
+        (see is_transient) are retried and count against the breaker; others are raised at once.
+        `info` (if given) is filled in place so it is still available when the call raises.
+        """
+        info = info if info is not None else {}
+        info.update({"attempts": 0, "retries": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0,
+                     "short_circuited": False, "breaker_state": self.breaker.state})
+        self._count("calls")
+        last_exc: Optional[BaseException] = None
+        for attempt in range(self.config.max_retries + 1):
+            if not self.breaker.allow():
+                info["short_circuited"] = True
+                info["breaker_state"] = self.breaker.state
+                self._count("short_circuits")
+                self._count("failures")
+                raise CircuitOpenError("LLM circuit breaker is open") from last_exc
+            if attempt:
+                info["retries"] += 1
+                self._count("retries")
+                time.sleep(self._backoff(attempt - 1))
+            info["attempts"] += 1
+            self._count("attempts")
+            try:
+                response = self._attempt(prompt, kwargs, info)
+            except Exception as exc:
+                if not is_transient(exc):
+                    # a bad request or a bug: the LLM answered (so this settles a half-open probe)
+                    # and a retry would fail the same way
+                    self.breaker.record(True)
+                    self._count("permanent_errors")
+                    self._count("failures")
+                    info["breaker_state"] = self.breaker.state
+                    raise
+                last_exc = exc
+                self.breaker.record(False)
+                continue
+            self.breaker.record(True)
+            self._count("successes")
+            info["breaker_state"] = self.breaker.state
+            return response, info
+        self._count("failures")
+        info["breaker_state"] = self.breaker.state
+        raise last_exc
+
+    def invoke(self, prompt: Any, **kwargs) -> Any:
+        return self.invoke_with_info(prompt, **kwargs)[0]
@@ -0,0 +1,298 @@
+# agentic/scheduler.py
+"""
+Urgency-aware ticket scheduling.
+
+Tickets are queued per urgency level (metadata.urgency) and drained by a
+WorkerPool of threads or processes. The next ticket is the queue head with the
+smallest `enqueued_at + rank * age_step`, so higher urgency goes first but a
+waiting low-urgency ticket gains one level every `age_step` seconds and is
+never starved.
+
+Admission control: once `shed_depth` tickets are waiting, low-urgency tickets
+are rejected (QueueFull); at `max_depth` everything is. `submit(block=True)`
+applies backpressure instead, waiting up to `timeout` for room.
+
+Results carry result["queue"] = {urgency, wait_s, processing_s}; the same
+values feed the queue_wait_seconds / queue_processing_seconds histograms.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .metrics import metrics
+
+URGENCY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+DEFAULT_URGENCY = "medium"
+
+QUEUE_WAIT = metrics.histogram("queue_wait_seconds", "Time a ticket waited in the queue, by urgency")
+QUEUE_PROCESSING = metrics.histogram("queue_processing_seconds", "Worker processing time per ticket, by urgency")
+QUEUE_REJECTED = metrics.counter("queue_rejected_total", "Tickets refused by admission control, by urgency")
+QUEUE_DEPTH = metrics.gauge("queue_depth", "Tickets waiting, by urgency")
+
+
+class QueueFull(RuntimeError):
+    """Raised when admission control refuses a ticket."""
+
+
+def urgency_of(ticket: Dict[str, Any]) -> str:
+    urgency = str((ticket.get("metadata") or {}).get("urgency") or DEFAULT_URGENCY).lower()
+    return urgency if urgency in URGENCY_RANK else DEFAULT_URGENCY
+
+
+@dataclass
+class TicketJob:
+    ticket: Dict[str, Any]
+    session_id: Optional[str] = None
+    urgency: str = DEFAULT_URGENCY
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Future = field(default_factory=Future, repr=False, compare=False)
+    options: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)  # extra handler kwargs
+
+    @property
+    def wait_s(self) -> Optional[float]:
+        return None if self.started_at is None else self.started_at - self.enqueued_at
+
+    @property
+    def processing_s(self) -> Optional[float]:
+        return None if self.finished_at is None or self.started_at is None else self.finished_at - self.started_at
+
+
+class PriorityTicketQueue:
+    """In-process queue: one FIFO per urgency level, aged priority across levels."""
+
+    def __init__(self, max_depth: int = 1000, shed_depth: Optional[int] = None, age_step: float = 30.0):
+        self.max_depth = max_depth
+        self.shed_depth = shed_depth if shed_depth is not None else int(max_depth * 0.8)
+        self.age_step = age_step
+        self._levels: Dict[str, Deque[TicketJob]] = {u: deque() for u in URGENCY_RANK}
+        self._cond = threading.Condition(threading.RLock())
+        self._closed = False
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._levels.values())
+
+    def depths(self) -> Dict[str, int]:
+        return {u: len(q) for u, q in self._levels.items()}
+
+    def _admit(self, job: TicketJob) -> bool:
+        depth = len(self)
+        if depth >= self.max_depth:
+            return False
+        # shed the least urgent work first
+        return depth < self.shed_depth or URGENCY_RANK[job.urgency] < URGENCY_RANK["low"]
+
+    def put(self, job: TicketJob, block: bool = False, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._closed:
+                raise QueueFull("queue is closed")
+            while not self._admit(job):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or self._closed or (remaining is not None and remaining <= 0):
+                    QUEUE_REJECTED.inc(urgency=job.urgency)
+                    raise QueueFull(f"queue depth {len(self)} (max {self.max_depth}, shed {self.shed_depth})")
+                self._cond.wait(remaining)
+            self._levels[job.urgency].append(job)
+            QUEUE_DEPTH.set(len(self._levels[job.urgency]), urgency=job.urgency)
+            self._cond.notify_all()
+
+    def _score(self, job: TicketJob) -> float:
+        return job.enqueued_at + URGENCY_RANK[job.urgency] * self.age_step
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TicketJob]:
+        """Next job by urgency and age; None on timeout or once closed and empty."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not len(self):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if self._closed or (remaining is not None and remaining <= 0):
+                    return None
+                self._cond.wait(remaining)
+            heads = [q[0] for q in self._levels.values() if q]
+            job = min(heads, key=self._score)
+            self._levels[job.urgency].popleft()
+            QUEUE_DEPTH.set(len(self._levels[job.urgency]), urgency=job.urgency)
+            self._cond.notify_all()  # room for blocked producers
+            return job
+
+    def task_done(self, job: TicketJob):
+        pass
+
+    def close(self):
+        """Refuse new tickets; get() keeps returning queued ones, then None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def dispose(self):
+        pass
+
+
+class SQLiteTicketQueue(PriorityTicketQueue):
+    """
+    Same policy, but queued tickets are persisted so they survive a restart.
+    Jobs still 'running' when the process died are re-queued on open. Futures
+    only exist in the submitting process; recovered jobs run without one.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ticket_queue ("
+            " id TEXT PRIMARY KEY, urgency TEXT NOT NULL, enqueued_at REAL NOT NULL,"
+            " session_id TEXT, ticket TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'queued')")
+        self.conn.execute("UPDATE ticket_queue SET status = 'queued' WHERE status = 'running'")
+        for job_id, urgency, enqueued_at, session_id, ticket in self.conn.execute(
+                "SELECT id, urgency, enqueued_at, session_id, ticket FROM ticket_queue ORDER BY enqueued_at"):
+            self._levels[urgency].append(TicketJob(ticket=json.loads(ticket), session_id=session_id,
+                                                   urgency=urgency, id=job_id, enqueued_at=enqueued_at))
+
+    def put(self, job: TicketJob, block: bool = False, timeout: Optional[float] = None):
+        with self._cond:  # re-entrant: the row exists before any worker can take the job
+            super().put(job, block=block, timeout=timeout)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ticket_queue (id, urgency, enqueued_at, session_id, ticket) VALUES (?, ?, ?, ?, ?)",
+                (job.id, job.urgency, job.enqueued_at, job.session_id, json.dumps(job.ticket, default=str)))
+
+    def get(self, timeout: Optional[float] = None) -> Optional[TicketJob]:
+        with self._cond:
+            job = super().get(timeout=timeout)
+            if job is not None:
+                self.conn.execute("UPDATE ticket_queue SET status = 'running' WHERE id = ?", (job.id,))
+            return job
+
+    def task_done(self, job: TicketJob):
+        with self._cond:
+            self.conn.execute("DELETE FROM ticket_queue WHERE id = ?", (job.id,))
+
+    def dispose(self):
+        with self._cond:
+            self.conn.close()
+
+
+def _default_handler(ticket: Dict[str, Any], session_id: Optional[str] = None, **options) -> Dict[str, Any]:
+    from .workflow import orchestrator
+    return orchestrator(ticket, session_id=session_id, **options)
+
+
+class WorkerPool:
+    """
+    Drains a PriorityTicketQueue with `workers` threads. In "process" mode each
+    thread hands its ticket to a ProcessPoolExecutor, so CPU-bound work runs in
+    parallel (the handler must be picklable, e.g. a module-level function).
+    """
+
+    def __init__(self,
+                 handler: Callable[..., Dict[str, Any]] = _default_handler,
+                 workers: int = 4,
+                 mode: str = "thread",
+                 queue: Optional[PriorityTicketQueue] = None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode '{mode}'")
+        self.handler = handler
+        self.workers = workers
+        self.mode = mode
+        self.queue = queue if queue is not None else PriorityTicketQueue()
+        self._executor = ProcessPoolExecutor(max_workers=workers) if mode == "process" else None
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy = 0
+        self.processed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, handler: Callable[..., Dict[str, Any]] = _default_handler) -> "WorkerPool":
+        env = os.environ
+        max_depth = int(env.get("QUEUE_MAX_DEPTH", 1000))
+        shed = env.get("QUEUE_SHED_DEPTH")
+        kwargs = dict(max_depth=max_depth, shed_depth=int(shed) if shed else None,
+                      age_step=float(env.get("QUEUE_AGE_STEP", 30)))
+        queue = SQLiteTicketQueue(env["QUEUE_DB"], **kwargs) if env.get("QUEUE_DB") else PriorityTicketQueue(**kwargs)
+        return cls(handler, workers=int(env.get("QUEUE_WORKERS", 4)), mode=env.get("QUEUE_MODE", "thread"),
+                   queue=queue)
+
+    def start(self) -> "WorkerPool":
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"ticket-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, ticket: Dict[str, Any], session_id: Optional[str] = None,
+               block: bool = False, timeout: Optional[float] = None, **options) -> Future:
+        """
+        Queue a ticket; raises QueueFull when admission control refuses it.
+        `options` are passed to the handler as keyword arguments (thread mode
+        only for callables such as orchestrator's on_node).
+        """
+        job = TicketJob(ticket=ticket, session_id=session_id, urgency=urgency_of(ticket), options=options)
+        self.queue.put(job, block=block, timeout=timeout)
+        return job.future
+
+    def _loop(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: TicketJob):
+        if not job.future.set_running_or_notify_cancel():
+            self.queue.task_done(job)
+            return
+        job.started_at = time.time()
+        QUEUE_WAIT.observe(job.wait_s, urgency=job.urgency)
+        with self._lock:
+            self._busy += 1
+        try:
+            if self._executor is not None:
+                result = self._executor.submit(self.handler, job.ticket, job.session_id, **job.options).result()
+            else:
+                result = self.handler(job.ticket, job.session_id, **job.options)
+        except BaseException as exc:
+            job.finished_at = time.time()
+            with self._lock:
+                self.failed += 1
+            job.future.set_exception(exc)
+        else:
+            job.finished_at = time.time()
+            if isinstance(result, dict):
+                result["queue"] = {"urgency": job.urgency, "wait_s": job.wait_s, "processing_s": job.processing_s}
+            with self._lock:
+                self.processed += 1
+            job.future.set_result(result)
+        finally:
+            with self._lock:
+                self._busy -= 1
+            QUEUE_PROCESSING.observe(job.processing_s or 0.0, urgency=job.urgency)
+            self.queue.task_done(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.workers, "mode": self.mode, "busy": self._busy, "depth": len(self.queue),
+                    "depths": self.queue.depths(), "processed": self.processed, "failed": self.failed}
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; workers finish what is queued, then exit."""
+        self.queue.close()
+        if wait:
+            for t in self._threads:
+                t.join()
+            self.queue.dispose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
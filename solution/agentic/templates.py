@@ -0,0 +1,130 @@
+# agentic/templates.py
+"""
+Template answers for well-understood intents.
+
+Many CultPass help articles end with a "**Suggested phrasing:**" block. When the
+classifier is confident and retrieval backs it up (the Retriever ranks the article
+first with a high enough score, or finds a similar past case of the same intent),
+TemplateEngine renders that phrasing (plus ticket fields) directly, so the resolver
+can skip the LLM call entirely.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_SOLUTION_DIR = Path(__file__).resolve().parent.parent
+ARTICLES_FILE = _SOLUTION_DIR / "data" / "external" / "cultpass_articles.jsonl"
+
+# intent (from Classifier) -> title of the article whose phrasing answers it
+INTENT_ARTICLES = {
+    "reservation_howto": "How to Reserve a Spot for an Event",
+    "subscription_info": "What's Included in a CultPass Subscription",
+    "cancel_subscription": "How to Cancel or Pause a Subscription",
+    "login_issue": "How to Handle Login Issues?",
+    "payment_update": "How to Update Payment Information",
+}
+
+_PHRASING_RE = re.compile(r"\*\*Suggested phrasing:\*\*\s*\n\s*\"?(.*?)\"?\s*$", re.S)
+class TemplateEngine:
+    def __init__(self,
+                 articles_file: Path = ARTICLES_FILE,
+                 intent_articles: Dict[str, str] = None,
+                 min_classifier_confidence: float = None,
+                 min_retrieval_score: float = None):
+        self.intent_articles = intent_articles or INTENT_ARTICLES
+        self.min_classifier_confidence = min_classifier_confidence if min_classifier_confidence is not None \
+            else float(os.environ.get("TEMPLATE_MIN_CLASSIFIER_CONFIDENCE", 0.85))
+        self.min_retrieval_score = min_retrieval_score if min_retrieval_score is not None \
+            else float(os.environ.get("TEMPLATE_MIN_RETRIEVAL_SCORE", 0.3))
+        self.templates: Dict[str, Dict[str, Any]] = {}
+        self._load(Path(articles_file))
+
+    def _load(self, path: Path):
+        if not path.exists():
+            return
+        wanted = set(self.intent_articles.values())
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    article = json.loads(line)
+                except Exception:
+                    continue
+                title = article.get("title")
+                if title not in wanted:
+                    continue
+                match = _PHRASING_RE.search(article.get("content", ""))
+                if not match:
+                    continue
+                self.templates[title] = {
+                    "title": title,
+                    "phrasing": match.group(1).strip(),
+                }
+
+    @staticmethod
+    def evidence(title: str, intent: str, docs: List[Dict[str, Any]]) -> float:
+        """
+        Retrieval support for the article: its search score when it is the best-scoring article the
+        Retriever returned, or the top similarity of a past case resolved under the same intent.
+        Keyword-fallback KB hits carry a placeholder score and are not evidence.
+        """
+        best = 0.0
+        top_article = None  # (title, score)
+        for d in docs or []:
+            if d.get("score") is None or d.get("source") == "kb":
+                continue
+            metadata = d.get("metadata") or {}
+            if isinstance(metadata, str):
+                try:
+                    metadata = json.loads(metadata)
+                except ValueError:
+                    metadata = {}
+            score = float(d["score"])
+            if d.get("source") == "article":
+                if top_article is None or score > top_article[1]:
+                    top_article = (metadata.get("title"), score)
+            elif metadata.get("intent") == intent:
+                best = max(best, score)
+        if top_article is not None and top_article[0] == title:
+            best = max(best, top_article[1])
+        return best
+
+    def match(self, ticket: Dict[str, Any], classifier_out: Dict[str, Any],
+              retrieved_docs: List[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return {template, score} when both thresholds are cleared, else None."""
+        intent = (classifier_out or {}).get("intent")
+        title = self.intent_articles.get(intent)
+        template = self.templates.get(title) if title else None
+        if template is None:
+            return None
+        if (classifier_out or {}).get("confidence", 0.0) < self.min_classifier_confidence:
+            return None
+        score = self.evidence(title, intent, retrieved_docs)
+        if score < self.min_retrieval_score:
+            return None
+        return {"template": template, "score": score}
+
+    def render(self, ticket: Dict[str, Any], classifier_out: Dict[str, Any],
+               retrieved_docs: List[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Resolver-shaped output built from the article phrasing, or None to fall back to the LLM."""
+        hit = self.match(ticket, classifier_out, retrieved_docs)
+        if hit is None:
+            return None
+        template = hit["template"]
+        metadata = ticket.get("metadata", {}) or {}
+        name = ticket.get("user_name") or metadata.get("customer_name")
+        greeting = f"Hi {name}, thanks for reaching out." if name else "Thanks for reaching out."
+        parts = [greeting, template["phrasing"]]
+        if ticket.get("ticket_id"):
+            parts.append(f"(Reference: ticket {ticket['ticket_id']})")
+        return {
+            "response": "\n\n".join(parts),
+            "confidence": min(0.95, classifier_out.get("confidence", 0.0)),
+            "sources_used": 1,
+            "actions": [],
+            "templated": True,
+            "template": template["title"],
+            "template_score": round(hit["score"], 3),
+        }
@@ -1,35 +1,42 @@
-from sqlalchemy.orm import Session
-from models import User, Account  # your earlier ORM models
+# agentic/tools/account_lookup.py
+from typing import Any, Dict, Optional
 
-class AccountLookupTool:
-    def __init__(self, db_session_factory):
-        self.db_session_factory = db_session_factory
-
-    def call(self, user_id: str):
-        """Look up account info from real database."""
-        with self.db_session_factory() as session:
-            user = session.query(User).filter_by(user_id=user_id).first()
-
-            if not user:
-                return {
-                    "status": "error",
-                    "message": f"User with ID {user_id} not found."
-                }
+from .customer_data import CustomerData, get_customer_data
 
-            account = session.query(Account).filter_by(user_id=user_id).first()
 
-            if not account:
-                return {
-                    "status": "error",
-                    "message": f"Account record missing for user {user_id}."
-                }
+class AccountLookupTool:
+    def __init__(self, customer_data: Optional[CustomerData] = None):
+        self.customer_data = customer_data or get_customer_data()
 
+    def call(self, user_id: str):
+        """Look up account info (one cached, joined query; see customer_data.py)."""
+        profile = self.customer_data.lookup(user_id)
+        if not profile:
             return {
-                "status": "success",
-                "user_id": user.user_id,
-                "name": user.name,
-                "email": user.email,
-                "balance": account.balance,
-                "membership": account.membership_type,
-                "updated_at": account.updated_at.isoformat()
+                "status": "error",
+                "message": f"User with ID {user_id} not found."
             }
+        return self._result(profile)
+
+    def call_many(self, user_ids) -> Dict[str, Dict[str, Any]]:
+        """Bulk variant: user_id -> the same result `call` returns."""
+        return {
+            user_id: self._result(profile) if profile else
+            {"status": "error", "message": f"User with ID {user_id} not found."}
+            for user_id, profile in self.customer_data.lookup_many(user_ids).items()
+        }
+
+    @staticmethod
+    def _result(profile: Dict[str, Any]) -> Dict[str, Any]:
+        subscription = profile.get("subscription") or {}
+        return {
+            "status": "success",
+            "user_id": profile["user_id"],
+            "name": profile["name"],
+            "email": profile["email"],
+            "balance": profile["balance"],
+            "membership": subscription.get("tier"),
+            "subscription_status": subscription.get("status"),
+            "reservations": len(profile.get("reservations") or []),
+            "updated_at": profile.get("updated_at"),
+        }
@@ -0,0 +1,286 @@
+# agentic/tools/customer_data.py
+"""
+Customer data access for the tools (CultPass database).
+
+One joined query returns a user with their account balance, subscription and
+reservations (users LEFT JOIN account_balances, subscriptions, reservations,
+experiences); `lookup_many` does the same for a batch of users with an IN
+list. Profiles are kept in a TTL cache shared by every tool on the pooled
+engine; writers (RefundTool) call `invalidate(user_id)` after committing.
+`context` is the smaller account summary the workflow prefetches for the
+resolver prompt (subscription quota, next reservations, balance).
+
+    CULTPASS_DB_URL=sqlite:///./data/external/cultpass.db
+    CUSTOMER_CACHE_TTL_SECONDS=60   (0 disables the cache)
+    CUSTOMER_CACHE_MAX_ENTRIES=10000
+    CUSTOMER_DB_POOL_SIZE=5
+    CUSTOMER_CONTEXT_RESERVATIONS=3 upcoming reservations in the resolver context
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, func, select
+from sqlalchemy.orm import selectinload
+
+from data.models.cultpass import AccountBalance, Experience, RefundLedger, Reservation, Subscription, User
+from ..db import ensure_schema, get_engine, get_read_engine, session_factory
+from ..metrics import record_cache
+
+DEFAULT_URL = "sqlite:///./data/external/cultpass.db"
+_IN_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISSING
+            if item[0] <= time.monotonic():
+                del self._items[key]
+                return _MISSING
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, value: Any):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def profile_query(user_ids: List[str]):
+    """The joined profile query (also used by db_indexes.py to check its plan)."""
+    return (
+        select(User.user_id, User.full_name, User.email, User.is_blocked, User.updated_at,
+               AccountBalance.balance, AccountBalance.currency, AccountBalance.updated_at.label("balance_updated_at"),
+               Subscription.subscription_id, Subscription.status.label("subscription_status"), Subscription.tier,
+               Subscription.monthly_quota, Subscription.started_at, Subscription.ended_at,
+               Reservation.reservation_id, Reservation.status.label("reservation_status"),
+               Reservation.experience_id, Experience.title, Experience.when)
+        .select_from(User)
+        .outerjoin(AccountBalance, AccountBalance.user_id == User.user_id)
+        .outerjoin(Subscription, Subscription.user_id == User.user_id)
+        .outerjoin(Reservation, Reservation.user_id == User.user_id)
+        .outerjoin(Experience, Experience.experience_id == Reservation.experience_id)
+        .where(User.user_id.in_(user_ids))
+        .order_by(User.user_id, Experience.when)
+    )
+
+
+# built once: the user row plus one IN query each for subscription and balance. Reservations are
+# not loaded through the relationship (that would be the user's whole history); the two bounded
+# queries below fetch only the next N upcoming bookings and this month's booking count.
+CONTEXT_QUERY = (
+    select(User)
+    .where(User.user_id == bindparam("user_id"))
+    .options(selectinload(User.subscription), selectinload(User.account_balance))
+)
+
+UPCOMING_QUERY = (
+    select(Reservation.status, Experience.title, Experience.when)
+    .join(Experience, Experience.experience_id == Reservation.experience_id)
+    .where(Reservation.user_id == bindparam("user_id"), Reservation.status == "reserved",
+           Experience.when >= bindparam("now"))
+    .order_by(Experience.when)
+    .limit(bindparam("limit", type_=Integer))
+)
+
+BOOKED_QUERY = (
+    select(func.count())
+    .select_from(Reservation)
+    .where(Reservation.user_id == bindparam("user_id"), Reservation.status == "reserved",
+           Reservation.created_at >= bindparam("since"))
+)
+
+
+class CustomerData:
+    def __init__(self, db_url: str = None, ttl_seconds: float = 60.0, max_entries: int = 10000,
+                 pool_size: int = 5, max_reservations: int = 20,
+                 context_reservations: int = 3):
+        self.db_url = db_url or DEFAULT_URL
+        overrides = {}
+        if self.db_url.startswith("sqlite") and ":memory:" not in self.db_url:
+            overrides.update(pool_size=pool_size, max_overflow=pool_size)
+        # shared per URL (agentic/db.py); the pool size only applies if this is the first user of the URL
+        self.engine = get_engine(self.db_url, **overrides)
+        # the tables this layer adds to the CultPass schema
+        ensure_schema(self.db_url, AccountBalance.metadata, tables=[AccountBalance.__table__, RefundLedger.__table__])
+        self.cache = TTLCache(ttl_seconds, max_entries)
+        self.context_cache = TTLCache(ttl_seconds, max_entries)
+        self.max_reservations = max_reservations
+        self.context_reservations = context_reservations
+
+    @classmethod
+    def from_env(cls) -> "CustomerData":
+        return cls(
+            db_url=os.environ.get("CULTPASS_DB_URL") or None,
+            ttl_seconds=float(os.environ.get("CUSTOMER_CACHE_TTL_SECONDS", 60)),
+            max_entries=int(os.environ.get("CUSTOMER_CACHE_MAX_ENTRIES", 10000)),
+            pool_size=int(os.environ.get("CUSTOMER_DB_POOL_SIZE", 5)),
+            context_reservations=int(os.environ.get("CUSTOMER_CONTEXT_RESERVATIONS", 3)),
+        )
+
+    # -----------------------------------------------------------------
+    # reads
+    # -----------------------------------------------------------------
+    def _query(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        stmt = profile_query(user_ids)
+        profiles: Dict[str, Dict[str, Any]] = {}
+        # profiles are cached for up to the TTL anyway, so replica lag is acceptable here
+        with get_read_engine(self.db_url).connect() as conn:
+            for row in conn.execute(stmt):
+                profile = profiles.get(row.user_id)
+                if profile is None:
+                    profile = profiles[row.user_id] = {
+                        "user_id": row.user_id,
+                        "name": row.full_name,
+                        "email": row.email,
+                        "is_blocked": bool(row.is_blocked),
+                        "updated_at": _iso(row.balance_updated_at or row.updated_at),
+                        "balance": row.balance if row.balance is not None else 0.0,
+                        "currency": row.currency or "INR",
+                        "subscription": None if row.subscription_id is None else {
+                            "subscription_id": row.subscription_id,
+                            "status": row.subscription_status,
+                            "tier": row.tier,
+                            "monthly_quota": row.monthly_quota,
+                            "started_at": _iso(row.started_at),
+                            "ended_at": _iso(row.ended_at),
+                        },
+                        "reservations": [],
+                    }
+                if row.reservation_id is not None and len(profile["reservations"]) < self.max_reservations:
+                    profile["reservations"].append({
+                        "reservation_id": row.reservation_id,
+                        "status": row.reservation_status,
+                        "experience_id": row.experience_id,
+                        "title": row.title,
+                        "when": _iso(row.when),
+                    })
+        return profiles
+
+    def lookup(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Profile dict for one user, or None if the user does not exist (cached: treat as read-only)."""
+        return self.lookup_many([user_id]).get(user_id)
+
+    def lookup_many(self, user_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """user_id -> profile (None when unknown), one query per _IN_CHUNK uncached ids."""
+        out: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing = []
+        for user_id in dict.fromkeys(u for u in user_ids if u):
+            cached = self.cache.get(user_id)
+            record_cache("customer_profile", cached is not _MISSING)
+            if cached is _MISSING:
+                missing.append(user_id)
+            else:
+                out[user_id] = cached
+        for start in range(0, len(missing), _IN_CHUNK):
+            chunk = missing[start:start + _IN_CHUNK]
+            found = self._query(chunk)
+            for user_id in chunk:
+                profile = found.get(user_id)
+                # unknown users are cached too, so repeated bad ids don't hit the DB
+                self.cache.put(user_id, profile)
+                out[user_id] = profile
+        return out
+
+    def context(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Compact account summary for the resolver prompt, or None for unknown users:
+            {"user_id", "name", "blocked", "balance", "currency", "subscription",
+             "booked_this_month", "quota_remaining", "upcoming": [{"title", "when", "status"}]}
+        """
+        if not user_id:
+            return None
+        cached = self.context_cache.get(user_id)
+        record_cache("customer_context", cached is not _MISSING)
+        if cached is not _MISSING:
+            return cached
+        # lag-tolerant like lookups (cached for the TTL anyway): may read from a replica
+        now = datetime.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        with session_factory(get_read_engine(self.db_url))() as session:
+            user = session.scalars(CONTEXT_QUERY, {"user_id": user_id}).first()
+            summary = None
+            if user is not None:
+                upcoming = session.execute(UPCOMING_QUERY, {"user_id": user_id, "now": now,
+                                                            "limit": self.context_reservations}).all()
+                # quota is counted against bookings made this calendar month
+                booked = session.scalar(BOOKED_QUERY, {"user_id": user_id, "since": month_start})
+                summary = self._summarise(user, upcoming, booked or 0)
+        self.context_cache.put(user_id, summary)
+        return summary
+
+    @staticmethod
+    def _summarise(user: User, upcoming: List[Any], booked: int) -> Dict[str, Any]:
+        sub = user.subscription
+        balance = user.account_balance
+        return {
+            "user_id": user.user_id,
+            "name": user.full_name,
+            "blocked": bool(user.is_blocked),
+            "balance": balance.balance if balance is not None else 0.0,
+            "currency": balance.currency if balance is not None else "INR",
+            "subscription": None if sub is None else {
+                "status": sub.status,
+                "tier": sub.tier,
+                "monthly_quota": sub.monthly_quota,
+                "ended_at": _iso(sub.ended_at),
+            },
+            "booked_this_month": booked,
+            "quota_remaining": None if sub is None else max(0, sub.monthly_quota - booked),
+            "upcoming": [{"title": r.title, "when": _iso(r.when), "status": r.status} for r in upcoming],
+        }
+
+    def invalidate(self, user_id: str = None):
+        self.cache.invalidate(user_id)
+        self.context_cache.invalidate(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        return {"cached": len(self.cache), "pool": pool.status() if hasattr(pool, "status") else None}
+
+
+_shared: Optional[CustomerData] = None
+_shared_lock = threading.Lock()
+
+
+def get_customer_data() -> CustomerData:
+    """Process-wide instance (one engine and one cache for every tool)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = CustomerData.from_env()
+    return _shared
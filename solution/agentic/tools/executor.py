@@ -0,0 +1,171 @@
+# agentic/tools/executor.py
+"""
+Concurrent tool execution for resolver actions.
+
+Tools are registered by name with a per-tool timeout; `ToolExecutor.run`
+submits every action of a ticket to a shared thread pool at once and
+collects the results in action order. A tool still running at its deadline
+is reported as a timeout (the thread finishes in the background; its result
+is discarded), so one hung integration no longer stalls the graph.
+
+    TOOL_WORKERS=8
+    TOOL_TIMEOUT_SECONDS=10
+    TOOL_TIMEOUTS=refund=5,send_email=2   per-tool overrides
+    TOOLS_DRY_RUN=1                       refunds/emails are previewed, not executed
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from ..metrics import metrics
+
+TOOL_DURATION = metrics.histogram("tool_duration_seconds", "Tool call wall time, by tool")
+TOOL_CALLS = metrics.counter("tool_calls_total", "Tool calls, by tool and status (ok/error/timeout/not_implemented)")
+
+NOT_IMPLEMENTED = "tool_not_implemented"
+
+# fn(params, dry_run) -> result dict
+ToolFn = Callable[[Dict[str, Any], bool], Any]
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    factory: Callable[[], ToolFn]
+    timeout: float
+    _fn: Optional[ToolFn] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def fn(self) -> ToolFn:
+        # tools open DB engines: build on first call (in a pool thread, so it counts against the deadline)
+        if self._fn is None:
+            with self._lock:
+                if self._fn is None:
+                    self._fn = self.factory()
+        return self._fn
+
+
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    timeouts = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, seconds = part.split("=", 1)
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+class ToolRegistry:
+    def __init__(self, default_timeout: float = 10.0, timeouts: Dict[str, float] = None):
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._tools: Dict[str, ToolSpec] = {}
+
+    def register(self, name: str, factory: Callable[[], ToolFn], timeout: float = None):
+        timeout = self.timeouts.get(name, timeout if timeout is not None else self.default_timeout)
+        self._tools[name] = ToolSpec(name, factory, timeout)
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+
+# ---------------------------------------------------------------------
+# built-in tools (params come from resolver actions; user_id from the ticket)
+# ---------------------------------------------------------------------
+def _refund_tool() -> ToolFn:
+    from .refund import RefundTool
+    tool = RefundTool()
+
+    def call(params: Dict[str, Any], dry_run: bool) -> Dict[str, Any]:
+        if params.get("amount") is None:
+            return {"status": "needs_input", "missing": ["amount"],
+                    "message": "Refund amount not provided; confirm it with the customer."}
+        # one refund per ticket and order, however often the ticket is retried
+        key = params.get("idempotency_key") or (
+            f"{params['ticket_id']}:refund:{params.get('order_id') or ''}" if params.get("ticket_id") else None)
+        return tool.call(params.get("user_id"), float(params["amount"]), dry_run=dry_run, idempotency_key=key)
+    return call
+
+
+def _account_lookup_tool() -> ToolFn:
+    from .account_lookup import AccountLookupTool
+    tool = AccountLookupTool()
+    return lambda params, dry_run: tool.call(params.get("user_id"))
+
+
+def _send_email_tool() -> ToolFn:
+    from .send_email import send_email
+    return lambda params, dry_run: send_email(params.get("to"), params.get("subject", ""), params.get("body", ""),
+                                              dry_run=dry_run)
+
+
+def default_registry() -> ToolRegistry:
+    registry = ToolRegistry(default_timeout=float(os.environ.get("TOOL_TIMEOUT_SECONDS", 10)),
+                            timeouts=parse_timeouts(os.environ.get("TOOL_TIMEOUTS", "")))
+    registry.register("refund", _refund_tool)
+    registry.register("account_lookup", _account_lookup_tool)
+    registry.register("send_email", _send_email_tool)
+    return registry
+
+
+class ToolExecutor:
+    def __init__(self, registry: ToolRegistry = None, max_workers: int = 8, dry_run: bool = True):
+        self.registry = registry or default_registry()
+        self.dry_run = dry_run
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutor":
+        return cls(max_workers=int(os.environ.get("TOOL_WORKERS", 8)),
+                   dry_run=os.environ.get("TOOLS_DRY_RUN", "1").lower() in ("1", "true", "yes"))
+
+    def _call(self, spec: ToolSpec, params: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = spec.fn()(params, self.dry_run)
+            status = "error" if isinstance(result, dict) and result.get("status") == "error" else "ok"
+        except Exception as exc:
+            result, status = {"status": "error", "message": str(exc)}, "error"
+        return {"result": result, "status": status, "ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def run(self, actions: List[Dict[str, Any]], defaults: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Execute actions concurrently; one entry per action, in action order:
+            {"tool", "params", "result", "status", "ms"}
+        `defaults` fill missing params (e.g. the ticket's user_id).
+        """
+        submitted = []
+        started = time.monotonic()
+        for action in actions:
+            name = action.get("tool")
+            params = {**(defaults or {}), **(action.get("params") or {})}
+            spec = self.registry.get(name)
+            future = self._pool.submit(self._call, spec, params) if spec is not None else None
+            submitted.append((name, params, spec, future))
+
+        results = []
+        for name, params, spec, future in submitted:
+            if future is None:
+                entry = {"result": NOT_IMPLEMENTED, "status": "not_implemented", "ms": 0.0}
+            else:
+                # deadlines run from submission, so waiting on earlier actions doesn't extend later ones
+                remaining = spec.timeout - (time.monotonic() - started)
+                try:
+                    entry = future.result(timeout=max(0.0, remaining))
+                except FutureTimeout:
+                    future.cancel()
+                    entry = {"result": {"status": "timeout", "message": f"{name} exceeded {spec.timeout}s"},
+                             "status": "timeout", "ms": round((time.monotonic() - started) * 1000, 3)}
+                TOOL_DURATION.observe(entry["ms"] / 1000, tool=name)
+            TOOL_CALLS.inc(tool=name, status=entry["status"])
+            results.append({"tool": name, "params": params, **entry})
+        return results
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
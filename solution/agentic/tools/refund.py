@@ -1,9 +1,42 @@
+# agentic/tools/refund.py
+import os
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from .customer_data import CustomerData, get_customer_data
+
+# SQLite busy/locked errors that are worth retrying (the connection's busy timeout already waited)
+_BUSY_MARKERS = ("database is locked", "database is busy", "database table is locked")
+
+_CLAIM = text("INSERT INTO refund_ledger (idempotency_key, user_id, amount, created_at) "
+              "VALUES (:key, :user_id, :amount, CURRENT_TIMESTAMP) ON CONFLICT (idempotency_key) DO NOTHING")
+_CREDIT = text("INSERT INTO account_balances (user_id, balance, currency, created_at, updated_at) "
+               "VALUES (:user_id, :amount, 'INR', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+               "ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance, "
+               "updated_at = CURRENT_TIMESTAMP")
+_BALANCE = text("SELECT balance FROM account_balances WHERE user_id = :user_id")
+_RECORD = text("UPDATE refund_ledger SET balance_after = :balance WHERE idempotency_key = :key")
+_EXISTING = text("SELECT user_id, amount, balance_after FROM refund_ledger WHERE idempotency_key = :key")
+
+
 class RefundTool:
-    def __init__(self, db_session_factory, refund_cap=5000):
-        self.db_session_factory = db_session_factory
+    def __init__(self, customer_data: Optional[CustomerData] = None, refund_cap=5000, max_retries: int = None):
+        self.customer_data = customer_data or get_customer_data()
         self.refund_cap = refund_cap
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("REFUND_MAX_RETRIES", 5))
+
+    def call(self, user_id: str, amount: float, dry_run: bool = False, idempotency_key: str = None):
+        """
+        Credit `amount` to the user's balance.
 
-    def call(self, user_id: str, amount: float):
+        The balance changes with a single `balance = balance + :amount` upsert, in the
+        same transaction as the refund_ledger row for `idempotency_key`; a key that is
+        already in the ledger returns the original refund instead of crediting again.
+        """
         if amount <= 0:
             return {"status": "error", "message": "Refund amount must be greater than zero."}
 
@@ -13,25 +46,48 @@ class RefundTool:
                 "message": f"Refund amount exceeds cap of ₹{self.refund_cap}."
             }
 
-        with self.db_session_factory() as session:
-            account = session.query(Account).filter_by(user_id=user_id).first()
+        # existence check is served from the profile cache
+        if not self.customer_data.lookup(user_id):
+            return {"status": "error", "message": "Account not found."}
 
-            if not account:
-                return {"status": "error", "message": "Account not found."}
+        if dry_run:
+            return {"status": "dry_run", "message": f"₹{amount} refund validated, not applied.", "amount": amount}
 
+        for attempt in range(self.max_retries + 1):
             try:
-                account.balance += amount
-                session.commit()
-
-                return {
-                    "status": "success",
-                    "message": f"₹{amount} refunded.",
-                    "new_balance": account.balance
-                }
-
+                result = self._apply(user_id, amount, idempotency_key)
+                break
+            except OperationalError as e:
+                if attempt < self.max_retries and any(m in str(e.orig).lower() for m in _BUSY_MARKERS):
+                    time.sleep(min(1.0, 0.01 * 2 ** attempt) * (0.5 + random.random()))
+                    continue
+                return {"status": "error", "message": f"Refund failed: {str(e.orig)}"}
             except Exception as e:
-                session.rollback()
-                return {
-                    "status": "error",
-                    "message": f"Refund failed: {str(e)}"
-                }
+                return {"status": "error", "message": f"Refund failed: {str(e)}"}
+        # cached profiles carry the balance
+        self.customer_data.invalidate(user_id)
+        return result
+
+    def _apply(self, user_id: str, amount: float, idempotency_key: Optional[str]):
+        # the ledger insert is the first statement, so the write lock is taken up front
+        # (no read-then-upgrade deadlock between concurrent writers)
+        with self.customer_data.engine.begin() as conn:
+            if idempotency_key:
+                claimed = conn.execute(_CLAIM, {"key": idempotency_key, "user_id": user_id, "amount": amount}).rowcount
+                if not claimed:
+                    prior = conn.execute(_EXISTING, {"key": idempotency_key}).one()
+                    return {
+                        "status": "duplicate",
+                        "message": f"Refund {idempotency_key} was already applied.",
+                        "amount": prior.amount,
+                        "new_balance": prior.balance_after,
+                    }
+            conn.execute(_CREDIT, {"user_id": user_id, "amount": amount})
+            balance = conn.execute(_BALANCE, {"user_id": user_id}).scalar_one()
+            if idempotency_key:
+                conn.execute(_RECORD, {"balance": balance, "key": idempotency_key})
+        return {
+            "status": "success",
+            "message": f"₹{amount} refunded.",
+            "new_balance": balance
+        }
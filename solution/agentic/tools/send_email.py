@@ -5,5 +5,9 @@ from ..tools.tools_utils import now_iso
 def send_email(to: str, subject: str, body: str, dry_run: bool = True) -> Dict[str, Any]:
     if dry_run:
         return {"success": True, "dry_run": True, "preview": {"to": to, "subject": subject, "body": body[:400], "ts": now_iso()}}
-    # integrate with SMTP or SendGrid here
-    return {"success": True, "message_id": f"msg-{now_iso()}"}
+    if not to:
+        return {"success": False, "status": "error", "message": "Recipient address is required."}
+    # durable outbox; the dispatcher thread delivers it (agentic/mailer.py)
+    from ..mailer import get_mailer
+    message_id = get_mailer().enqueue(to, subject, body)
+    return {"success": True, "queued": True, "message_id": message_id}
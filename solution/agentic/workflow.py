@@ -1,133 +1,295 @@
 # agentic/workflow.py
 """
 LangGraph-based workflow for the Universal Decision Agent (updated with Option A memory changes and correct LLM usage).
-- Preserves all original nodes and graph structure.
+- Preserves all original nodes; ingest fans out to parallel branches
+  (load_stm | prefetch_profile | ltm_retrieve | classifier); the classifier's route plan decides
+  whether the KB retriever runs before the resolver, or escalates straight away.
 - Adds TicketMessage persistence, reads ticket messages for session/user, and stores resolved issues in LTM metadata.
 - Minimal additions only; no destructive edits.
 - Resolver initialized with LLM to fix __init__ error.
 """
 
-from typing import TypedDict, Dict, Any, List, Optional
-from langgraph.graph import StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from typing import TypedDict, Callable, Dict, Any, List, Optional, Annotated
 
 from .agents import Classifier, Retriever, Resolver, Supervisor, Escalation, Auditor
-from .memory.memory_repo import MemoryRepository
-from .tools import refund as refund_tool
 from utils import new_id, now_iso
 from .node_utils import safe_node
+from .llm import get_llm
+from .metrics import metrics, record_cache, start_snapshot_writer, approx_size, STAGES_SKIPPED, STATE_BYTES, TICKET_DURATION
+from .registry import Registry
+from .resilience import ResilientLLM
+from .templates import TemplateEngine
 import os
+import time
 from dotenv import load_dotenv
 
-# Import LLM
-from langchain_openai import ChatOpenAI
-
 load_dotenv()
+# METRICS_SNAPSHOT_PATH may come from .env, after agentic.metrics was imported
+start_snapshot_writer()
 
 # ---------------------------------------------------------------------
 # 1. DEFINE STATE SCHEMA
 # ---------------------------------------------------------------------
+# Keys written by parallel branches need reducers; a RESET marker (written by
+# ingest) starts a fresh dict for each turn of a thread.
+# State is kept constant-size per turn: audit events live in the auditor's
+# EventBuffer (not in checkpoints), merged docs are referenced by id, and
+# STM / ticket history is compacted and capped.
+RESET = "__reset__"
+STM_CONTEXT_LIMIT = int(os.environ.get("STM_CONTEXT_LIMIT", 5))
+TICKET_MESSAGES_LIMIT = int(os.environ.get("TICKET_MESSAGES_LIMIT", 20))
+
+
+def merge_timings(left: Optional[Dict[str, float]], right: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    right = dict(right or {})
+    if right.pop(RESET, False):
+        return right
+    return {**(left or {}), **right}
+
+
+def last_value(left: Any, right: Any) -> Any:
+    # like a plain key, but tolerates several writes in one step (e.g. two failing branches)
+    return right
+
+
 class WorkflowState(TypedDict, total=False):
     ticket: Dict[str, Any]
     session_id: Optional[str]
     stm_context: Optional[List[Dict[str, Any]]]
     ticket_messages: Optional[List[Dict[str, Any]]]   # historic messages loaded
+    customer_profile: Optional[Dict[str, Any]]         # CustomerData.context() for the ticket's user
     ltm_docs: Optional[List[Dict[str, Any]]]
     classifier_output: Optional[Dict[str, Any]]
-    retrieved_docs: Optional[List[Dict[str, Any]]]
+    route: Optional[Dict[str, Any]]                    # Supervisor.plan: stages to run / skipped
+    kb_docs: Optional[List[Dict[str, Any]]]            # KB hits from the retriever branch
+    context_doc_ids: Optional[List[Any]]               # ids of kb_docs + ltm_docs used by the resolver
     resolver_output: Optional[Dict[str, Any]]
-    supervisor_decision: Optional[Dict[str, Any]]
+    supervisor_decision: Annotated[Optional[Dict[str, Any]], last_value]
     tool_results: Optional[List[Dict[str, Any]]]
-    audit: Optional[Dict[str, Any]]
+    audit: Optional[Dict[str, Any]]                    # audit header; events are in auditor.buffer
+    timings: Annotated[Dict[str, float], merge_timings]  # node -> seconds (see safe_node)
+    error: Annotated[Optional[Dict[str, Any]], last_value]
 
 
 # ---------------------------------------------------------------------
-# 2. INITIALIZE AGENTS & MEMORY (with LLM for Resolver)
+# 2. REGISTER AGENTS & MEMORY (built lazily on first use, or by warmup())
 # ---------------------------------------------------------------------
-# --- LLM import & initialization: version-safe ---
-llm = ChatOpenAI(
-    model_name=os.environ.get("LLM_MODEL", "gpt-3.5-turbo"),
-    temperature=float(os.environ.get("LLM_TEMP", 0))
-)
+components = Registry()
+
+
+def _make_resolver() -> Resolver:
+    resolver = Resolver(llm=components.get("resolver_llm"))
+    if resolver.llm is None:
+        print("⚠️ Warning: Resolver LLM is not initialized!")
+    return resolver
+
+
+def _make_memory_repo():
+    # sqlalchemy/numpy are only imported once memory is actually needed
+    from .memory.memory_repo import MemoryRepository
+    from .memory.sharding import ShardedMemoryRepository
+    # per-tenant shard databases when MEMORY_SHARDS / MEMORY_SHARD_MAP is set, else one MEMORY_DB_URL
+    return ShardedMemoryRepository.from_env() or MemoryRepository()
+
+
+def _make_checkpointer():
+    # SQLite-backed, bounded per thread (CHECKPOINT_KEEP_LAST / CHECKPOINT_TTL_SECONDS)
+    from .memory.checkpointer import make_checkpointer
+    return make_checkpointer()
+
+
+def _make_customer_data():
+    from .tools.customer_data import get_customer_data
+    return get_customer_data()
+
+
+def _make_idempotency():
+    from .idempotency import IdempotencyStore
+    return IdempotencyStore.from_env()
+
 
-resolver = Resolver(llm=llm)
+def _make_tool_executor():
+    # tool implementations (and their DB engines) are built on first call
+    from .tools.executor import ToolExecutor
+    return ToolExecutor.from_env()
 
-if resolver.llm is None:
-    print("⚠️ Warning: Resolver LLM is not initialized!")
-else:
-    print("✅ Resolver LLM is initialized correctly")
 
+# --- LLM initialization: LLM_MODEL=fake selects the offline stand-in ---
+components.register("llm", get_llm)
+# deadlines, retries, hedging and circuit breaking (see agentic/resilience.py)
+components.register("resolver_llm", lambda: ResilientLLM(components.get("llm")))
+components.register("resolver", _make_resolver)
+components.register("classifier", Classifier)
+components.register("retriever", Retriever)
+components.register("template_engine", TemplateEngine)
+components.register("supervisor", lambda: Supervisor(
+    auto_threshold=float(os.environ.get("DEFAULT_CONFIDENCE_THRESHOLD", 0.75))))
+components.register("escalation_agent", Escalation)
+components.register("auditor", Auditor)
+components.register("memory_repo", _make_memory_repo)
+# CultPass account data, shared with the tools (CULTPASS_DB_URL, CUSTOMER_CACHE_*)
+components.register("customer_data", _make_customer_data)
+components.register("checkpointer", _make_checkpointer)
+# replay/coalesce duplicate submissions (IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_DB)
+components.register("idempotency", _make_idempotency)
+# resolver actions run concurrently with per-tool deadlines (TOOL_WORKERS, TOOL_TIMEOUTS)
+components.register("tool_executor", _make_tool_executor)
+# periodic JSON dump of agentic.metrics when METRICS_SNAPSHOT_PATH is set (None otherwise)
+components.register("metrics_snapshot", start_snapshot_writer)
 
-supervisor = Supervisor(auto_threshold=float(os.environ.get("DEFAULT_CONFIDENCE_THRESHOLD", 0.75)))
-escalation_agent = Escalation()
-auditor = Auditor()
-memory_repo = MemoryRepository()
+# resilience counters are exported as gauges, but only once the wrapper exists
+metrics.register_collector(
+    "resolver_llm", lambda: components.resolver_llm.stats() if components.is_ready("resolver_llm") else {})
 
 
 # ---------------------------------------------------------------------
 # 3. NODE FUNCTIONS
 # ---------------------------------------------------------------------
-def node_load_stm(state: WorkflowState) -> WorkflowState:
+# Each node returns a partial update; audit events go to 'audit_events', which
+# _buffer_events moves into the auditor's buffer (keyed by the audit id).
+def _audit_id(state: Dict[str, Any], update: Dict[str, Any] = None) -> Optional[str]:
+    return ((update or {}).get("audit") or state.get("audit") or {}).get("id")
+
+
+def _buffer_events(state: Dict[str, Any], update: Dict[str, Any], events: List[Dict[str, Any]]):
+    audit_id = _audit_id(state, update)
+    if audit_id and events:
+        components.auditor.buffer.extend(audit_id, events)
+
+
+def compact_stm_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """One small record per past turn (legacy rows nest whole tickets and agent outputs)."""
+    payload = payload or {}
+    if "role" in payload or payload.get("kind") == "turn":
+        return payload
+    ticket = payload.get("ticket") or {}
+    classifier = payload.get("classifier") or {}
+    resolver = payload.get("resolver") or {}
+    decision = payload.get("decision") or {}
+    return {
+        "kind": "turn",
+        "ticket_id": ticket.get("ticket_id"),
+        "ticket_text": (ticket.get("text") or "")[:500],
+        "intent": classifier.get("intent"),
+        "response": (resolver.get("response") or "")[:500],
+        "decision": {k: decision.get(k) for k in ("auto_resolve", "escalate", "reason") if k in decision},
+    }
+
+
+def ticket_account(ticket: Dict[str, Any]) -> Optional[str]:
+    """The ticket's tenant: memory rows are tagged with it and sharded by it."""
+    return ticket.get("account_id") or (ticket.get("metadata") or {}).get("account_id")
+
+
+def node_ingest(state: WorkflowState) -> WorkflowState:
     ticket = state.get("ticket", {})
     session_id = state.get("session_id") or ticket.get("metadata", {}).get("thread_id")
     if not session_id:
         session_id = f"session_{ticket.get('ticket_id', new_id())}"
-    state["session_id"] = session_id
+    audit = components.auditor.new_audit(ticket.get("ticket_id", new_id()))
+    return {
+        "session_id": session_id,
+        "audit": audit,
+        # reset per-turn keys: the checkpointer carries the previous turn's values
+        "audit_events": [components.auditor.event("ingest", {"ticket_id": ticket.get("ticket_id")})],
+        "timings": {RESET: True},
+        "error": None,
+        "supervisor_decision": None,
+        "resolver_output": None,
+        "tool_results": [],
+        # stages may be skipped this turn, so don't let last turn's docs leak through
+        "kb_docs": [],
+        "ltm_docs": [],
+        "context_doc_ids": [],
+        "customer_profile": None,
+    }
+
+
+def node_load_stm(state: WorkflowState) -> WorkflowState:
+    session_id = state.get("session_id")
+    ticket = state.get("ticket", {})
+    account_id = ticket_account(ticket)
+    events = []
+    update: WorkflowState = {}
 
     # Load STM
     try:
-        stm_rows = memory_repo.get_short(session_id=session_id)
+        stm_rows = components.memory_repo.get_short(session_id=session_id, limit=STM_CONTEXT_LIMIT,
+                                                    account_id=account_id)
         stm_context = []
         for row in stm_rows or []:
             if hasattr(row, "payload_json"):
-                stm_context.append(row.payload_json)
+                stm_context.append(compact_stm_payload(row.payload_json))
             elif isinstance(row, dict):
-                stm_context.append(row)
+                stm_context.append(compact_stm_payload(row))
             else:
                 stm_context.append(getattr(row, "__dict__", {}))
-        state["stm_context"] = stm_context
+        update["stm_context"] = stm_context
     except Exception as e:
-        state["stm_context"] = []
-        auditor.add_event(state.setdefault("audit", auditor.new_audit(ticket.get("ticket_id", "unknown"))),
-                         "load_stm_error", {"error": str(e)})
+        update["stm_context"] = []
+        events.append(components.auditor.event("load_stm_error", {"error": str(e)}))
 
     # Load ticket messages
     try:
-        messages = memory_repo.get_ticket_messages(session_id=session_id, limit=50)
+        messages = components.memory_repo.get_ticket_messages(session_id=session_id, limit=TICKET_MESSAGES_LIMIT,
+                                                              account_id=account_id)
         if not messages and ticket.get("user_id"):
-            messages = memory_repo.get_ticket_messages(user_id=ticket.get("user_id"), limit=50)
-        state["ticket_messages"] = messages or []
-        auditor.add_event(state["audit"], "load_ticket_messages", {"count": len(messages or [])})
+            messages = components.memory_repo.get_ticket_messages(user_id=ticket.get("user_id"),
+                                                                  limit=TICKET_MESSAGES_LIMIT, account_id=account_id)
+        messages = [compact_stm_payload(m) for m in messages or []]
+        update["ticket_messages"] = messages or []
+        events.append(components.auditor.event("load_ticket_messages", {"count": len(messages or [])}))
     except Exception as e:
-        state["ticket_messages"] = []
-        auditor.add_event(state["audit"], "load_ticket_messages_error", {"error": str(e)})
+        update["ticket_messages"] = []
+        events.append(components.auditor.event("load_ticket_messages_error", {"error": str(e)}))
 
-    return state
+    update["audit_events"] = events
+    return update
 
 
-def node_ingest(state: WorkflowState) -> WorkflowState:
-    ticket = state.get("ticket", {})
-    audit = state.get("audit") or auditor.new_audit(ticket.get("ticket_id", new_id()))
-    state["audit"] = audit
-    auditor.add_event(audit, "ingest", {"ticket_id": ticket.get("ticket_id")})
-    return state
+def node_prefetch_profile(state: WorkflowState) -> WorkflowState:
+    # runs alongside the classifier, so the resolver prompt already has the account (no lookup-tool turn)
+    user_id = state.get("ticket", {}).get("user_id")
+    if not user_id:
+        return {"customer_profile": None}
+    try:
+        profile = components.customer_data.context(user_id)
+        event = components.auditor.event("prefetch_profile", {"user_id": user_id, "found": profile is not None})
+    except Exception as e:
+        # the account summary is optional context: never escalate a ticket over it
+        profile = None
+        event = components.auditor.event("prefetch_profile_error", {"error": str(e)})
+    return {"customer_profile": profile, "audit_events": [event]}
 
 
 def node_classifier(state: WorkflowState) -> WorkflowState:
     ticket = state.get("ticket", {})
-    c_out = classifier.classify(ticket)
-    auditor.add_event(state["audit"], "classifier", c_out)
-    state["classifier_output"] = c_out
-    return state
+    c_out = components.classifier.classify(ticket)
+    events = [components.auditor.event("classifier", c_out)]
+    # decide which stages this ticket needs (see route_after_classifier)
+    plan = components.supervisor.plan(c_out, ticket)
+    route = {"stages": plan["stages"], "skipped": plan["skipped"], "reason": plan["reason"]}
+    update: WorkflowState = {"classifier_output": c_out, "route": route}
+    if plan["skipped"]:
+        for stage in plan["skipped"]:
+            STAGES_SKIPPED.inc(stage=stage)
+        events.append(components.auditor.event("stages_skipped", route))
+    if plan["decision"] is not None:
+        update["supervisor_decision"] = plan["decision"]
+        events.append(components.auditor.event("supervisor", plan["decision"]))
+    update["audit_events"] = events
+    return update
 
 
 def node_ltm_retrieve(state: WorkflowState) -> WorkflowState:
     ticket = state.get("ticket", {})
     text = ticket.get("text", "")
     ltm_docs = []
+    events = []
     if text:
         try:
-            hits = memory_repo.semantic_search(text, top_k=5)
+            # a tenant's tickets only search that tenant's resolved cases (and only its shard)
+            hits = components.memory_repo.semantic_search(text, top_k=5, account_id=ticket_account(ticket))
             for h in hits:
                 if isinstance(h, tuple) and len(h) == 2:
                     row, score = h
@@ -145,139 +307,181 @@ def node_ltm_retrieve(state: WorkflowState) -> WorkflowState:
                         "metadata": getattr(h, "metadata_json", None),
                     }
                 ltm_docs.append(item)
-            auditor.add_event(state["audit"], "ltm_retrieve", {"count": len(ltm_docs)})
+            events.append(components.auditor.event("ltm_retrieve", {"count": len(ltm_docs)}))
         except Exception as e:
-            auditor.add_event(state["audit"], "ltm_retrieve_error", {"error": str(e)})
-    state["ltm_docs"] = ltm_docs
-    return state
+            events.append(components.auditor.event("ltm_retrieve_error", {"error": str(e)}))
+    return {"ltm_docs": ltm_docs, "audit_events": events}
 
 
 def node_retriever(state: WorkflowState) -> WorkflowState:
     c_out = state.get("classifier_output", {})
     requires = c_out.get("requires_knowledge", False)
-    docs = retriever.retrieve(state["ticket"]) if requires else []
-
-    # Merge LTM
-    merged = []
-    ids = set()
-    for d in docs:
-        merged.append({**d, "source": d.get("source", "kb")})
-        if d.get("id"):
-            ids.add(d.get("id"))
-    for l in state.get("ltm_docs", []) or []:
+    docs = components.retriever.retrieve(state["ticket"]) if requires else []
+    kb_docs = [{**d, "source": d.get("source", "kb")} for d in docs]
+    return {"kb_docs": kb_docs, "audit_events": [components.auditor.event("retriever", {"count": len(kb_docs)})]}
+
+
+def merge_docs(kb_docs: List[Dict[str, Any]], ltm_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Merge LTM (runs in a parallel branch) behind the KB hits, skipping duplicate ids
+    merged = list(kb_docs or [])
+    ids = {d.get("id") for d in merged if d.get("id")}
+    for l in ltm_docs or []:
         if l.get("id") not in ids:
             merged.append({**l, "source": "ltm"})
-    state["retrieved_docs"] = merged
-    auditor.add_event(state["audit"], "retriever", {"count": len(merged)})
-    return state
+    return merged
 
 
 def node_resolver(state: WorkflowState) -> WorkflowState:
     ticket = state.get("ticket", {})
-    context_docs = state.get("retrieved_docs", []) or []
+    context_docs = merge_docs(state.get("kb_docs"), state.get("ltm_docs"))
     stm_context = state.get("stm_context", []) or []
     ticket_messages = state.get("ticket_messages", []) or []
     allowed_tools = state.get("classifier_output", {}).get("recommended_tool")
 
-    r_out = resolver.resolve(
+    # fast path: canned article phrasing for confident, well-matched intents (no LLM call)
+    templated = components.template_engine.render(ticket, state.get("classifier_output", {}), context_docs)
+    record_cache("template_answer", templated is not None)
+    doc_ids = [d.get("id") for d in context_docs]
+    if templated is not None:
+        return {
+            "context_doc_ids": doc_ids,
+            "resolver_output": templated,
+            "audit_events": [components.auditor.event("resolver", templated)],
+        }
+
+    r_out = components.resolver.resolve(
         ticket,
         context_docs=context_docs,
         allowed_tools=allowed_tools,
         stm_context=stm_context,
         ticket_messages=ticket_messages,
         ltm_docs=state.get("ltm_docs", []),
+        customer_profile=state.get("customer_profile"),
     )
-    auditor.add_event(state["audit"], "resolver", r_out)
-    state["resolver_output"] = r_out
-    return state
+    events = [components.auditor.event("resolver", r_out)]
+    info = r_out.get("resilience") or {}
+    if info.get("retries") or info.get("timeouts") or info.get("hedged") or info.get("short_circuited"):
+        events.append(components.auditor.event("llm_resilience", {
+            **info, "totals": components.resolver_llm.stats(),
+        }))
+    return {"context_doc_ids": doc_ids, "resolver_output": r_out, "audit_events": events}
 
 
 def node_supervisor(state: WorkflowState) -> WorkflowState:
-    decision = supervisor.decide(
+    if state.get("error"):
+        # an earlier node failed: keep the escalation decision safe_node recorded
+        return {}
+    decision = components.supervisor.decide(
         state.get("classifier_output", {}),
-        state.get("resolver_output", {}),
+        state.get("resolver_output", {}) or {},
         state.get("ticket", {}),
         stm_context=state.get("stm_context", []),
         ticket_messages=state.get("ticket_messages", []),
         ltm_context=state.get("ltm_docs", []),
     )
-    auditor.add_event(state["audit"], "supervisor", decision)
-    state["supervisor_decision"] = decision
-    return state
+    return {"supervisor_decision": decision, "audit_events": [components.auditor.event("supervisor", decision)]}
 
 
 def node_tools(state: WorkflowState) -> WorkflowState:
     r_out = state.get("resolver_output", {})
     ticket = state.get("ticket", {})
-    results = []
-    for action in r_out.get("actions", []) if r_out else []:
-        tool_name = action.get("tool")
-        params = action.get("params", {}) or {}
-        if not params.get("user_id") and ticket.get("user_id"):
-            params["user_id"] = ticket.get("user_id")
-
-        if tool_name == "refund":
-            res = refund_tool.call(params, dry_run=True)
-            auditor.add_event(state["audit"], "tool_call", {"tool": "refund", "params": params, "result": res})
-            results.append({"tool": "refund", "params": params, "result": res})
-        else:
-            auditor.add_event(state["audit"], "tool_call", {"tool": tool_name, "params": params, "result": "tool_not_implemented"})
-            results.append({"tool": tool_name, "params": params, "result": "tool_not_implemented"})
-
-    state["tool_results"] = results
-    return state
+    actions = r_out.get("actions", []) if r_out else []
+    if not actions:
+        return {"tool_results": []}
+
+    started = time.perf_counter()
+    defaults = {k: ticket[k] for k in ("user_id", "ticket_id") if ticket.get(k)}
+    results = components.tool_executor.run(actions, defaults=defaults)
+    events = [components.auditor.event("tool_call", r) for r in results]
+    statuses = [r["status"] for r in results]
+    events.append(components.auditor.event("tool_summary", {
+        "calls": len(results),
+        "timeouts": statuses.count("timeout"),
+        "errors": statuses.count("error"),
+        "wall_ms": round((time.perf_counter() - started) * 1000, 3),
+        "sum_ms": round(sum(r["ms"] for r in results), 3),
+    }))
+    return {"tool_results": [{"tool": r["tool"], "params": r["params"], "result": r["result"]} for r in results],
+            "audit_events": events}
 
 
 def node_escalation(state: WorkflowState) -> WorkflowState:
-    esc = escalation_agent.package(
+    esc = components.escalation_agent.package(
         state.get("ticket", {}),
-        state.get("classifier_output", {}),
-        state.get("resolver_output", {}),
-        context_docs=state.get("retrieved_docs", []),
-        audit_events=state.get("audit", {}).get("events", []),
+        state.get("classifier_output", {}) or {},
+        state.get("resolver_output", {}) or {},
+        context_docs=merge_docs(state.get("kb_docs"), state.get("ltm_docs")),
+        audit_events=components.auditor.buffer.peek(_audit_id(state)),
     )
-    auditor.add_event(state["audit"], "escalation", esc)
-    return state
+    return {"audit_events": [components.auditor.event("escalation", esc)]}
+
+
+# the parallel section: load_stm | prefetch_profile | ltm_retrieve | classifier -> retriever, when routed
+FANOUT_BRANCHES = (("load_stm",), ("prefetch_profile",), ("ltm_retrieve",), ("classifier", "retriever"))
+
+
+def fanout_timing_summary(timings: Dict[str, float]) -> Dict[str, Any]:
+    branches = {"+".join(b): sum(timings.get(n, 0.0) for n in b) for b in FANOUT_BRANCHES}
+    sequential = sum(timings.get(n, 0.0) for n in {n for b in FANOUT_BRANCHES for n in b})
+    critical = max(branches.values()) if branches else 0.0
+    return {
+        "nodes_ms": {k: round(v * 1000, 3) for k, v in timings.items()},
+        "branches_ms": {k: round(v * 1000, 3) for k, v in branches.items()},
+        "fanout_sequential_ms": round(sequential * 1000, 3),
+        "fanout_critical_path_ms": round(critical * 1000, 3),
+        "fanout_saved_ms": round((sequential - critical) * 1000, 3),
+    }
+
+
+def build_audit(state: WorkflowState, extra_events: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    audit = dict(state.get("audit") or {})
+    audit["events"] = components.auditor.buffer.peek(audit.get("id")) + list(extra_events or [])
+    return audit
 
 
 def node_finalize(state: WorkflowState) -> WorkflowState:
     ticket = state.get("ticket", {})
     session_id = ticket.get("metadata", {}).get("thread_id") or f"session_{ticket.get('ticket_id', new_id())}"
     ticket_id = ticket.get("ticket_id")
+    account_id = ticket_account(ticket)
+    events = []
 
     # STM
     try:
-        memory_repo.put_short(
+        components.memory_repo.put_short(
             session_id=session_id,
             ticket_id=ticket_id,
-            payload={
+            payload=compact_stm_payload({
                 "ticket": ticket,
                 "classifier": state.get("classifier_output"),
                 "resolver": state.get("resolver_output"),
                 "decision": state.get("supervisor_decision"),
-            },
+            }),
+            account_id=account_id,
         )
-        auditor.add_event(state["audit"], "stm_store", {"session_id": session_id})
+        events.append(components.auditor.event("stm_store", {"session_id": session_id}))
     except Exception as e:
-        auditor.add_event(state["audit"], "stm_store_error", {"error": str(e)})
+        events.append(components.auditor.event("stm_store_error", {"error": str(e)}))
 
     # Ticket messages
     try:
         user_text = ticket.get("text", "")
         if user_text:
-            memory_repo.put_ticket_message(session_id=session_id, ticket_id=ticket_id, from_role="user",
-                                           text=user_text, metadata={"created_at": ticket.get("created_at")})
-            auditor.add_event(state["audit"], "ticket_message_stored", {"role": "user"})
+            components.memory_repo.put_ticket_message(session_id=session_id, ticket_id=ticket_id, from_role="user",
+                                                      text=user_text, metadata={"created_at": ticket.get("created_at")},
+                                                      account_id=account_id)
+            events.append(components.auditor.event("ticket_message_stored", {"role": "user"}))
 
         resolver_out = state.get("resolver_output", {}) or {}
         agent_text = resolver_out.get("response") or resolver_out.get("message") or None
         if agent_text:
-            memory_repo.put_ticket_message(session_id=session_id, ticket_id=ticket_id, from_role="agent",
-                                           text=agent_text,
-                                           metadata={"resolved": bool(state.get("supervisor_decision", {}).get("auto_resolve", False))})
-            auditor.add_event(state["audit"], "ticket_message_stored", {"role": "agent"})
+            components.memory_repo.put_ticket_message(session_id=session_id, ticket_id=ticket_id, from_role="agent",
+                                                      text=agent_text,
+                                                      metadata={"resolved": bool((state.get("supervisor_decision") or {}).get("auto_resolve", False))},
+                                                      account_id=account_id)
+            events.append(components.auditor.event("ticket_message_stored", {"role": "agent"}))
     except Exception as e:
-        auditor.add_event(state["audit"], "ticket_message_store_error", {"error": str(e)})
+        events.append(components.auditor.event("ticket_message_store_error", {"error": str(e)}))
 
     # LTM
     try:
@@ -285,7 +489,7 @@ def node_finalize(state: WorkflowState) -> WorkflowState:
         resolver_out = state.get("resolver_output", {}) or {}
         if decision.get("auto_resolve") and (resolver_out.get("response") or resolver_out.get("message")):
             resolved_text = resolver_out.get("response") or resolver_out.get("message")
-            memory_repo.put_long(
+            components.memory_repo.put_long(
                 user_id=ticket.get("user_id"),
                 ticket_id=ticket_id,
                 text=f"Resolved: {resolved_text}",
@@ -294,42 +498,36 @@ def node_finalize(state: WorkflowState) -> WorkflowState:
                     "resolved": True,
                     "intent": (state.get("classifier_output") or {}).get("intent"),
                     "created_at": now_iso(),
-                }
+                },
+                account_id=account_id,
             )
-            auditor.add_event(state["audit"], "ltm_stored", {"summary": resolved_text[:200]})
+            events.append(components.auditor.event("ltm_stored", {"summary": resolved_text[:200]}))
     except Exception as e:
-        auditor.add_event(state["audit"], "ltm_store_error", {"error": str(e)})
+        events.append(components.auditor.event("ltm_store_error", {"error": str(e)}))
+
+    STATE_BYTES.observe(approx_size(state))
+
+    # per-node / per-branch wall time (finalize's own time lands in state after this node)
+    events.append(components.auditor.event("timings", fanout_timing_summary(state.get("timings") or {})))
 
     try:
-        auditor.persist(state["audit"])
+        components.auditor.persist(build_audit(state, events))
     except Exception:
         pass
 
-    return state
+    return {"audit_events": events}
 
 
 # ---------------------------------------------------------------------
 # 4. BUILD LANGGRAPH STATEGRAPH
 # ---------------------------------------------------------------------
-graph = StateGraph(WorkflowState)
-graph.add_node("load_stm", safe_node(node_load_stm))
-graph.add_node("ingest", safe_node(node_ingest))
-graph.add_node("classifier", safe_node(node_classifier))
-graph.add_node("ltm_retrieve", safe_node(node_ltm_retrieve))
-graph.add_node("retriever", safe_node(node_retriever))
-graph.add_node("resolver", safe_node(node_resolver))
-graph.add_node("supervisor", safe_node(node_supervisor))
-graph.add_node("tools", safe_node(node_tools))
-graph.add_node("escalation", safe_node(node_escalation))
-graph.add_node("finalize", safe_node(node_finalize))
-
-graph.set_entry_point("load_stm")
-graph.add_edge("load_stm", "ingest")
-graph.add_edge("ingest", "classifier")
-graph.add_edge("classifier", "ltm_retrieve")
-graph.add_edge("ltm_retrieve", "retriever")
-graph.add_edge("retriever", "resolver")
-graph.add_edge("resolver", "supervisor")
+def route_after_classifier(state: WorkflowState) -> List[str]:
+    # load_stm, prefetch_profile and ltm_retrieve ran in the same step as the classifier, so
+    # whichever stage runs next already sees their output
+    if state.get("error"):
+        return ["escalation"]
+    return (state.get("route") or {}).get("stages") or ["retriever"]
+
 
 def supervisor_router(state: WorkflowState):
     decision = state.get("supervisor_decision", {}) or {}
@@ -340,30 +538,112 @@ def supervisor_router(state: WorkflowState):
     else:
         return "finalize"
 
-graph.add_conditional_edges("supervisor", supervisor_router)
-graph.add_edge("tools", "finalize")
-graph.add_edge("escalation", "finalize")
 
-workflow = graph.compile(checkpointer=MemorySaver())
+def _node(node_fn):
+    return safe_node(node_fn, sink=_buffer_events)
+
+
+def build_graph():
+    from langgraph.graph import StateGraph, END
+
+    graph = StateGraph(WorkflowState)
+    graph.add_node("ingest", _node(node_ingest))
+    graph.add_node("load_stm", _node(node_load_stm))
+    graph.add_node("prefetch_profile", _node(node_prefetch_profile))
+    graph.add_node("classifier", _node(node_classifier))
+    graph.add_node("ltm_retrieve", _node(node_ltm_retrieve))
+    graph.add_node("retriever", _node(node_retriever))
+    graph.add_node("resolver", _node(node_resolver))
+    graph.add_node("supervisor", _node(node_supervisor))
+    graph.add_node("tools", _node(node_tools))
+    graph.add_node("escalation", _node(node_escalation))
+    graph.add_node("finalize", _node(node_finalize))
+
+    # ingest fans out to load_stm | prefetch_profile | ltm_retrieve | classifier, so the LTM
+    # search overlaps classification. The classifier's route plan then runs only the
+    # stages the ticket needs: KB retrieval then the resolver, the resolver directly,
+    # or straight to escalation when the outcome is already decided.
+    graph.set_entry_point("ingest")
+    graph.add_edge("ingest", "load_stm")
+    graph.add_edge("ingest", "classifier")
+    graph.add_edge("ingest", "prefetch_profile")
+    graph.add_edge("ingest", "ltm_retrieve")
+    graph.add_edge("load_stm", END)
+    graph.add_edge("prefetch_profile", END)
+    graph.add_edge("ltm_retrieve", END)
+    graph.add_conditional_edges("classifier", route_after_classifier, ["retriever", "resolver", "escalation"])
+    graph.add_edge("retriever", "resolver")
+    graph.add_edge("resolver", "supervisor")
+
+    graph.add_conditional_edges("supervisor", supervisor_router)
+    graph.add_edge("tools", "finalize")
+    graph.add_edge("escalation", "finalize")
+    graph.add_edge("finalize", END)
+
+    return graph
+
+
+def _compile_workflow():
+    return build_graph().compile(checkpointer=components.get("checkpointer"))
+
+
+components.register("workflow", _compile_workflow)
+
+
+def warmup(names: Optional[List[str]] = None) -> Dict[str, float]:
+    """Build all (or the named) components now; returns per-component init seconds."""
+    return components.warmup(names)
+
+
+def __getattr__(name: str):
+    # keep `from agentic.workflow import workflow` (and llm, memory_repo, ...) working lazily
+    if name in components.names():
+        return components.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ---------------------------------------------------------------------
 # 5. PUBLIC RUN FUNCTION
 # ---------------------------------------------------------------------
-def orchestrator(ticket: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+def orchestrator(ticket: Dict[str, Any], session_id: str = None, idempotent: bool = True,
+                 on_node: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Run one ticket through the graph. A repeated submission (same ticket_id and
+    content, within the idempotency TTL) returns the stored result, or waits for
+    the in-flight run, instead of re-running the graph; result["idempotency"]
+    says which ("miss", "hit", "coalesced").
+    `on_node(node_name, update)` is called as each node finishes (not on replays).
+    """
+    if not idempotent:
+        return _run_ticket(ticket, session_id, on_node)
+    result, info = components.idempotency.run(ticket, session_id, lambda: _run_ticket(ticket, session_id, on_node))
+    result["idempotency"] = info
+    return result
+
+
+def _run_ticket(ticket: Dict[str, Any], session_id: str = None,
+                on_node: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
     initial_state: WorkflowState = {"ticket": ticket}
 
     if session_id:
         initial_state["session_id"] = session_id
 
-    result_state = workflow.invoke(
-        initial_state,
-        config={
-            "configurable": {
-                "thread_id": session_id
-            }
+    config = {
+        "configurable": {
+            "thread_id": session_id
         }
-    )
+    }
+    started = time.perf_counter()
+    if on_node is None:
+        result_state = components.workflow.invoke(initial_state, config=config)
+    else:
+        for chunk in components.workflow.stream(initial_state, config=config, stream_mode="updates"):
+            for node_name, update in chunk.items():
+                on_node(node_name, update or {})
+        result_state = components.workflow.get_state(config).values
+    TICKET_DURATION.observe(time.perf_counter() - started)
+    audit = build_audit(result_state)
+    components.auditor.buffer.drain(audit.get("id"))
 
     return {
         "ticket": ticket,
@@ -371,10 +651,11 @@ def orchestrator(ticket: Dict[str, Any], session_id: str = None) -> Dict[str, An
         "resolver": result_state.get("resolver_output"),
         "decision": result_state.get("supervisor_decision"),
         "tool_results": result_state.get("tool_results", []),
-        "audit": result_state.get("audit"),
+        "audit": audit,
         "stm_context": result_state.get("stm_context", []),
         "ticket_messages": result_state.get("ticket_messages", []),
         "ltm_docs": result_state.get("ltm_docs", []),
+        "timings": result_state.get("timings", {}),
     }
 
 
@@ -3,7 +3,6 @@ import streamlit as st
 from dotenv import load_dotenv
 from utils import new_id, now_iso
 import traceback
-from agentic.memory.memory_repo import MemoryRepository
 
 load_dotenv()
 
@@ -23,8 +22,10 @@ def get_workflow():
     # (missing deps), return a lightweight dummy workflow with an `invoke`
     # method so the Streamlit UI still loads and responds.
     try:
-        from agentic.workflow import workflow as real_workflow  # type: ignore
-        return real_workflow
+        from agentic.workflow import components, warmup  # type: ignore
+        # build LLM client, DB engines and the compiled graph once per server process
+        warmup()
+        return components.get("workflow")
     except Exception:
         # Provide a simple fallback that mimics the invoke API used below.
         class DummyWorkflow:
@@ -39,11 +40,16 @@ def get_workflow():
 
 compiled_workflow = get_workflow()  # This runs ONLY ONCE
 
-# Initialize memory repository (used for STM/LTM storage and retrieval)
-try:
-    memory_repo = MemoryRepository()
-except Exception:
-    memory_repo = None
+# Memory repository (used for STM/LTM storage and retrieval), shared with the workflow
+@st.cache_resource
+def get_memory_repo():
+    try:
+        from agentic.workflow import components  # type: ignore
+        return components.get("memory_repo")
+    except Exception:
+        return None
+
+memory_repo = get_memory_repo()
 
 # Initialize session state
 if "thread_id" not in st.session_state:
@@ -0,0 +1,97 @@
+# bench/import_bench.py
+"""
+Cold-start benchmark for the agentic package.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter, reports
+the cumulative import time, the heaviest modules and whether any of the heavy
+dependencies were pulled in eagerly. Optionally also times `warmup()`.
+
+    cd solution
+    python -m bench.import_bench
+    python -m bench.import_bench --max-ms 300 --warmup
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# imports that should only happen on first use / warmup()
+HEAVY_MODULES = ("langchain_openai", "openai", "sqlalchemy", "numpy", "langgraph", "langchain_core")
+
+SOLUTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str):
+    """Yield (module, self_us, cumulative_us) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            yield name.strip(), int(self_us), int(cum_us)
+        except ValueError:
+            continue
+
+
+def measure(module: str, runs: int = 3):
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SOLUTION_DIR, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr[-2000:])
+        rows = list(parse_importtime(proc.stderr))
+        total = next((cum for name, _, cum in rows if name == module), sum(s for _, s, _ in rows))
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def measure_warmup(module: str) -> dict:
+    code = (
+        "import json, time; t=time.perf_counter(); "
+        f"import {module} as m; t_imp=time.perf_counter()-t; "
+        "times=m.warmup(); print(json.dumps({'import_s': t_imp, 'warmup_s': time.perf_counter()-t-t_imp, "
+        "'components_s': times}))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=SOLUTION_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="agentic.workflow")
+    parser.add_argument("--runs", type=int, default=3, help="take the best of N cold starts")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=None, help="exit 1 if the import takes longer")
+    parser.add_argument("--warmup", action="store_true", help="also time warmup() (needs working LLM/DB config)")
+    args = parser.parse_args(argv)
+
+    total_us, rows = measure(args.module, args.runs)
+    loaded = {name.split(".")[0] for name, _, _ in rows}
+    report = {
+        "module": args.module,
+        "import_ms": round(total_us / 1000, 2),
+        "eager_heavy_modules": sorted(m for m in HEAVY_MODULES if m in loaded),
+        "heaviest_self_ms": [
+            {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cum_us / 1000, 2)}
+            for name, self_us, cum_us in sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+        ],
+    }
+    if args.warmup:
+        report["warmup"] = measure_warmup(args.module)
+    print(json.dumps(report, indent=2))
+    if args.max_ms is not None and report["import_ms"] > args.max_ms:
+        print(f"import of {args.module} took {report['import_ms']}ms (> {args.max_ms}ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# bench/refund_stress.py
+"""
+Multi-process refund stress test.
+
+Several processes refund the same few users concurrently through RefundTool;
+every refund key is submitted by `--dup` different processes (a retried
+ticket). Afterwards each balance must equal the sum of its distinct keys'
+amounts and the ledger must hold each key exactly once.
+
+    cd solution
+    python -m bench.refund_stress --procs 8 --refunds 500 --users 3 --dup 2
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+
+SOURCE_DB = "./data/external/cultpass.db"
+
+
+def _plan(args):
+    """(key, user_id, amount) per refund, each repeated `dup` times across processes."""
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(SOURCE_DB)
+    users = [r[0] for r in conn.execute("SELECT user_id FROM users ORDER BY user_id LIMIT ?", (args.users,))]
+    conn.close()
+    total = args.procs * args.refunds // args.dup
+    refunds = [(f"stress-{i}:refund:", rng.choice(users), rng.randint(1, 100)) for i in range(total)]
+    jobs = [[] for _ in range(args.procs)]
+    for n, refund in enumerate(refunds):
+        for d in range(args.dup):
+            jobs[(n + d) % args.procs].append(refund)
+    for job in jobs:
+        rng.shuffle(job)
+    return users, refunds, jobs
+
+
+def _worker(db_url, job, start, results):
+    os.environ["CULTPASS_DB_URL"] = db_url
+    from agentic.tools.customer_data import CustomerData
+    from agentic.tools.refund import RefundTool
+
+    tool = RefundTool(CustomerData(db_url, ttl_seconds=300), refund_cap=10_000)
+    statuses = Counter()
+    start.wait()
+    t0 = time.perf_counter()
+    for key, user_id, amount in job:
+        statuses[tool.call(user_id, amount, idempotency_key=key)["status"]] += 1
+    results.put((dict(statuses), time.perf_counter() - t0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--refunds", type=int, default=500, help="refund calls per process")
+    parser.add_argument("--users", type=int, default=3, help="distinct users (fewer = more contention)")
+    parser.add_argument("--dup", type=int, default=2, help="processes submitting each refund key")
+    parser.add_argument("--wal", action="store_true", help="put the copy in WAL mode")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="refund_stress_")
+    db_path = os.path.join(workdir, "cultpass.db")
+    shutil.copy(SOURCE_DB, db_path)
+    if args.wal:
+        sqlite3.connect(db_path).execute("PRAGMA journal_mode=WAL").close()
+    db_url = f"sqlite:///{db_path}"
+    from agentic.tools.customer_data import CustomerData
+    CustomerData(db_url).engine.dispose()  # create the balance/ledger tables once, before the race
+
+    users, refunds, jobs = _plan(args)
+    ctx = mp.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(db_url, job, start, results)) for job in jobs]
+    for p in procs:
+        p.start()
+    time.sleep(1.0)  # let every worker import and connect
+    t0 = time.perf_counter()
+    start.set()
+    statuses, busiest = Counter(), 0.0
+    for _ in procs:
+        counts, elapsed = results.get()
+        statuses.update(counts)
+        busiest = max(busiest, elapsed)
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - t0
+
+    conn = sqlite3.connect(db_path)
+    balances = dict(conn.execute("SELECT user_id, balance FROM account_balances"))
+    ledger_keys = [r[0] for r in conn.execute("SELECT idempotency_key FROM refund_ledger")]
+    conn.close()
+    expected = Counter()
+    for _, user_id, amount in refunds:
+        expected[user_id] += amount
+
+    calls = sum(statuses.values())
+    report = {
+        "processes": args.procs,
+        "calls": calls,
+        "distinct_refunds": len(refunds),
+        "statuses": dict(statuses),
+        "wall_s": round(wall, 3),
+        "refunds_per_s": round(calls / wall, 1) if wall else None,
+        "ledger_rows": len(ledger_keys),
+        "duplicate_ledger_keys": len(ledger_keys) - len(set(ledger_keys)),
+        "lost_or_extra": {u: round(balances.get(u, 0.0) - expected[u], 6) for u in users
+                          if abs(balances.get(u, 0.0) - expected[u]) > 1e-6},
+    }
+    report["ok"] = (not report["lost_or_extra"] and report["ledger_rows"] == len(refunds)
+                    and statuses.get("success", 0) == len(refunds) and not statuses.get("error"))
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
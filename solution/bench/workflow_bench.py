@@ -0,0 +1,91 @@
+# bench/workflow_bench.py
+"""
+Offline end-to-end benchmark for the ticket workflow.
+
+Runs a batch of sample tickets through `orchestrator` using the fake LLM
+(unless LLM_MODEL is already set) and prints latency percentiles plus the
+fake model's call/prompt statistics.
+
+    cd solution
+    python -m bench.workflow_bench -n 200 --latency "lognormal:median=0.05,sigma=0.5"
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+SAMPLE_TEXTS = [
+    "I want a refund for my order 12345. I never received it.",
+    "How do I reserve a spot for the jazz night?",
+    "I cannot login, my password reset link doesn't work.",
+    "Please change address on my account to 12 Main St.",
+    "Can I cancel my order from yesterday?",
+    "What is included in my subscription?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--tickets", type=int, default=50)
+    parser.add_argument("--latency", default=None, help="fake LLM latency spec (see agentic.llm)")
+    parser.add_argument("--sessions", type=int, default=5, help="number of distinct threads to spread tickets over")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LLM_MODEL", "fake")
+    if args.latency is not None:
+        os.environ["FAKE_LLM_LATENCY"] = args.latency
+
+    from agentic import workflow as wf
+    from utils import new_id, now_iso
+
+    wf.warmup()  # keep one-off component construction out of the per-ticket numbers
+
+    durations = []
+    started = time.perf_counter()
+    for i in range(args.tickets):
+        session_id = f"bench_thread_{i % max(args.sessions, 1)}"
+        ticket = {
+            "ticket_id": new_id(),
+            "platform": "bench",
+            "user_id": f"bench_user_{i % max(args.sessions, 1)}",
+            "text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)],
+            "metadata": {"urgency": "medium", "thread_id": session_id},
+            "attachments": [],
+            "created_at": now_iso(),
+        }
+        t0 = time.perf_counter()
+        wf.orchestrator(ticket, session_id=session_id)
+        durations.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "tickets": args.tickets,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_tps": round(args.tickets / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(durations) * 1000, 3) if durations else 0,
+            "p50": round(percentile(durations, 50) * 1000, 3),
+            "p95": round(percentile(durations, 95) * 1000, 3),
+            "p99": round(percentile(durations, 99) * 1000, 3),
+            "max": round(max(durations) * 1000, 3) if durations else 0,
+        },
+    }
+    # tickets answered from an article template instead of an LLM call
+    report["templated"] = int(wf.metrics.counter("cache_lookups_total").value(cache="template_answer", result="hit"))
+    if hasattr(wf.llm, "stats"):
+        report["llm"] = wf.llm.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# bulk_load.py
+"""
+Streaming JSONL bulk loader for the cultpass and udahub databases.
+
+Reads a JSONL export line by line, maps each record onto a table from
+data/models/cultpass.py or data/models/udahub.py, and inserts it in chunks
+with Core executemany (one transaction per chunk), so memory stays flat
+whatever the file size. Non-unique secondary indexes can be dropped for
+the load and rebuilt once at the end.
+
+    cd solution
+    python bulk_load.py cultpass users data/external/cultpass_users.jsonl
+    python bulk_load.py cultpass experiences data/external/cultpass_experiences.jsonl
+    python bulk_load.py udahub knowledge data/external/cultpass_articles.jsonl --default account_id=cultpass
+    python bulk_load.py udahub tickets export/tickets.jsonl.gz --upsert --chunk-size 20000 --defer-indexes
+
+The seed-file field names (users: id/name, ...) are mapped onto the model
+columns; any other file must use the column names. A missing primary key is
+derived from the record's natural key (NATURAL_KEYS), so re-loading a file
+hits the same rows; tables without one get random keys, which only a plain
+insert accepts. --upsert updates rows whose primary key already exists,
+--skip-existing leaves them untouched; by default a duplicate key aborts the
+chunk.
+"""
+
+import argparse
+import enum
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from sqlalchemy import Boolean, DateTime, Enum, Float, Integer, create_engine, event, insert, text
+from sqlalchemy.exc import IntegrityError
+
+DATABASES = {
+    "cultpass": ("data.models.cultpass", "sqlite:///./data/external/cultpass.db", "CULTPASS_DB_URL"),
+    "udahub": ("data.models.udahub", "sqlite:///./data/core/udahub.db", "UDAHUB_DB_URL"),
+}
+
+# seed JSONL field -> column, per (database, table)
+ALIASES: Dict[tuple, Dict[str, str]] = {
+    ("cultpass", "users"): {"id": "user_id", "name": "full_name"},
+    ("udahub", "users"): {"id": "user_id", "name": "user_name", "owner_id": "external_user_id"},
+}
+
+# columns that identify a record whose file has no primary key (the key is a uuid5 over them)
+NATURAL_KEYS: Dict[tuple, tuple] = {
+    ("udahub", "knowledge"): ("account_id", "title"),
+    ("cultpass", "experiences"): ("title", "location"),
+}
+
+# row number -> value, for required columns the seed files leave out
+_now = datetime.now()
+GENERATED: Dict[tuple, Dict[str, Callable[[int], Any]]] = {
+    ("cultpass", "experiences"): {
+        "when": lambda n: _now + timedelta(days=n + 1),
+        "slots_available": lambda n: 10,
+        "is_premium": lambda n: n % 2 == 0,
+    },
+}
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _coerce(column, value: Any) -> Any:
+    if value is None:
+        return None
+    col_type = column.type
+    if isinstance(col_type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(col_type, Enum) and col_type.enum_class is not None and not isinstance(value, enum.Enum):
+        return col_type.enum_class(value)
+    if isinstance(col_type, Boolean):
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+    if isinstance(col_type, Integer) and not isinstance(value, int):
+        return int(value)
+    if isinstance(col_type, Float) and not isinstance(value, float):
+        return float(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+class RowMapper:
+    """JSONL record -> column dict for one table."""
+
+    def __init__(self, db: str, table, defaults: Dict[str, Any] = None, mode: str = "insert"):
+        self.db = db
+        self.table = table
+        self.mode = mode
+        self.columns = {c.name: c for c in table.columns}
+        self.aliases = ALIASES.get((db, table.name), {})
+        self.generated = GENERATED.get((db, table.name), {})
+        self.defaults = defaults or {}
+        self.pk = [c.name for c in table.primary_key.columns]
+        self.natural_key = NATURAL_KEYS.get((db, table.name), ())
+        self.count = 0
+
+    def make_key(self, row: Dict[str, Any]) -> str:
+        if self.natural_key and all(row.get(name) is not None for name in self.natural_key):
+            name = "/".join([self.db, self.table.name] + [str(row[c]) for c in self.natural_key])
+            return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+        if self.mode != "insert":
+            # a random key never matches an existing row: every re-run would insert duplicates
+            raise SystemExit(f"\n{self.table.name}: record {self.count + 1} has no {self.pk[0]}"
+                             + (f" or {'/'.join(self.natural_key)}" if self.natural_key else "")
+                             + "; --upsert/--skip-existing need a stable key")
+        return str(uuid.uuid4())
+
+    def __call__(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for key, value in record.items():
+            name = self.aliases.get(key, key)
+            if name in self.columns:
+                row[name] = _coerce(self.columns[name], value)
+        for name, value in self.defaults.items():
+            row.setdefault(name, _coerce(self.columns[name], value))
+        for name, make in self.generated.items():
+            if row.get(name) is None:
+                row[name] = make(self.count)
+        for name in self.pk:
+            if row.get(name) is None and len(self.pk) == 1:
+                row[name] = self.make_key(row)
+        self.count += 1
+        return row
+
+
+def _statement(engine, table, mode: str, columns: List[str]):
+    if mode == "insert":
+        return insert(table)
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise SystemExit(f"--upsert/--skip-existing are not supported on {engine.dialect.name}")
+    stmt = dialect_insert(table)
+    pk = [c.name for c in table.primary_key.columns]
+    if mode == "skip":
+        return stmt.on_conflict_do_nothing(index_elements=pk)
+    updates = {c: stmt.excluded[c] for c in columns if c not in pk}
+    return stmt.on_conflict_do_update(index_elements=pk, set_=updates) if updates \
+        else stmt.on_conflict_do_nothing(index_elements=pk)
+
+
+def _secondary_indexes(conn, table_name: str) -> List[tuple]:
+    """(name, create sql) of the table's non-unique, explicitly created SQLite indexes."""
+    rows = conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :t "
+                             "AND sql IS NOT NULL"), {"t": table_name}).fetchall()
+    return [(name, sql) for name, sql in rows if "UNIQUE" not in sql.upper().split("INDEX")[0]]
+
+
+def get_table(db: str, table_name: str):
+    module = __import__(DATABASES[db][0], fromlist=["Base"])
+    return module.Base.metadata.tables.get(table_name)
+
+
+def load(db: str, table_name: str, path: str, db_url: str = None, chunk_size: int = 5000, mode: str = "insert",
+         defer_indexes: bool = False, defaults: Dict[str, Any] = None, synchronous: str = "NORMAL",
+         progress: bool = True) -> Dict[str, Any]:
+    _, default_url, env_var = DATABASES[db]
+    table = get_table(db, table_name)
+    url = db_url or os.environ.get(env_var) or default_url
+    engine = create_engine(url, future=True)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _pragmas(dbapi_conn, _):
+            cur = dbapi_conn.cursor()
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+            cur.execute("PRAGMA temp_store=MEMORY")
+            cur.execute("PRAGMA cache_size=-65536")
+            cur.close()
+    table.create(engine, checkfirst=True)
+
+    mapper = RowMapper(db, table, defaults, mode)
+    rows = total_chunks = 0
+    started = time.perf_counter()
+    dropped: List[tuple] = []
+    with engine.connect() as conn:
+        if defer_indexes and engine.dialect.name == "sqlite":
+            dropped = _secondary_indexes(conn, table_name)
+            for name, _ in dropped:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+            conn.commit()
+        try:
+            for chunk in chunked((mapper(r) for r in iter_jsonl(path)), chunk_size):
+                # executemany needs the same keys in every row: group by key set
+                # (padding with None would override column defaults such as created_at)
+                groups: Dict[tuple, List[Dict[str, Any]]] = {}
+                for row in chunk:
+                    groups.setdefault(tuple(sorted(row)), []).append(row)
+                for columns, group in groups.items():
+                    conn.execute(_statement(engine, table, mode, list(columns)), group)
+                conn.commit()
+                rows += len(chunk)
+                total_chunks += 1
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    print(f"\r{table_name}: {rows} rows, {rows / elapsed:,.0f} rows/s", end="", file=sys.stderr)
+        except BaseException:
+            # drop the failed chunk's rows before the index rebuild below commits
+            conn.rollback()
+            raise
+        finally:
+            if dropped:
+                index_started = time.perf_counter()
+                for _, sql in dropped:
+                    conn.execute(text(sql))
+                conn.commit()
+                if progress:
+                    print(f"\nrebuilt {len(dropped)} indexes in {time.perf_counter() - index_started:.2f}s",
+                          end="", file=sys.stderr)
+    engine.dispose()
+    elapsed = time.perf_counter() - started
+    if progress:
+        print(file=sys.stderr)
+    return {"table": table_name, "rows": rows, "chunks": total_chunks, "seconds": round(elapsed, 3),
+            "rows_per_s": round(rows / elapsed, 1) if elapsed else None, "deferred_indexes": len(dropped)}
+
+
+def _parse_defaults(pairs: List[str]) -> Dict[str, Any]:
+    out = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        out[key] = value
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", choices=sorted(DATABASES))
+    parser.add_argument("table")
+    parser.add_argument("path", help="JSONL file (.gz ok)")
+    parser.add_argument("--db-url", help="override CULTPASS_DB_URL / UDAHUB_DB_URL")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--upsert", action="store_true", help="update rows whose primary key exists")
+    group.add_argument("--skip-existing", action="store_true", help="keep rows whose primary key exists")
+    parser.add_argument("--defer-indexes", action="store_true", help="drop secondary indexes during the load")
+    parser.add_argument("--default", action="append", metavar="COLUMN=VALUE", help="value for a missing column")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"], help="SQLite PRAGMA")
+    args = parser.parse_args(argv)
+
+    table = get_table(args.database, args.table)
+    if table is None:
+        parser.error(f"{args.database} has no table {args.table!r}")
+    defaults = _parse_defaults(args.default)
+    unknown = sorted(set(defaults) - set(table.columns.keys()))
+    if unknown:
+        parser.error(f"--default: {args.table} has no column {', '.join(unknown)}")
+
+    mode = "upsert" if args.upsert else "skip" if args.skip_existing else "insert"
+    try:
+        report = load(args.database, args.table, args.path, db_url=args.db_url, chunk_size=args.chunk_size, mode=mode,
+                      defer_indexes=args.defer_indexes, defaults=defaults,
+                      synchronous=args.synchronous)
+    except IntegrityError as exc:
+        raise SystemExit(f"\nload stopped: {exc.orig} (use --upsert or --skip-existing for existing keys)")
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
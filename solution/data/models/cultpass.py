@@ -5,7 +5,9 @@ from sqlalchemy import (
     Integer,
     Boolean,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
@@ -28,6 +30,7 @@ class User(Base):
 
     subscription = relationship("Subscription", back_populates="user", uselist=False)
     reservations = relationship("Reservation", back_populates="user")
+    account_balance = relationship("AccountBalance", back_populates="user", uselist=False)
 
     def __repr__(self):
         return f"<User(user_id='{self.user_id}', email='{self.email}', is_blocked={self.is_blocked})>"
@@ -52,6 +55,39 @@ class Subscription(Base):
         return f"<Subscription(subscription_id='{self.subscription_id}', user_id='{self.user_id}', status='{self.status}', tier='{self.tier}')>"
 
 
+class AccountBalance(Base):
+    __tablename__ = "account_balances"
+
+    user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    balance = Column(Float, nullable=False, default=0.0)
+    currency = Column(String, nullable=False, default="INR")
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    user = relationship("User", back_populates="account_balance")
+
+    def __repr__(self):
+        return f"<AccountBalance(user_id='{self.user_id}', balance={self.balance}, currency='{self.currency}')>"
+
+
+class RefundLedger(Base):
+    __tablename__ = "refund_ledger"
+
+    # one row per refund action (ticket_id:refund:...), so a retried ticket can't refund twice
+    idempotency_key = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    balance_after = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index("ix_refund_ledger_user_created", "user_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<RefundLedger(idempotency_key='{self.idempotency_key}', user_id='{self.user_id}', amount={self.amount})>"
+
+
 class Experience(Base):
     __tablename__ = "experiences"
 
@@ -84,6 +120,12 @@ class Reservation(Base):
     user = relationship("User", back_populates="reservations")
     experience = relationship("Experience", back_populates="reservations")
 
+    __table_args__ = (
+        # a user's reservations (customer profile), an experience's bookings
+        Index("ix_reservations_user_status", "user_id", "status"),
+        Index("ix_reservations_experience", "experience_id", "status"),
+    )
+
     def __repr__(self):
         return f"<Reservation(reservation_id='{self.reservation_id}', user_id='{self.user_id}', experience_id='{self.experience_id}', status='{self.status}')>"
 
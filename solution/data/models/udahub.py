@@ -6,6 +6,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     UniqueConstraint
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -66,6 +67,12 @@ class Ticket(Base):
     ticket_metadata = relationship("TicketMetadata", uselist=False, back_populates="ticket")
     messages = relationship("TicketMessage", back_populates="ticket")
 
+    __table_args__ = (
+        # a user's / a tenant's recent tickets
+        Index("ix_tickets_user_created", "user_id", "created_at"),
+        Index("ix_tickets_account_created", "account_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Ticket(ticket_id='{self.ticket_id}', channel='{self.channel}', created_at='{self.created_at}')>"
 
@@ -102,6 +109,11 @@ class TicketMessage(Base):
 
     ticket = relationship("Ticket", back_populates="messages")
 
+    __table_args__ = (
+        # conversation history in order
+        Index("ix_ticket_messages_ticket_created", "ticket_id", "created_at"),
+    )
+
     def __repr__(self):
         short_content = (self.content[:30] + "...") if self.content and len(self.content) > 30 else self.content
         return f"<TicketMessage(message_id='{self.message_id}', role='{self.role.name}', content='{short_content}')>"
@@ -119,5 +131,10 @@ class Knowledge(Base):
 
     account = relationship("Account", back_populates="knowledge_articles")
 
+    __table_args__ = (
+        # a tenant's articles, most recently edited first
+        Index("ix_knowledge_account_updated", "account_id", "updated_at"),
+    )
+
     def __repr__(self):
         return f"<Knowledge(article_id='{self.article_id}', title='{self.title}')>"
@@ -0,0 +1,152 @@
+# db_indexes.py
+"""
+Secondary indexes for the cultpass and udahub databases.
+
+The indexes are declared on the models (data/models/*.py, `__table_args__`);
+`migrate` creates the ones an existing database is missing and refreshes the
+planner statistics. `check` runs EXPLAIN QUERY PLAN for the hot queries and
+exits non-zero if one of them scans a table (or sorts where an index should
+provide the order), so a dropped or shadowed index shows up in CI.
+
+    cd solution
+    python db_indexes.py migrate            # both databases
+    python db_indexes.py check --db udahub
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine, inspect, text
+
+DATABASES = {
+    "cultpass": ("data.models.cultpass", "sqlite:///./data/external/cultpass.db", "CULTPASS_DB_URL"),
+    "udahub": ("data.models.udahub", "sqlite:///./data/core/udahub.db", "UDAHUB_DB_URL"),
+}
+
+
+def _profile_query() -> str:
+    from agentic.tools.customer_data import profile_query
+    from sqlalchemy.dialects import sqlite
+    return str(profile_query(["u1", "u2"]).compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _upcoming_query() -> str:
+    from datetime import datetime
+    from agentic.tools.customer_data import UPCOMING_QUERY
+    from sqlalchemy.dialects import sqlite
+    stmt = UPCOMING_QUERY.params(user_id="u1", now=datetime(2030, 1, 1), limit=3)
+    return str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+# (name, sql, ordered): `ordered` queries must get their ORDER BY from an index (no temp b-tree)
+HOT_QUERIES: Dict[str, List[Tuple[str, Any, bool]]] = {
+    "udahub": [
+        ("ticket history", "SELECT * FROM ticket_messages WHERE ticket_id = 't1' ORDER BY created_at", True),
+        ("user's recent tickets",
+         "SELECT * FROM tickets WHERE user_id = 'u1' ORDER BY created_at DESC LIMIT 20", True),
+        ("tenant's recent tickets",
+         "SELECT * FROM tickets WHERE account_id = 'a1' ORDER BY created_at DESC LIMIT 50", True),
+        ("tenant knowledge", "SELECT * FROM knowledge WHERE account_id = 'a1' ORDER BY updated_at DESC", True),
+        ("user by external id",
+         "SELECT * FROM users WHERE account_id = 'a1' AND external_user_id = 'x1'", False),
+    ],
+    "cultpass": [
+        ("customer profile", _profile_query, False),
+        ("customer's upcoming bookings", _upcoming_query, False),
+        ("experience bookings",
+         "SELECT * FROM reservations WHERE experience_id = 'e1' AND status = 'reserved'", False),
+        ("user's refunds",
+         "SELECT * FROM refund_ledger WHERE user_id = 'u1' ORDER BY created_at DESC", True),
+    ],
+}
+
+
+def _engine(db: str, url: str = None):
+    module_name, default_url, env_var = DATABASES[db]
+    module = __import__(module_name, fromlist=["Base"])
+    return module.Base.metadata, create_engine(url or os.environ.get(env_var) or default_url, future=True)
+
+
+def migrate(db: str, url: str = None) -> List[str]:
+    """Create declared tables/indexes that don't exist yet; returns the index names created."""
+    metadata, engine = _engine(db, url)
+    metadata.create_all(engine)  # only creates missing tables (with their indexes)
+    created = []
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in metadata.sorted_tables:
+            existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+        if created and engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+    engine.dispose()
+    return created
+
+
+def explain(conn, sql: str) -> List[str]:
+    return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+
+def plan_problems(plan: List[str], ordered: bool) -> List[str]:
+    problems = []
+    for step in plan:
+        # "SCAN t USING [COVERING] INDEX ix" walks an index: fine; a bare "SCAN t" reads the whole table
+        if step.startswith("SCAN ") and " USING " not in step and "CONSTANT ROW" not in step:
+            problems.append(step)
+        if ordered and "USE TEMP B-TREE" in step:
+            problems.append(step)
+    return problems
+
+
+def check(db: str, url: str = None, verbose: bool = False) -> int:
+    _, engine = _engine(db, url)
+    failures = 0
+    with engine.connect() as conn:
+        for name, sql, ordered in HOT_QUERIES[db]:
+            sql = sql() if callable(sql) else sql
+            try:
+                plan = explain(conn, sql)
+            except Exception as exc:
+                print(f"[{db}] {name}: ERROR {exc}")
+                failures += 1
+                continue
+            problems = plan_problems(plan, ordered)
+            status = "FAIL" if problems else "ok"
+            print(f"[{db}] {name}: {status}")
+            if problems or verbose:
+                for step in plan:
+                    print(f"      {'!' if step in problems else ' '} {step}")
+            failures += bool(problems)
+    engine.dispose()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate", "check"])
+    parser.add_argument("--db", choices=sorted(DATABASES) + ["all"], default="all")
+    parser.add_argument("--url", help="database URL (with a single --db)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    dbs = sorted(DATABASES) if args.db == "all" else [args.db]
+    if args.url and len(dbs) > 1:
+        parser.error("--url needs --db")
+    if args.command == "migrate":
+        for db in dbs:
+            created = migrate(db, args.url)
+            print(f"[{db}] created {len(created)} indexes" + (f": {', '.join(created)}" if created else ""))
+        return
+    failures = sum(check(db, args.url, args.verbose) for db in dbs)
+    if failures:
+        print(f"{failures} hot queries would scan a table", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# service.py
+"""
+HTTP service for the ticket workflow (plain ASGI, served by uvicorn).
+
+One process warms the LLM client, DB engines and compiled graph once at
+startup and shares them (plus the ticket WorkerPool and caches) across all
+requests. Scale out with several worker processes:
+
+    cd solution
+    python service.py --port 8000 --workers 4
+    # or: python -m uvicorn service:app --port 8000 --workers 4
+
+Endpoints:
+    POST /tickets         {"ticket": {...}, "session_id": "..."} -> orchestrator result
+    POST /tickets/stream  same body; NDJSON lines, one per finished node, then the result
+    POST /tickets/batch   {"tickets": [{"ticket": {...}, "session_id": ...}, ...]} -> results in order
+    GET  /healthz         readiness, warmed components and queue stats
+    GET  /metrics         Prometheus text format (agentic.metrics)
+
+Tickets go through the urgency-aware WorkerPool (agentic/scheduler.py); a full
+queue answers 503 with Retry-After.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_BODY_BYTES = int(os.environ.get("SERVICE_MAX_BODY_BYTES", 1_048_576))
+MAX_BATCH = int(os.environ.get("SERVICE_MAX_BATCH", 100))
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=str).encode("utf-8")
+
+
+class TicketService:
+    def __init__(self):
+        self.pool = None
+        self.ready = False
+        self.init_times: Dict[str, float] = {}
+
+    # -----------------------------------------------------------------
+    # lifecycle
+    # -----------------------------------------------------------------
+    def startup(self):
+        from agentic.scheduler import WorkerPool
+        from agentic.workflow import warmup
+
+        self.init_times = warmup()
+        # callbacks (streaming) can't cross process boundaries: scale with service workers instead
+        os.environ.setdefault("QUEUE_MODE", "thread")
+        self.pool = WorkerPool.from_env().start()
+        self.ready = True
+
+    def shutdown(self):
+        self.ready = False
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+        from agentic.workflow import components
+        if components.is_ready("tool_executor"):
+            components.tool_executor.shutdown()
+        from agentic.mailer import close_mailer
+        close_mailer()
+        if components.is_ready("auditor"):
+            components.auditor.close()
+        if components.is_ready("memory_repo") and hasattr(components.memory_repo, "close"):
+            components.memory_repo.close()  # sharded repository: its fan-out threads
+        from agentic.db import dispose_engines
+        dispose_engines()
+
+    # -----------------------------------------------------------------
+    # ASGI entry point
+    # -----------------------------------------------------------------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            await self._route(scope, receive, send)
+        except HTTPError as exc:
+            await self._send_json(send, exc.status, {"error": exc.message}, exc.headers)
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await loop.run_in_executor(None, self.startup)
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await loop.run_in_executor(None, self.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _route(self, scope, receive, send):
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        routes = {
+            ("GET", "/healthz"): self.healthz,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/tickets"): self.submit,
+            ("POST", "/tickets/stream"): self.submit_stream,
+            ("POST", "/tickets/batch"): self.submit_batch,
+        }
+        handler = routes.get((method, path))
+        if handler is None:
+            allowed = [m for (m, p) in routes if p == path]
+            if allowed:
+                raise HTTPError(405, "method not allowed", [(b"allow", ", ".join(allowed).encode())])
+            raise HTTPError(404, "not found")
+        if method == "POST" and not self.ready:
+            raise HTTPError(503, "warming up", [(b"retry-after", b"1")])
+        await handler(scope, receive, send)
+
+    # -----------------------------------------------------------------
+    # helpers
+    # -----------------------------------------------------------------
+    async def _read_json(self, receive) -> Dict[str, Any]:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            body = message.get("body", b"")
+            size += len(body)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, f"body exceeds {MAX_BODY_BYTES} bytes")
+            chunks.append(body)
+            if not message.get("more_body"):
+                break
+        try:
+            payload = json.loads(b"".join(chunks) or b"{}")
+        except ValueError:
+            raise HTTPError(400, "invalid JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return payload
+
+    @staticmethod
+    def _ticket_args(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        # accept {"ticket": {...}, "session_id": ...} or a bare ticket
+        ticket = payload.get("ticket", payload)
+        if not isinstance(ticket, dict) or not ticket.get("text"):
+            raise HTTPError(422, "ticket.text is required")
+        session_id = payload.get("session_id") or (ticket.get("metadata") or {}).get("thread_id") \
+            or f"session_{ticket.get('ticket_id') or os.urandom(8).hex()}"
+        return ticket, session_id
+
+    def _submit(self, ticket: Dict[str, Any], session_id: Optional[str], **options) -> "asyncio.Future":
+        from agentic.scheduler import QueueFull
+        try:
+            future = self.pool.submit(ticket, session_id, **options)
+        except QueueFull as exc:
+            raise HTTPError(503, str(exc), [(b"retry-after", b"5")])
+        return asyncio.wrap_future(future)
+
+    async def _send_json(self, send, status: int, payload: Any, headers: List[Tuple[bytes, bytes]] = ()):
+        body = _dumps(payload)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())] + list(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    # -----------------------------------------------------------------
+    # endpoints
+    # -----------------------------------------------------------------
+    async def healthz(self, scope, receive, send):
+        from agentic.db import pool_stats
+        from agentic.workflow import components
+        await self._send_json(send, 200 if self.ready else 503, {
+            "status": "ok" if self.ready else "starting",
+            "pid": os.getpid(),
+            "components": {name: components.is_ready(name) for name in components.names()},
+            "init_seconds": self.init_times,
+            "queue": self.pool.stats() if self.pool is not None else None,
+            "db": pool_stats(),
+        })
+
+    async def metrics(self, scope, receive, send):
+        from agentic.metrics import metrics
+        body = metrics.render_prometheus().encode("utf-8")
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def submit(self, scope, receive, send):
+        ticket, session_id = self._ticket_args(await self._read_json(receive))
+        result = await self._submit(ticket, session_id)
+        await self._send_json(send, 200, result)
+
+    async def submit_stream(self, scope, receive, send):
+        ticket, session_id = self._ticket_args(await self._read_json(receive))
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+        def on_node(node_name: str, update: Dict[str, Any]):
+            # runs on the worker thread
+            line = {"event": "node", "node": node_name, "ms": round((update.get("timings") or {}).get(node_name, 0) * 1000, 3)}
+            if "resolver_output" in update:
+                line["resolver"] = update["resolver_output"]
+            if "supervisor_decision" in update:
+                line["decision"] = update["supervisor_decision"]
+            loop.call_soon_threadsafe(events.put_nowait, line)
+
+        result_future = self._submit(ticket, session_id, on_node=on_node)
+        result_future.add_done_callback(lambda _: events.put_nowait(None))
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")]})
+        while True:
+            line = await events.get()
+            if line is None:
+                break
+            await send({"type": "http.response.body", "body": _dumps(line) + b"\n", "more_body": True})
+        try:
+            final = {"event": "result", "result": result_future.result()}
+        except Exception as exc:
+            final = {"event": "error", "error": str(exc)}
+        await send({"type": "http.response.body", "body": _dumps(final) + b"\n"})
+
+    async def submit_batch(self, scope, receive, send):
+        payload = await self._read_json(receive)
+        items = payload.get("tickets")
+        if not isinstance(items, list) or not items:
+            raise HTTPError(422, "tickets must be a non-empty list")
+        if len(items) > MAX_BATCH:
+            raise HTTPError(413, f"batch exceeds {MAX_BATCH} tickets")
+
+        futures = []
+        for item in items:
+            try:
+                ticket, session_id = self._ticket_args(item if isinstance(item, dict) else {})
+                futures.append(self._submit(ticket, session_id))
+            except HTTPError as exc:
+                futures.append(exc)
+        results = []
+        for fut in futures:
+            if isinstance(fut, HTTPError):
+                results.append({"status": fut.status, "error": fut.message})
+                continue
+            try:
+                results.append({"status": 200, "result": await fut})
+            except Exception as exc:
+                results.append({"status": 500, "error": str(exc)})
+        await self._send_json(send, 200, {"results": results})
+
+
+app = TicketService()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ticket workflow HTTP service")
+    parser.add_argument("--host", default=os.environ.get("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVICE_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVICE_WORKERS", 1)))
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run("service:app", host=args.host, port=args.port, workers=args.workers, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,21 +19,31 @@ def save_json(obj, path: str):
         json.dump(obj, f, indent=4)
 
 # reset_udahub.py
-from sqlalchemy import create_engine, Engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+# sqlalchemy is imported inside the helpers below so that `from utils import new_id`
+# (used by the agentic package) stays cheap.
 from contextlib import contextmanager
-from langchain_core.messages import (
-    SystemMessage,
-    HumanMessage, 
-)
-from langgraph.graph.state import CompiledStateGraph
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
 
-Base = declarative_base()
+_Base = None
+
+def _declarative_base():
+    global _Base
+    if _Base is None:
+        from sqlalchemy.orm import declarative_base
+        _Base = declarative_base()
+    return _Base
+
+def __getattr__(name: str):
+    if name == "Base":
+        return _declarative_base()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def reset_db(db_path: str, echo: bool = True):
     """Drops the existing udahub.db file and recreates all tables."""
+    from sqlalchemy import create_engine
 
     # Remove the file if it exists
     if os.path.exists(db_path):
@@ -42,14 +52,15 @@ def reset_db(db_path: str, echo: bool = True):
 
     # Create a new engine and recreate tables
     engine = create_engine(f"sqlite:///{db_path}", echo=echo)
-    Base.metadata.create_all(engine)
+    _declarative_base().metadata.create_all(engine)
     print(f"✅ Recreated {db_path} with fresh schema")
 
 
 @contextmanager
-def get_session(engine: Engine):
-    Session = sessionmaker(bind=engine)
-    session = Session()
+def get_session(engine: "Engine"):
+    """Transactional session; `engine` may also be a database URL (shared engine, see agentic/db.py)."""
+    from agentic.db import session_factory
+    session = session_factory(engine)()
     try:
         yield session
         session.commit()
@@ -88,6 +99,9 @@ def chat_interface(orchestrator_func: Callable, ticket_id: str, prompts: Optiona
             "platform": "chat",
             "metadata": {"thread_id": ticket_id},
             "attachments": [],
+            # one ticket_id per chat: the per-turn id keeps a repeated message from replaying an old answer
+            "message_id": new_id(),
+            "created_at": now_iso(),
         }
         result = orchestrator_func(ticket, session_id=ticket_id)
         resolver_out = result.get("resolver") or {}